@@ -1,3 +1,55 @@
 from django.contrib import admin
+from .models import LedgerEntry, LedgerSnapshot, OutletCharge, SettlementBatch
 
-# Register your models here.
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'posted_at', 'reservation', 'invoice', 'entry_type', 'description', 'amount', 'balance_after']
+    list_filter = ['entry_type', 'source_model']
+    search_fields = ['description', 'reservation__id', 'invoice__invoice_number']
+    raw_id_fields = ['reservation', 'invoice', 'guest']
+    date_hierarchy = 'posted_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LedgerSnapshot)
+class LedgerSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['snapshot_date', 'reservation', 'invoice', 'balance', 'last_entry_id']
+    raw_id_fields = ['reservation', 'invoice']
+    date_hierarchy = 'snapshot_date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SettlementBatch)
+class SettlementBatchAdmin(admin.ModelAdmin):
+    list_display = ['file', 'processor', 'status', 'window_start', 'window_end', 'lines', 'matched', 'exceptions', 'created_at']
+    list_filter = ['status', 'processor']
+    readonly_fields = ['status', 'window_start', 'window_end', 'lines', 'matched', 'exceptions', 'duration_ms', 'error', 'uploaded_by']
+
+
+@admin.register(OutletCharge)
+class OutletChargeAdmin(admin.ModelAdmin):
+    list_display = ['outlet', 'ticket_number', 'room_number', 'description', 'quantity', 'unit_price', 'status', 'charged_at', 'posted_at']
+    list_filter = ['status', 'outlet']
+    search_fields = ['ticket_number', 'room_number', 'description']
+    raw_id_fields = ['reservation']
+    date_hierarchy = 'charged_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
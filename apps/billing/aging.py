@@ -0,0 +1,93 @@
+"""
+Accounts receivable aging.
+
+Outstanding balances of open invoices, in the hotel currency, are
+split into age buckets by days past due with conditional aggregation, so a
+report is a single grouped query over Invoice served by the
+(status, due_date, guest) index, whatever the number of invoices.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .folios import CENTS, OPEN_INVOICE_STATUSES
+
+BUCKETS = [
+    ('current', 'Current'),
+    ('days_30', '1-30 days'),
+    ('days_60', '31-60 days'),
+    ('days_90', '61-90 days'),
+    ('days_over_90', '90+ days'),
+]
+GROUPINGS = {
+    'guest': ['guest_id', 'guest__first_name', 'guest__last_name', 'guest__email'],
+    'source': ['reservation__booking_source'],
+}
+CHUNK_SIZE = 2000
+
+
+def bucket_amounts(row):
+    """Bucket amounts of an aggregated row, in BUCKETS order and rounded to cents"""
+    return [Decimal(row[name]).quantize(CENTS) for name, _ in BUCKETS]
+
+
+def _bucket_filters(as_of):
+    """Due date condition of each bucket, in BUCKETS order"""
+    return [
+        Q(due_date__gte=as_of),
+        Q(due_date__lt=as_of, due_date__gte=as_of - timedelta(days=30)),
+        Q(due_date__lt=as_of - timedelta(days=30), due_date__gte=as_of - timedelta(days=60)),
+        Q(due_date__lt=as_of - timedelta(days=60), due_date__gte=as_of - timedelta(days=90)),
+        Q(due_date__lt=as_of - timedelta(days=90)),
+    ]
+
+
+def _aggregates(as_of):
+    # Converted at each invoice's own rate, so invoices in any currency add up
+    outstanding = ExpressionWrapper(F('base_total_amount') - F('paid_amount') * F('exchange_rate'),
+                                    output_field=DecimalField(max_digits=12, decimal_places=2))
+    zero = Value(Decimal('0.00'))
+    aggregates = {
+        name: Coalesce(Sum(outstanding, filter=condition), zero)
+        for (name, _), condition in zip(BUCKETS, _bucket_filters(as_of))
+    }
+    aggregates['total'] = Coalesce(Sum(outstanding), zero)
+    return aggregates
+
+
+def _open_balances():
+    from .models import Invoice
+
+    return Invoice.objects.filter(status__in=OPEN_INVOICE_STATUSES).exclude(total_amount__lte=F('paid_amount'))
+
+
+def aging_rows(as_of, group_by='guest'):
+    """Aging buckets per guest or booking source, largest balance first"""
+    return _open_balances().values(*GROUPINGS[group_by]).annotate(**_aggregates(as_of)).order_by('-total')
+
+
+def aging_totals(as_of):
+    """Bucket totals over every open invoice"""
+    totals = _open_balances().aggregate(**_aggregates(as_of))
+    return {name: Decimal(amount).quantize(CENTS) for name, amount in totals.items()}
+
+
+def aging_csv_rows(as_of, group_by='guest'):
+    """Yield an aging report as CSV rows"""
+    from apps.reservations.models import Reservation
+
+    labels = [label for _, label in BUCKETS]
+    if group_by == 'guest':
+        yield ['Guest', 'Email', *labels, 'Total']
+    else:
+        yield ['Booking source', *labels, 'Total']
+    sources = dict(Reservation.BOOKING_SOURCE_CHOICES)
+    for row in aging_rows(as_of, group_by).iterator(chunk_size=CHUNK_SIZE):
+        amounts = bucket_amounts(row) + [Decimal(row['total']).quantize(CENTS)]
+        if group_by == 'guest':
+            yield [f"{row['guest__first_name']} {row['guest__last_name']}", row['guest__email'], *amounts]
+        else:
+            source = row['reservation__booking_source']
+            yield [sources.get(source, 'No reservation'), *amounts]
@@ -0,0 +1,67 @@
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .idempotency import idempotent
+from .models import OutletCharge, Payment
+from .outlets import enqueue_outlet_charges
+from .serializers import (
+    OutletChargeBatchSerializer, OutletChargeSerializer, PaymentBatchSerializer, PaymentPostingSerializer,
+)
+
+
+def post_payments(rows, user):
+    """Create payments from validated serializer rows, posting each to the ledger"""
+    numbers = Payment.generate_payment_numbers(len(rows))
+    payments = []
+    for number, row in zip(numbers, rows):
+        payment = Payment(payment_number=number, processed_by=user, **row)
+        payment.save()
+        payments.append(payment)
+    return payments
+
+
+class PaymentPostingView(APIView):
+    """Post one payment, or a batch as {"payments": [...]}, under an Idempotency-Key"""
+
+    @idempotent
+    def post(self, request):
+        batch = isinstance(request.data, dict) and 'payments' in request.data
+        serializer = PaymentBatchSerializer(data=request.data) if batch else PaymentPostingSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = serializer.validated_data['payments'] if batch else [serializer.validated_data]
+        payments = post_payments(rows, request.user)
+        data = PaymentPostingSerializer(payments, many=True).data
+        return Response({'payments': data} if batch else data[0], status=status.HTTP_201_CREATED)
+
+
+class OutletChargeView(APIView):
+    """Queue point-of-sale room charges, one or a batch as {"charges": [...]}
+
+    Charges are posted to the guest's folio asynchronously, usually within a
+    second; GET with `outlet` and comma-separated `tickets` reports where
+    each ticket stands. Resending a ticket is safe, it is counted as a
+    duplicate and never posted twice.
+    """
+
+    def get(self, request):
+        outlet = request.query_params.get('outlet', '')
+        tickets = [ticket for ticket in request.query_params.get('tickets', '').split(',') if ticket][:1000]
+        if not outlet or not tickets:
+            return Response({'detail': "The outlet and tickets parameters are required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        charges = OutletCharge.objects.filter(outlet=outlet, ticket_number__in=tickets).values(
+            'ticket_number', 'status', 'error', 'posted_at'
+        )
+        return Response({'charges': list(charges)})
+
+    def post(self, request):
+        batch = isinstance(request.data, dict) and 'charges' in request.data
+        serializer = OutletChargeBatchSerializer(data=request.data) if batch else OutletChargeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = serializer.validated_data['charges'] if batch else [serializer.validated_data]
+        queued, duplicates = enqueue_outlet_charges(rows)
+        return Response({'queued': queued, 'duplicates': duplicates}, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,301 @@
+"""
+Invoice and folio PDF documents.
+
+A document is first reduced to a plain payload (hotel header, line items,
+payments and totals). The PDF is stored under MEDIA_ROOT at a path derived
+from a hash of that payload, so an unchanged invoice maps to a file that
+already exists and is never rendered twice, and the hash doubles as the
+HTTP ETag. Rendering only needs the payload, which lets batch mode fan out
+to a process pool without database connections in the children.
+"""
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from apps.core.storage import serve_file
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes so every document is rendered again
+RENDERER_VERSION = 1
+RENDER_LOCK_TIMEOUT = 5 * 60
+
+
+def _money(value):
+    return f"{value:,.2f}" if value is not None else ''
+
+
+def _header():
+    from apps.core.hotel_settings import get_hotel_settings
+
+    settings = get_hotel_settings()
+    return {
+        'name': settings.hotel_name,
+        'address': settings.hotel_address,
+        'phone': settings.hotel_phone,
+        'email': settings.hotel_email,
+        'currency': settings.currency,
+    }
+
+
+def _line_rows(line_items):
+    return [
+        [
+            item.service_date.isoformat() if item.service_date else '',
+            item.description,
+            str(item.quantity.normalize()),
+            _money(item.unit_price),
+            _money(item.total_amount),
+        ]
+        for item in line_items
+    ]
+
+
+def _payment_rows(payments):
+    rows = []
+    for payment in payments:
+        method = payment.get_payment_method_display()
+        if payment.exchange_rate != 1:
+            method = f"{method} ({_money(payment.amount)} {payment.currency})"
+        rows.append([payment.payment_date.date().isoformat(), payment.payment_number, method, _money(payment.base_amount)])
+    return rows
+
+
+def invoice_payload(invoice):
+    """Everything printed on an invoice PDF"""
+    guest = invoice.guest
+    meta = [
+        ('Invoice', invoice.invoice_number),
+        ('Issued', invoice.issue_date.isoformat()),
+        ('Due', invoice.due_date.isoformat()),
+        ('Status', invoice.get_status_display()),
+    ]
+    if invoice.reservation_id:
+        meta.append(('Reservation', invoice.reservation.reservation_number))
+    return {
+        'kind': 'invoice',
+        'key': invoice.invoice_number,
+        'title': f"Invoice {invoice.invoice_number}",
+        'header': _header(),
+        'bill_to': [guest.full_name, guest.email, guest.full_address],
+        'meta': meta,
+        'lines': _line_rows(invoice.line_items.all()),
+        'payments': _payment_rows(invoice.payments.filter(status='completed').order_by('payment_date', 'id')),
+        'totals': [
+            ('Subtotal', _money(invoice.subtotal)),
+            ('Tax', _money(invoice.tax_amount)),
+            ('Discount', _money(invoice.discount_amount)),
+            ('Total', _money(invoice.total_amount)),
+            ('Paid', _money(invoice.paid_amount)),
+            ('Balance due', _money(invoice.balance_due)),
+        ],
+    }
+
+
+def folio_payload(reservation):
+    """Everything printed on a reservation folio PDF"""
+    from django.db.models import Q, Sum
+    from .ledger import ZERO, account_balance
+    from .models import InvoiceLineItem, Payment
+
+    guest = reservation.guest
+    line_items = InvoiceLineItem.objects.filter(invoice__reservation=reservation).order_by('service_date', 'id')
+    payments = Payment.objects.filter(
+        Q(reservation=reservation) | Q(invoice__reservation=reservation),
+        status='completed',
+    ).order_by('payment_date', 'id')
+    # Totals come from the ledger, where charges carry the hotel tax and are in the hotel currency
+    balance = account_balance(reservation=reservation)
+    charges = reservation.ledger_entries.filter(source_model='InvoiceLineItem').aggregate(
+        total=Sum('amount')
+    )['total'] or ZERO
+    return {
+        'kind': 'folio',
+        'key': reservation.reservation_number,
+        'title': f"Folio {reservation.reservation_number}",
+        'header': _header(),
+        'bill_to': [guest.full_name, guest.email, guest.full_address],
+        'meta': [
+            ('Reservation', reservation.reservation_number),
+            ('Room', reservation.room.number if reservation.room_id else '-'),
+            ('Arrival', reservation.check_in_date.isoformat()),
+            ('Departure', reservation.check_out_date.isoformat()),
+            ('Status', reservation.get_status_display()),
+        ],
+        'lines': _line_rows(line_items),
+        'payments': _payment_rows(payments),
+        'totals': [
+            ('Charges', _money(charges)),
+            ('Paid', _money(charges - balance)),
+            ('Balance', _money(balance)),
+        ],
+    }
+
+
+def content_hash(payload):
+    """Stable hash of a payload and the renderer version"""
+    encoded = json.dumps([RENDERER_VERSION, payload], sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def document_path(payload, digest=None):
+    digest = digest or content_hash(payload)
+    return f"documents/{payload['kind']}s/{digest[:2]}/{digest}.pdf"
+
+
+def render_pdf(payload):
+    """Render a payload to PDF bytes (no database access)"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    pdf.setTitle(payload['title'])
+    width, height = A4
+    left, right = 18 * mm, width - 18 * mm
+    header = payload['header']
+    currency = header['currency']
+
+    def page_header():
+        pdf.setFont('Helvetica-Bold', 16)
+        pdf.drawString(left, height - 20 * mm, header['name'])
+        pdf.setFont('Helvetica', 9)
+        y = height - 26 * mm
+        for line in [*header['address'].splitlines(), f"{header['phone']}  {header['email']}"]:
+            pdf.drawString(left, y, line)
+            y -= 4.5 * mm
+        pdf.setFont('Helvetica-Bold', 14)
+        pdf.drawRightString(right, height - 20 * mm, payload['title'])
+        return y - 4 * mm
+
+    def new_page():
+        pdf.showPage()
+        return page_header()
+
+    y = page_header()
+
+    # Bill-to on the left, document details on the right
+    pdf.setFont('Helvetica', 10)
+    top = y
+    for line in payload['bill_to']:
+        if line:
+            pdf.drawString(left, y, line)
+            y -= 5 * mm
+    meta_y = top
+    for label, value in payload['meta']:
+        pdf.drawRightString(right - 40 * mm, meta_y, f"{label}:")
+        pdf.drawRightString(right, meta_y, str(value))
+        meta_y -= 5 * mm
+    y = min(y, meta_y) - 6 * mm
+
+    def table(title, columns, rows, y):
+        pdf.setFont('Helvetica-Bold', 11)
+        pdf.drawString(left, y, title)
+        y -= 6 * mm
+        pdf.setFont('Helvetica-Bold', 9)
+        for x, label, align in columns:
+            (pdf.drawRightString if align == 'right' else pdf.drawString)(x, y, label)
+        pdf.line(left, y - 1.5 * mm, right, y - 1.5 * mm)
+        y -= 6 * mm
+        pdf.setFont('Helvetica', 9)
+        for row in rows:
+            if y < 30 * mm:
+                y = new_page()
+                pdf.setFont('Helvetica', 9)
+            for (x, _, align), value in zip(columns, row):
+                (pdf.drawRightString if align == 'right' else pdf.drawString)(x, y, value[:70])
+            y -= 5 * mm
+        return y - 4 * mm
+
+    y = table('Charges', [
+        (left, 'Date', 'left'),
+        (left + 25 * mm, 'Description', 'left'),
+        (right - 45 * mm, 'Qty', 'right'),
+        (right - 22 * mm, 'Unit price', 'right'),
+        (right, f"Amount ({currency})", 'right'),
+    ], payload['lines'], y)
+
+    if payload['payments']:
+        y = table('Payments', [
+            (left, 'Date', 'left'),
+            (left + 25 * mm, 'Payment', 'left'),
+            (left + 75 * mm, 'Method', 'left'),
+            (right, f"Amount ({currency})", 'right'),
+        ], payload['payments'], y)
+
+    if y < 30 * mm + 6 * mm * len(payload['totals']):
+        y = new_page()
+    for label, value in payload['totals']:
+        pdf.setFont('Helvetica-Bold' if label.startswith(('Total', 'Balance')) else 'Helvetica', 10)
+        pdf.drawRightString(right - 35 * mm, y, label)
+        pdf.drawRightString(right, y, f"{value} {currency}")
+        y -= 6 * mm
+
+    pdf.save()
+    return buffer.getvalue()
+
+
+def store_document(payload, data, digest=None):
+    """Save rendered bytes at the payload's content-addressed path"""
+    path = document_path(payload, digest)
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(data))
+    return path
+
+
+def ensure_document(payload):
+    """Path of the rendered document, rendering it only if the content changed"""
+    path = document_path(payload)
+    if default_storage.exists(path):
+        return path
+    return store_document(payload, render_pdf(payload))
+
+
+def request_render(payload, task, object_id):
+    """Queue a render unless one is already running for the same content"""
+    path = document_path(payload)
+    if cache.add(f"documents:rendering:{path}", True, RENDER_LOCK_TIMEOUT):
+        task.delay(object_id)
+
+
+def render_checkout_folios(checkout_date, processes=None):
+    """Render the folio of every reservation checking out on a date"""
+    from apps.reservations.models import Reservation
+
+    reservations = Reservation.objects.filter(
+        check_out_date=checkout_date,
+        status__in=['checked_in', 'checked_out'],
+    ).select_related('guest', 'room')
+    payloads = [folio_payload(reservation) for reservation in reservations]
+    missing = {}
+    for payload in payloads:
+        digest = content_hash(payload)
+        if not default_storage.exists(document_path(payload, digest)):
+            missing[digest] = payload
+    if not missing:
+        return 0
+
+    # Celery prefork children are daemonic and may not start a pool of their own
+    if multiprocessing.current_process().daemon or processes == 1:
+        rendered = map(render_pdf, missing.values())
+        for digest, data in zip(missing, rendered):
+            store_document(missing[digest], data, digest)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for digest, data in zip(missing, pool.map(render_pdf, missing.values(), chunksize=8)):
+                store_document(missing[digest], data, digest)
+    logger.info("Rendered %s folios for %s", len(missing), checkout_date)
+    return len(missing)
+
+
+def serve_document(request, path, digest, filename):
+    """Serve a stored document with ETag and single byte-range support"""
+    return serve_file(request, default_storage, path, digest, filename, 'application/pdf')
@@ -0,0 +1,117 @@
+"""
+Bulk helpers for reservation folios (the open invoice of a reservation).
+"""
+from decimal import Decimal
+
+from django.db.models import Q, QuerySet, Sum
+from django.utils import timezone
+from apps.core.exchange_rates import base_currency, to_base
+from apps.core.search import index_objects
+
+OPEN_INVOICE_STATUSES = ['draft', 'pending', 'overdue']
+DEFAULT_TAX_RATE = Decimal('0.0875')
+CENTS = Decimal('0.01')
+
+
+def hotel_tax_rate():
+    """Get the tax rate from hotel settings"""
+    from apps.core.hotel_settings import get_hotel_settings
+
+    tax_rate = get_hotel_settings().tax_rate
+    return Decimal(str(tax_rate)) if tax_rate is not None else DEFAULT_TAX_RATE
+
+
+def open_folios(reservation_ids):
+    """Map reservation id -> id of its oldest open invoice"""
+    from .models import Invoice
+
+    folios = {}
+    for reservation_id, invoice_id in Invoice.objects.filter(
+        reservation_id__in=reservation_ids,
+        status__in=OPEN_INVOICE_STATUSES,
+    ).order_by('id').values_list('reservation_id', 'id'):
+        folios.setdefault(reservation_id, invoice_id)
+    return folios
+
+
+def get_or_create_folios(reservations, issue_date):
+    """Map reservation id -> open invoice id, creating missing folios in bulk
+
+    `reservations` is an iterable of (reservation_id, guest_id, due_date).
+    """
+    from .models import Invoice
+
+    reservations = list(reservations)
+    reservation_ids = [reservation_id for reservation_id, _, _ in reservations]
+    folios = open_folios(reservation_ids)
+
+    missing = [row for row in reservations if row[0] not in folios]
+    if missing:
+        currency = base_currency()
+        numbers = Invoice.generate_invoice_numbers(len(missing))
+        Invoice.objects.bulk_create([
+            Invoice(
+                invoice_number=number,
+                guest_id=guest_id,
+                reservation_id=reservation_id,
+                issue_date=issue_date,
+                due_date=due_date,
+                status='pending',
+                currency=currency,
+            )
+            for number, (reservation_id, guest_id, due_date) in zip(numbers, missing)
+        ], batch_size=500)
+        folios = open_folios(reservation_ids)
+        # bulk_create sends no post_save, so index the new folios for global search
+        index_objects('invoice', Invoice.objects.filter(id__in=[folios[row[0]] for row in missing]))
+    return folios
+
+
+def line_item_totals(line_items):
+    """Grouped aggregate of charges, posted tax and taxable charges per invoice"""
+    return line_items.values('invoice_id').annotate(
+        charges=Sum('total_amount', filter=~Q(item_type='tax')),
+        posted_tax=Sum('total_amount', filter=Q(item_type='tax')),
+        taxable=Sum('total_amount', filter=Q(item_type='charge')),
+    ).order_by()
+
+
+def apply_invoice_totals(invoice, row, tax_rate):
+    """Set subtotal, tax and total on an invoice from a `line_item_totals` row"""
+    invoice.subtotal = (row.get('charges') or Decimal('0.00')).quantize(CENTS)
+    taxable = row.get('taxable') or Decimal('0.00')
+    invoice.tax_amount = (row.get('posted_tax') or Decimal('0.00')).quantize(CENTS) + (taxable * tax_rate).quantize(CENTS)
+    invoice.total_amount = invoice.subtotal + invoice.tax_amount - invoice.discount_amount
+    invoice.base_total_amount = to_base(invoice.total_amount, invoice.exchange_rate)
+
+
+def refresh_invoice_totals(invoices, tax_rate=None, batch_size=1000):
+    """Recompute subtotal, tax and total for many invoices at once
+
+    `invoices` is a list of invoice ids or an Invoice queryset. Totals come
+    from a single grouped aggregate and changed rows are written with chunked
+    bulk_update. Returns the number of invoices whose totals changed.
+    """
+    from .models import Invoice, InvoiceLineItem
+
+    if tax_rate is None:
+        tax_rate = hotel_tax_rate()
+    if isinstance(invoices, QuerySet):
+        invoices = invoices.values('id')
+    totals = {
+        row['invoice_id']: row
+        for row in line_item_totals(InvoiceLineItem.objects.filter(invoice_id__in=invoices))
+    }
+
+    now = timezone.now()
+    updated = []
+    fields = ['subtotal', 'tax_amount', 'total_amount', 'base_total_amount']
+    for invoice in Invoice.objects.filter(id__in=invoices).only('id', 'discount_amount', 'exchange_rate', *fields).iterator(chunk_size=batch_size):
+        current = [getattr(invoice, field) for field in fields]
+        apply_invoice_totals(invoice, totals.get(invoice.id, {}), tax_rate)
+        # Unchanged rows are skipped, bulk_update cost grows with every row sent
+        if current != [getattr(invoice, field) for field in fields]:
+            invoice.updated_at = now
+            updated.append(invoice)
+    Invoice.objects.bulk_update(updated, fields + ['updated_at'], batch_size=batch_size)
+    return len(updated)
@@ -1,12 +1,15 @@
 from django import forms
-from .models import Invoice, Payment, InvoiceLineItem
+from apps.core.autocomplete import AutocompleteSelect
+from apps.core.exchange_rates import ExchangeRateMissing, get_exchange_rate
+from .models import Invoice, Payment, InvoiceLineItem, SettlementBatch
 class InvoiceForm(forms.ModelForm):
     class Meta:
         model = Invoice
         fields = ['reservation', 'due_date', 'notes']
         widgets = {
-            'reservation': forms.Select(attrs={
-                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
+            'reservation': AutocompleteSelect('reservation', attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
+                'placeholder': 'Reservation number or guest'
             }),
             'due_date': forms.DateInput(attrs={
                 'type': 'date',
@@ -21,15 +24,20 @@ class InvoiceForm(forms.ModelForm):
 class PaymentForm(forms.ModelForm):
     class Meta:
         model = Payment
-        fields = ['invoice', 'amount', 'payment_method', 'reference_number', 'notes']
+        fields = ['invoice', 'amount', 'currency', 'payment_method', 'reference_number', 'notes']
         widgets = {
-            'invoice': forms.Select(attrs={
-                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
+            'invoice': AutocompleteSelect('invoice', attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
+                'placeholder': 'Invoice number or guest'
             }),
             'amount': forms.NumberInput(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
                 'step': '0.01'
             }),
+            'currency': forms.TextInput(attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
+                'maxlength': 3
+            }),
             'payment_method': forms.Select(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
             }),
@@ -42,6 +50,14 @@ class PaymentForm(forms.ModelForm):
             }),
         }
 
+    def clean_currency(self):
+        currency = self.cleaned_data['currency'].upper()
+        try:
+            get_exchange_rate(currency)
+        except ExchangeRateMissing as exc:
+            raise forms.ValidationError(str(exc))
+        return currency
+
 class InvoiceItemForm(forms.ModelForm):
     class Meta:
         model = InvoiceLineItem
@@ -59,3 +75,17 @@ class InvoiceItemForm(forms.ModelForm):
                 'step': '0.01'
             }),
         }
+
+class SettlementUploadForm(forms.ModelForm):
+    class Meta:
+        model = SettlementBatch
+        fields = ['file', 'processor']
+        widgets = {
+            'file': forms.ClearableFileInput(attrs={
+                'class': 'mt-1 block w-full text-sm text-gray-700 dark:text-gray-300',
+                'accept': '.csv'
+            }),
+            'processor': forms.TextInput(attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
+            }),
+        }
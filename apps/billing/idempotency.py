@@ -0,0 +1,114 @@
+"""
+Idempotency keys for API requests.
+
+Clients send an `Idempotency-Key` header. The first response for a key is
+stored in the cache (fast path for retries) and in IdempotencyKey (survives
+cache eviction, and its unique constraint settles races). A retry with the
+same key and body replays the stored response without running the request
+again; the same key with a different body is rejected.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+CACHE_TIMEOUT = 24 * 60 * 60
+LOCK_TIMEOUT = 30
+RETENTION_DAYS = 7
+
+
+def _cache_key(user_id, key):
+    return f"billing:idempotency:{user_id}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def request_hash(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _replay(stored, digest):
+    if stored['hash'] != digest:
+        return Response(
+            {'detail': f"{HEADER} was already used with a different request body."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = Response(stored['body'], status=stored['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(handler):
+    """Run `handler(request)` at most once per (user, Idempotency-Key)"""
+    def wrapper(view, request, *args, **kwargs):
+        from .models import IdempotencyKey
+
+        key = request.headers.get(HEADER, '').strip()
+        if not key or len(key) > 255:
+            return Response({'detail': f"A {HEADER} header of at most 255 characters is required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        digest = request_hash(request.data)
+        cache_key = _cache_key(request.user.pk, key)
+
+        stored = cache.get(cache_key)
+        if stored is None:
+            record = IdempotencyKey.objects.filter(user=request.user, key=key).values(
+                'request_hash', 'response_status', 'response_body'
+            ).first()
+            if record:
+                stored = {'hash': record['request_hash'], 'status': record['response_status'],
+                          'body': record['response_body']}
+                cache.set(cache_key, stored, CACHE_TIMEOUT)
+        if stored is not None:
+            return _replay(stored, digest)
+
+        # Concurrent retries of the same key wait for the first one to finish
+        lock_key = f"{cache_key}:lock"
+        if not cache.add(lock_key, True, LOCK_TIMEOUT):
+            return Response({'detail': 'A request with this key is already in progress, retry shortly.'},
+                            status=status.HTTP_409_CONFLICT)
+        try:
+            with transaction.atomic():
+                response = handler(view, request, *args, **kwargs)
+                # Only outcomes are stored; server errors may be retried for real, so
+                # whatever the handler wrote before failing must not be kept either
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                    return response
+                try:
+                    with transaction.atomic():
+                        IdempotencyKey.objects.create(
+                            user=request.user,
+                            key=key,
+                            request_hash=digest,
+                            response_status=response.status_code,
+                            response_body=response.data,
+                        )
+                except IntegrityError:
+                    # Another request with this key won: discard this one's writes and replay its response
+                    transaction.set_rollback(True)
+                    response = None
+            if response is None:
+                # Read after leaving the rolled back block, which refuses further queries
+                record = IdempotencyKey.objects.get(user=request.user, key=key)
+                return _replay({'hash': record.request_hash, 'status': record.response_status,
+                                'body': record.response_body}, digest)
+            cache.set(cache_key, {'hash': digest, 'status': response.status_code, 'body': response.data},
+                      CACHE_TIMEOUT)
+            return response
+        finally:
+            cache.delete(lock_key)
+    return wrapper
+
+
+def purge_expired(now=None):
+    """Delete stored keys past the retention period"""
+    from .models import IdempotencyKey
+
+    cutoff = (now or timezone.now()) - timedelta(days=RETENTION_DAYS)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,308 @@
+"""
+Folio ledger: an append-only record of charges, payments and refunds.
+
+Each account (a reservation folio, or an invoice for direct billing) keeps a
+running balance on its entries, so the current balance is the last entry,
+a single read on the (account, id) index. Sources are never rewritten;
+an edit posts the difference between what the source should contribute now
+and what it has already contributed, and a delete posts a reversal.
+Payments and refunds also maintain Reservation.amount_paid and
+Invoice.paid_amount so list pages show balances without extra queries.
+Entries are in the hotel currency: payments and refunds post their converted
+base amounts and charges of a foreign-currency invoice are converted at the
+invoice's rate.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+CENTS = Decimal('0.01')
+ZERO = Decimal('0.00')
+RECEIVED_PAYMENT_STATUSES = ['completed', 'refunded']
+OPEN_INVOICE_STATUSES = ['draft', 'pending', 'overdue']
+
+
+def _lock_account(reservation_id, invoice_id):
+    """Lock the account row and return its current balance"""
+    from apps.reservations.models import Reservation
+    from .models import Invoice, LedgerEntry
+
+    if reservation_id:
+        Reservation.objects.select_for_update().filter(pk=reservation_id).values_list('pk').first()
+        entries = LedgerEntry.objects.filter(reservation_id=reservation_id)
+    else:
+        Invoice.objects.select_for_update().filter(pk=invoice_id).values_list('pk').first()
+        entries = LedgerEntry.objects.filter(invoice_id=invoice_id, reservation__isnull=True)
+    balance = entries.order_by('-id').values_list('balance_after', flat=True).first()
+    return balance if balance is not None else ZERO
+
+
+def _posted_amount(source_model, source_id):
+    from .models import LedgerEntry
+
+    posted = LedgerEntry.objects.filter(source_model=source_model, source_id=source_id).aggregate(
+        total=Sum('amount')
+    )['total']
+    return posted or ZERO
+
+
+def _post(source_model, source_id, target, reservation_id, invoice_id, guest_id, entry_type, description, created=False):
+    """Post whatever is needed for a source to contribute `target` to its account"""
+    from .models import LedgerEntry
+
+    # A source saved for the first time has nothing posted yet
+    posted = ZERO if created else _posted_amount(source_model, source_id)
+    delta = target - posted
+    if not delta:
+        return None
+    if posted:
+        entry_type = 'adjustment'
+        description = f"{'Reversal' if not target else 'Adjustment'}: {description}"
+
+    balance = _lock_account(reservation_id, invoice_id)
+    return LedgerEntry.objects.create(
+        reservation_id=reservation_id,
+        invoice_id=invoice_id,
+        guest_id=guest_id,
+        entry_type=entry_type,
+        description=description,
+        amount=delta,
+        balance_after=balance + delta,
+        source_model=source_model,
+        source_id=source_id,
+    )
+
+
+def _charge_amount(line_item, tax_rate, exchange_rate):
+    # Plain charges are taxed at the hotel rate on the invoice, room charges post their own tax
+    amount = line_item.total_amount
+    if line_item.item_type == 'charge':
+        amount += (amount * tax_rate).quantize(CENTS)
+    return amount if exchange_rate == 1 else (amount * exchange_rate).quantize(CENTS)
+
+
+def _line_item_account(line_item):
+    from .models import Invoice
+
+    return Invoice.objects.filter(pk=line_item.invoice_id).values_list('reservation_id', 'guest_id', 'exchange_rate').get()
+
+
+def post_line_item(line_item, tax_rate=None, created=False):
+    """Post a saved invoice line item as a charge"""
+    from .folios import hotel_tax_rate
+
+    if tax_rate is None:
+        tax_rate = hotel_tax_rate()
+    reservation_id, guest_id, exchange_rate = _line_item_account(line_item)
+    return _post(
+        'InvoiceLineItem', line_item.pk, _charge_amount(line_item, tax_rate, exchange_rate),
+        reservation_id, line_item.invoice_id, guest_id, 'charge', line_item.description, created,
+    )
+
+
+def reverse_line_item(line_item):
+    """Reverse everything a line item has posted, before it is deleted"""
+    reservation_id, guest_id, _ = _line_item_account(line_item)
+    return _post(
+        'InvoiceLineItem', line_item.pk, ZERO,
+        reservation_id, line_item.invoice_id, guest_id, 'charge', line_item.description,
+    )
+
+
+def post_line_items(line_items, tax_rate=None):
+    """Post many bulk-created line items at once; already posted items are skipped"""
+    from apps.reservations.models import Reservation
+    from .folios import hotel_tax_rate
+    from .models import Invoice, LedgerEntry
+
+    if tax_rate is None:
+        tax_rate = hotel_tax_rate()
+    line_items = list(line_items.select_related('invoice').order_by('id'))
+    if not line_items:
+        return 0
+
+    posted = set(LedgerEntry.objects.filter(
+        source_model='InvoiceLineItem',
+        source_id__in=[item.id for item in line_items],
+    ).values_list('source_id', flat=True))
+    line_items = [item for item in line_items if item.id not in posted]
+    if not line_items:
+        return 0
+
+    reservation_ids = {item.invoice.reservation_id for item in line_items if item.invoice.reservation_id}
+    invoice_ids = {item.invoice_id for item in line_items if not item.invoice.reservation_id}
+
+    # Lock every account, then read all their balances in two queries
+    list(Reservation.objects.select_for_update().filter(pk__in=reservation_ids).values_list('pk'))
+    list(Invoice.objects.select_for_update().filter(pk__in=invoice_ids).values_list('pk'))
+    last_ids = list(LedgerEntry.objects.filter(reservation_id__in=reservation_ids).values(
+        'reservation_id'
+    ).annotate(last_id=Max('id')).values_list('last_id', flat=True).order_by())
+    last_ids += list(LedgerEntry.objects.filter(invoice_id__in=invoice_ids, reservation__isnull=True).values(
+        'invoice_id'
+    ).annotate(last_id=Max('id')).values_list('last_id', flat=True).order_by())
+    balances = {}
+    for reservation_id, invoice_id, balance in LedgerEntry.objects.filter(id__in=last_ids).values_list(
+        'reservation_id', 'invoice_id', 'balance_after'
+    ):
+        balances[('reservation', reservation_id) if reservation_id else ('invoice', invoice_id)] = balance
+
+    now = timezone.now()
+    entries = []
+    for item in line_items:
+        reservation_id = item.invoice.reservation_id
+        account = ('reservation', reservation_id) if reservation_id else ('invoice', item.invoice_id)
+        amount = _charge_amount(item, tax_rate, item.invoice.exchange_rate)
+        balances[account] = balances.get(account, ZERO) + amount
+        entries.append(LedgerEntry(
+            reservation_id=reservation_id,
+            invoice_id=item.invoice_id,
+            guest_id=item.invoice.guest_id,
+            entry_type='charge',
+            description=item.description,
+            amount=amount,
+            balance_after=balances[account],
+            source_model='InvoiceLineItem',
+            source_id=item.id,
+            posted_at=now,
+        ))
+    LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def _apply_payment_totals(reservation_id, invoice_id, received):
+    """Move `received` (in the hotel currency) into the denormalized paid amounts"""
+    from apps.reservations.models import Reservation
+    from .models import Invoice
+
+    if reservation_id:
+        Reservation.objects.filter(pk=reservation_id).update(amount_paid=F('amount_paid') + received)
+    if invoice_id:
+        exchange_rate = Invoice.objects.filter(pk=invoice_id).values_list('exchange_rate', flat=True).get()
+        if exchange_rate != 1:
+            received = (received / exchange_rate).quantize(CENTS)
+        Invoice.objects.filter(pk=invoice_id).update(paid_amount=F('paid_amount') + received)
+        # Settle open invoices that are now fully paid
+        Invoice.objects.filter(
+            pk=invoice_id,
+            status__in=OPEN_INVOICE_STATUSES,
+            total_amount__gt=0,
+            paid_amount__gte=F('total_amount'),
+        ).update(status='paid', paid_date=timezone.now().date(), updated_at=timezone.now())
+
+
+def _payment_account(payment):
+    from .models import Invoice
+
+    reservation_id = payment.reservation_id
+    if not reservation_id and payment.invoice_id:
+        reservation_id = Invoice.objects.filter(pk=payment.invoice_id).values_list('reservation_id', flat=True).get()
+    return reservation_id
+
+
+def post_payment(payment, reverse=False, created=False):
+    """Post a payment as a credit once received, and reverse it if it is voided"""
+    from apps.guests.stats import record_payment
+
+    reservation_id = _payment_account(payment)
+    if not reservation_id and not payment.invoice_id:
+        return None
+
+    received = payment.base_amount if payment.status in RECEIVED_PAYMENT_STATUSES and not reverse else ZERO
+    entry = _post(
+        'Payment', payment.pk, -received,
+        reservation_id, payment.invoice_id, payment.guest_id,
+        'payment', f"Payment {payment.payment_number}", created,
+    )
+    if entry:
+        _apply_payment_totals(reservation_id, payment.invoice_id, -entry.amount)
+        record_payment(payment.guest_id, -entry.amount)
+    return entry
+
+
+def post_refund(refund, reverse=False, created=False):
+    """Post a refund as a debit once processed"""
+    from apps.guests.stats import record_payment
+    from .models import Payment
+
+    payment = Payment.objects.get(pk=refund.original_payment_id)
+    reservation_id = _payment_account(payment)
+    if not reservation_id and not payment.invoice_id:
+        return None
+
+    refunded = refund.base_amount if refund.status == 'processed' and not reverse else ZERO
+    entry = _post(
+        'Refund', refund.pk, refunded,
+        reservation_id, payment.invoice_id, refund.guest_id,
+        'refund', f"Refund {refund.refund_number}", created,
+    )
+    if entry:
+        _apply_payment_totals(reservation_id, payment.invoice_id, -entry.amount)
+        record_payment(refund.guest_id, -entry.amount)
+    return entry
+
+
+def account_balance(reservation=None, invoice=None):
+    """Current ledger balance of a reservation folio or a direct-billed invoice"""
+    from .models import LedgerEntry
+
+    if reservation is not None:
+        entries = LedgerEntry.objects.filter(reservation=reservation)
+    else:
+        entries = LedgerEntry.objects.filter(invoice=invoice, reservation__isnull=True)
+    balance = entries.order_by('-id').values_list('balance_after', flat=True).first()
+    return balance if balance is not None else ZERO
+
+
+def balance_as_of(as_of, reservation=None, invoice=None):
+    """Ledger balance at the end of a date, from the latest snapshot on or before it"""
+    from .models import LedgerSnapshot
+
+    if reservation is not None:
+        snapshots = LedgerSnapshot.objects.filter(reservation=reservation)
+    else:
+        snapshots = LedgerSnapshot.objects.filter(invoice=invoice, reservation__isnull=True)
+    balance = snapshots.filter(snapshot_date__lte=as_of).order_by('-snapshot_date').values_list(
+        'balance', flat=True
+    ).first()
+    return balance if balance is not None else ZERO
+
+
+def take_ledger_snapshot(snapshot_date=None):
+    """Record closing balances for accounts that changed since the previous snapshot"""
+    from .models import LedgerEntry, LedgerSnapshot
+
+    if snapshot_date is None:
+        snapshot_date = timezone.now().date()
+
+    since_id = LedgerSnapshot.objects.filter(snapshot_date__lt=snapshot_date).aggregate(
+        last=Max('last_entry_id')
+    )['last'] or 0
+    changed = LedgerEntry.objects.filter(id__gt=since_id)
+    last_ids = list(changed.filter(reservation__isnull=False).values('reservation_id').annotate(
+        last_id=Max('id')
+    ).values_list('last_id', flat=True).order_by())
+    last_ids += list(changed.filter(reservation__isnull=True).values('invoice_id').annotate(
+        last_id=Max('id')
+    ).values_list('last_id', flat=True).order_by())
+
+    snapshots = [
+        LedgerSnapshot(
+            snapshot_date=snapshot_date,
+            reservation_id=reservation_id,
+            invoice_id=None if reservation_id else invoice_id,
+            balance=balance,
+            last_entry_id=entry_id,
+        )
+        for entry_id, reservation_id, invoice_id, balance in LedgerEntry.objects.filter(
+            id__in=last_ids
+        ).values_list('id', 'reservation_id', 'invoice_id', 'balance_after')
+    ]
+
+    with transaction.atomic():
+        # Re-running for the same day replaces that day's snapshot
+        LedgerSnapshot.objects.filter(snapshot_date=snapshot_date).delete()
+        LedgerSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from apps.billing.folios import OPEN_INVOICE_STATUSES, hotel_tax_rate, refresh_invoice_totals
+from apps.billing.models import Invoice
+
+
+class Command(BaseCommand):
+    help = 'Recompute invoice subtotals, tax and totals from their line items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Include paid, cancelled and refunded invoices')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk_update statement')
+        parser.add_argument('--benchmark', action='store_true',
+                            help='Compare with per-invoice calculate_totals (rolled back) before recomputing')
+
+    def handle(self, *args, **options):
+        invoices = Invoice.objects.all()
+        if not options['all']:
+            invoices = invoices.filter(status__in=OPEN_INVOICE_STATUSES)
+        tax_rate = hotel_tax_rate()
+
+        if options['benchmark']:
+            self.benchmark(invoices, tax_rate, options['batch_size'])
+
+        started = time.monotonic()
+        count = refresh_invoice_totals(invoices, tax_rate, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated totals of {count} invoices in {time.monotonic() - started:.2f}s"
+        ))
+
+    def benchmark(self, invoices, tax_rate, batch_size):
+        """Time both strategies on the same invoices without keeping their writes"""
+        results = []
+        for label, recompute in [
+            ('per invoice', lambda: [invoice.calculate_totals(tax_rate) for invoice in invoices.iterator()]),
+            ('bulk', lambda: refresh_invoice_totals(invoices, tax_rate, batch_size=batch_size)),
+        ]:
+            with transaction.atomic():
+                # Force every invoice to be rewritten
+                invoices.update(total_amount=-1)
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.monotonic()
+                    recompute()
+                    elapsed = time.monotonic() - started
+                transaction.set_rollback(True)
+            results.append((label, elapsed, len(queries)))
+
+        for label, elapsed, query_count in results:
+            self.stdout.write(f"{label:>12}: {elapsed:.3f}s, {query_count} queries")
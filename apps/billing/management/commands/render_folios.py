@@ -0,0 +1,23 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from apps.billing.documents import render_checkout_folios
+from apps.frontdesk.business_date import get_business_date
+
+
+class Command(BaseCommand):
+    help = 'Render folio PDFs for every departure on a day using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Check-out date (YYYY-MM-DD), defaults to the current business date')
+        parser.add_argument('--processes', type=int, help='Worker processes, defaults to the CPU count')
+
+    def handle(self, *args, **options):
+        checkout_date = get_business_date()
+        if options['date']:
+            try:
+                checkout_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Date must be in YYYY-MM-DD format')
+
+        rendered = render_checkout_folios(checkout_date, processes=options['processes'])
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} folios for {checkout_date}"))
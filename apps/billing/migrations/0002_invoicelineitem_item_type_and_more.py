@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoicelineitem',
+            name='item_type',
+            field=models.CharField(choices=[('charge', 'Charge'), ('room', 'Room Charge'), ('tax', 'Tax')], default='charge', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='invoicelineitem',
+            name='posting_key',
+            field=models.CharField(blank=True, help_text='Set on automatic postings so they are never posted twice', max_length=100, null=True, unique=True),
+        ),
+    ]
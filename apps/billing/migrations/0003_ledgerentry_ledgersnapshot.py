@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_invoicelineitem_item_type_and_more'),
+        ('guests', '0001_initial'),
+        ('reservations', '0003_reservation_amount_paid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('charge', 'Charge'), ('payment', 'Payment'), ('refund', 'Refund'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('description', models.CharField(max_length=200)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('source_model', models.CharField(max_length=50)),
+                ('source_id', models.PositiveBigIntegerField()),
+                ('posted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('guest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='guests.guest')),
+                ('invoice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='billing.invoice')),
+                ('reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='reservations.reservation')),
+            ],
+            options={
+                'verbose_name_plural': 'Ledger entries',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['reservation', 'id'], name='billing_led_reserva_c391de_idx'), models.Index(fields=['invoice', 'id'], name='billing_led_invoice_4abb4d_idx'), models.Index(fields=['source_model', 'source_id'], name='billing_led_source__f58314_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('last_entry_id', models.PositiveBigIntegerField()),
+                ('invoice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_snapshots', to='billing.invoice')),
+                ('reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_snapshots', to='reservations.reservation')),
+            ],
+            options={
+                'ordering': ['-snapshot_date'],
+                'indexes': [models.Index(fields=['snapshot_date'], name='billing_led_snapsho_7d2615_idx'), models.Index(fields=['reservation', 'snapshot_date'], name='billing_led_reserva_04b6a3_idx'), models.Index(fields=['invoice', 'snapshot_date'], name='billing_led_invoice_bf46d4_idx')],
+            },
+        ),
+    ]
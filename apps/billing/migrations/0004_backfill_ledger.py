@@ -0,0 +1,99 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+from django.utils import timezone
+
+CENTS = Decimal('0.01')
+
+
+def backfill_ledger(apps, schema_editor):
+    """Open the ledger with every existing charge, payment and refund"""
+    HotelSettings = apps.get_model('core', 'HotelSettings')
+    Invoice = apps.get_model('billing', 'Invoice')
+    InvoiceLineItem = apps.get_model('billing', 'InvoiceLineItem')
+    Payment = apps.get_model('billing', 'Payment')
+    Refund = apps.get_model('billing', 'Refund')
+    LedgerEntry = apps.get_model('billing', 'LedgerEntry')
+    Reservation = apps.get_model('reservations', 'Reservation')
+
+    tax_rate = HotelSettings.objects.values_list('tax_rate', flat=True).first()
+    tax_rate = Decimal(str(tax_rate)) if tax_rate is not None else Decimal('0.0875')
+    invoices = {
+        invoice_id: (reservation_id, guest_id)
+        for invoice_id, reservation_id, guest_id in Invoice.objects.values_list('id', 'reservation_id', 'guest_id')
+    }
+
+    # (posted_at, entry_type, reservation_id, invoice_id, guest_id, amount, description, source_model, source_id)
+    postings = []
+    for item in InvoiceLineItem.objects.all():
+        reservation_id, guest_id = invoices[item.invoice_id]
+        amount = item.total_amount
+        if item.item_type == 'charge':
+            amount += (amount * tax_rate).quantize(CENTS)
+        postings.append((item.created_at, 'charge', reservation_id, item.invoice_id, guest_id, amount,
+                         item.description, 'InvoiceLineItem', item.id))
+
+    payments = {}
+    for payment in Payment.objects.all():
+        reservation_id = payment.reservation_id or invoices.get(payment.invoice_id, (None, None))[0]
+        payments[payment.id] = (reservation_id, payment.invoice_id)
+        if payment.status in ('completed', 'refunded') and (reservation_id or payment.invoice_id):
+            postings.append((payment.payment_date, 'payment', reservation_id, payment.invoice_id, payment.guest_id,
+                             -payment.amount, f"Payment {payment.payment_number}", 'Payment', payment.id))
+
+    for refund in Refund.objects.filter(status='processed'):
+        reservation_id, invoice_id = payments[refund.original_payment_id]
+        if reservation_id or invoice_id:
+            postings.append((refund.processed_at or refund.created_at, 'refund', reservation_id, invoice_id,
+                             refund.guest_id, refund.amount, f"Refund {refund.refund_number}", 'Refund', refund.id))
+
+    postings.sort(key=lambda posting: (posting[0] or timezone.now(), posting[-1]))
+    balances = defaultdict(Decimal)
+    paid_by_reservation = defaultdict(Decimal)
+    paid_by_invoice = defaultdict(Decimal)
+    entries = []
+    for posted_at, entry_type, reservation_id, invoice_id, guest_id, amount, description, source_model, source_id in postings:
+        account = ('reservation', reservation_id) if reservation_id else ('invoice', invoice_id)
+        balances[account] += amount
+        if entry_type != 'charge':
+            if reservation_id:
+                paid_by_reservation[reservation_id] -= amount
+            if invoice_id:
+                paid_by_invoice[invoice_id] -= amount
+        entries.append(LedgerEntry(
+            reservation_id=reservation_id,
+            invoice_id=invoice_id,
+            guest_id=guest_id,
+            entry_type=entry_type,
+            description=description[:200],
+            amount=amount,
+            balance_after=balances[account],
+            source_model=source_model,
+            source_id=source_id,
+            posted_at=posted_at or timezone.now(),
+        ))
+    LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+    reservations = list(Reservation.objects.filter(id__in=paid_by_reservation).only('id'))
+    for reservation in reservations:
+        reservation.amount_paid = paid_by_reservation[reservation.id]
+    Reservation.objects.bulk_update(reservations, ['amount_paid'], batch_size=500)
+
+    invoices_to_update = list(Invoice.objects.filter(id__in=paid_by_invoice).only('id'))
+    for invoice in invoices_to_update:
+        invoice.paid_amount = paid_by_invoice[invoice.id]
+    Invoice.objects.bulk_update(invoices_to_update, ['paid_amount'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0003_ledgerentry_ledgersnapshot'),
+        ('core', '0002_hotelsettings_no_show_fee_nights'),
+        ('reservations', '0003_reservation_amount_paid'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_backfill_ledger'),
+        ('guests', '0001_initial'),
+        ('reservations', '0003_reservation_amount_paid'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SettlementException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('unmatched', 'No matching payment'), ('amount_mismatch', 'Amount differs from payment'), ('duplicate', 'Payment already matched in this file'), ('already_reconciled', 'Payment reconciled by an earlier file'), ('invalid', 'Unreadable line'), ('missing', 'Payment missing from settlement')], max_length=20)),
+                ('line_number', models.PositiveIntegerField(blank=True, null=True)),
+                ('transaction_id', models.CharField(blank=True, max_length=100)),
+                ('reference_number', models.CharField(blank=True, max_length=100)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('settled_date', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='reconciled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SettlementBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('file', models.FileField(upload_to='settlements/')),
+                ('processor', models.CharField(blank=True, help_text='Bank or card processor that sent the file', max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('window_start', models.DateField(blank=True, null=True)),
+                ('window_end', models.DateField(blank=True, null=True)),
+                ('lines', models.PositiveIntegerField(default=0)),
+                ('matched', models.PositiveIntegerField(default=0)),
+                ('exceptions', models.PositiveIntegerField(default=0)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Settlement batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='settlement_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='billing.settlementbatch'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'payment_date'], name='billing_pay_status_e52f4e_idx'),
+        ),
+        migrations.AddField(
+            model_name='settlementexception',
+            name='batch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exception_lines', to='billing.settlementbatch'),
+        ),
+        migrations.AddField(
+            model_name='settlementexception',
+            name='payment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='settlement_exceptions', to='billing.payment'),
+        ),
+        migrations.AddIndex(
+            model_name='settlementexception',
+            index=models.Index(fields=['batch', 'reason'], name='billing_set_batch_i_a3f8aa_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_idempotencykey'),
+        ('reservations', '0004_reservationservice_outlet_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutletCharge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('outlet', models.CharField(help_text='Restaurant, bar, spa or other outlet code', max_length=50)),
+                ('ticket_number', models.CharField(help_text="The outlet's own check or ticket number", max_length=100)),
+                ('room_number', models.CharField(max_length=10)),
+                ('description', models.CharField(max_length=200)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('charged_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('posted', 'Posted'), ('rejected', 'Rejected')], default='queued', max_length=10)),
+                ('error', models.CharField(blank=True, max_length=200)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('posted_at', models.DateTimeField(blank=True, null=True)),
+                ('reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outlet_charges', to='reservations.reservation')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='billing_out_status_63f45c_idx')],
+                'unique_together': {('outlet', 'ticket_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0007_outletcharge'),
+        ('guests', '0001_initial'),
+        ('reservations', '0004_reservationservice_outlet_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'due_date', 'guest'], name='billing_inv_status_7c1643_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='invoice',
+            name='billing_inv_status_996e80_idx',
+        ),
+    ]
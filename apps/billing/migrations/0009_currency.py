@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:33
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_currency(apps, schema_editor):
+    """Existing amounts are in the hotel currency"""
+    HotelSettings = apps.get_model('core', 'HotelSettings')
+    currency = (HotelSettings.objects.values_list('currency', flat=True).first() or 'USD').upper()
+    apps.get_model('billing', 'Invoice').objects.update(currency=currency, base_total_amount=F('total_amount'))
+    apps.get_model('billing', 'Payment').objects.update(currency=currency, base_amount=F('amount'))
+    apps.get_model('billing', 'Refund').objects.update(currency=currency, base_amount=F('amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0008_invoice_aging_index'),
+        ('core', '0003_exchangerate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='base_total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Total in the hotel currency', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='currency',
+            field=models.CharField(blank=True, help_text='Leave empty for the hotel currency', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='exchange_rate',
+            field=models.DecimalField(decimal_places=6, default=1, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='base_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Amount in the hotel currency at the rate of the payment date', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='currency',
+            field=models.CharField(blank=True, help_text='Leave empty for the hotel currency', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='exchange_rate',
+            field=models.DecimalField(decimal_places=6, default=1, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='refund',
+            name='base_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Amount in the hotel currency at the rate of the refund date', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='refund',
+            name='currency',
+            field=models.CharField(blank=True, help_text='Leave empty for the currency of the original payment', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='refund',
+            name='exchange_rate',
+            field=models.DecimalField(decimal_places=6, default=1, max_digits=14),
+        ),
+        migrations.RunPython(backfill_currency, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,14 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from decimal import Decimal
+from apps.core.exchange_rates import LockedRateMixin, lock_exchange_rate, to_base
 from apps.core.models import TimeStampedModel
 from apps.guests.models import Guest
 from apps.reservations.models import Reservation
 
 
-class Invoice(TimeStampedModel):
+class Invoice(LockedRateMixin, TimeStampedModel):
     """Guest invoices and billing"""
     STATUS_CHOICES = [
         ('draft', 'Draft'),
@@ -33,6 +34,12 @@ class Invoice(TimeStampedModel):
     discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     
+    # Currency; the rate into the hotel currency is fixed when the invoice is issued
+    currency = models.CharField(max_length=3, blank=True, help_text="Leave empty for the hotel currency")
+    exchange_rate = models.DecimalField(max_digits=14, decimal_places=6, default=1)
+    base_total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                            help_text="Total in the hotel currency")
+    
     # Status and payment tracking
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -46,7 +53,8 @@ class Invoice(TimeStampedModel):
         ordering = ['-issue_date', '-created_at']
         indexes = [
             models.Index(fields=['guest', 'issue_date']),
-            models.Index(fields=['status', 'due_date']),
+            # Overdue sweeps and AR aging
+            models.Index(fields=['status', 'due_date', 'guest']),
             models.Index(fields=['invoice_number']),
         ]
     
@@ -54,6 +62,8 @@ class Invoice(TimeStampedModel):
         return f"Invoice {self.invoice_number} - {self.guest.display_name}"
     
     def save(self, *args, **kwargs):
+        from .ledger import post_line_item
+
         if not self.invoice_number:
             self.invoice_number = self.generate_invoice_number()
         
@@ -62,7 +72,14 @@ class Invoice(TimeStampedModel):
             from datetime import timedelta
             self.due_date = self.issue_date + timedelta(days=30)
         
-        super().save(*args, **kwargs)
+        relocked = lock_exchange_rate(self, self.issue_date)
+        self.base_total_amount = to_base(self.total_amount, self.exchange_rate)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if relocked:
+                # Charges already posted were converted at the old currency's rate
+                for line_item in self.line_items.all():
+                    post_line_item(line_item)
     
     def generate_invoice_number(self):
         """Generate unique invoice number"""
@@ -77,6 +94,24 @@ class Invoice(TimeStampedModel):
             if not Invoice.objects.filter(invoice_number=number).exists():
                 return number
     
+    @classmethod
+    def generate_invoice_numbers(cls, count):
+        """Generate a batch of unique invoice numbers with one lookup per attempt"""
+        import random
+        import string
+        from datetime import datetime
+
+        year = datetime.now().year
+        numbers = set()
+        while len(numbers) < count:
+            candidates = {
+                f"INV-{year}-{''.join(random.choices(string.digits, k=6))}"
+                for _ in range(count - len(numbers))
+            }
+            taken = set(cls.objects.filter(invoice_number__in=candidates).values_list('invoice_number', flat=True))
+            numbers |= candidates - taken
+        return list(numbers)
+
     @property
     def balance_due(self):
         """Get remaining balance due"""
@@ -85,27 +120,39 @@ class Invoice(TimeStampedModel):
     @property
     def is_overdue(self):
         """Check if invoice is overdue"""
+        from apps.frontdesk.business_date import get_business_date
+
+        return self.is_overdue_on(get_business_date())
+
+    def is_overdue_on(self, business_date):
+        """Check if invoice is overdue on a business date read once for a whole list"""
         return (
             self.status in ['pending', 'overdue'] and
-            self.due_date < timezone.now().date()
+            self.due_date < business_date
         )
     
-    def calculate_totals(self):
+    def calculate_totals(self, tax_rate=None):
         """Calculate invoice totals from line items"""
-        line_items = self.line_items.all()
-        self.subtotal = sum(item.total_amount for item in line_items)
-        
-        # Calculate tax (you might want to get this from hotel settings)
-        tax_rate = Decimal('0.0875')  # 8.75% default
-        self.tax_amount = self.subtotal * tax_rate
-        
-        self.total_amount = self.subtotal + self.tax_amount - self.discount_amount
-        self.save()
+        from .folios import apply_invoice_totals, hotel_tax_rate, line_item_totals
+
+        if tax_rate is None:
+            tax_rate = hotel_tax_rate()
+        rows = list(line_item_totals(self.line_items.all()))
+        apply_invoice_totals(self, rows[0] if rows else {}, tax_rate)
+        self.save(update_fields=['subtotal', 'tax_amount', 'total_amount', 'base_total_amount', 'updated_at'])
 
 
 class InvoiceLineItem(TimeStampedModel):
     """Individual line items on an invoice"""
+    ITEM_TYPE_CHOICES = [
+        ('charge', 'Charge'),
+        ('room', 'Room Charge'),
+        ('tax', 'Tax'),
+    ]
+
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='line_items')
+    # Room charges carry their own posted tax lines; other charges are taxed at the hotel rate
+    item_type = models.CharField(max_length=10, choices=ITEM_TYPE_CHOICES, default='charge')
     description = models.CharField(max_length=200)
     quantity = models.DecimalField(max_digits=10, decimal_places=2, default=1)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -113,19 +160,33 @@ class InvoiceLineItem(TimeStampedModel):
     
     # Optional references
     service_date = models.DateField(null=True, blank=True)
+    posting_key = models.CharField(max_length=100, unique=True, null=True, blank=True,
+                                   help_text="Set on automatic postings so they are never posted twice")
     
     class Meta:
         ordering = ['id']
     
     def save(self, *args, **kwargs):
+        from .ledger import post_line_item
+
         self.total_amount = self.quantity * self.unit_price
-        super().save(*args, **kwargs)
+        created = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            post_line_item(self, created=created)
+    
+    def delete(self, *args, **kwargs):
+        from .ledger import reverse_line_item
+
+        with transaction.atomic():
+            reverse_line_item(self)
+            return super().delete(*args, **kwargs)
     
     def __str__(self):
         return f"{self.invoice.invoice_number} - {self.description}"
 
 
-class Payment(TimeStampedModel):
+class Payment(LockedRateMixin, TimeStampedModel):
     """Payment records"""
     PAYMENT_METHOD_CHOICES = [
         ('cash', 'Cash'),
@@ -153,6 +214,10 @@ class Payment(TimeStampedModel):
     
     # Payment details
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, blank=True, help_text="Leave empty for the hotel currency")
+    exchange_rate = models.DecimalField(max_digits=14, decimal_places=6, default=1)
+    base_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                      help_text="Amount in the hotel currency at the rate of the payment date")
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES)
     payment_date = models.DateTimeField(default=timezone.now)
     
@@ -163,6 +228,10 @@ class Payment(TimeStampedModel):
     # Status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
+    # Settlement reconciliation
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    settlement_batch = models.ForeignKey('SettlementBatch', on_delete=models.SET_NULL, null=True, blank=True, related_name='payments')
+    
     # Additional info
     notes = models.TextField(blank=True)
     processed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
@@ -173,15 +242,48 @@ class Payment(TimeStampedModel):
             models.Index(fields=['guest', 'payment_date']),
             models.Index(fields=['invoice', 'status']),
             models.Index(fields=['payment_number']),
+            models.Index(fields=['status', 'payment_date']),
         ]
     
     def __str__(self):
-        return f"Payment {self.payment_number} - ${self.amount}"
+        return f"Payment {self.payment_number} - {self.amount} {self.currency}"
     
     def save(self, *args, **kwargs):
+        from .ledger import post_payment
+
         if not self.payment_number:
             self.payment_number = self.generate_payment_number()
-        super().save(*args, **kwargs)
+        lock_exchange_rate(self, self.payment_date)
+        self.base_amount = to_base(self.amount, self.exchange_rate)
+        created = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            post_payment(self, created=created)
+    
+    def delete(self, *args, **kwargs):
+        from .ledger import post_payment
+
+        with transaction.atomic():
+            post_payment(self, reverse=True)
+            return super().delete(*args, **kwargs)
+    
+    @classmethod
+    def generate_payment_numbers(cls, count):
+        """Generate a batch of unique payment numbers with one lookup per attempt"""
+        import random
+        import string
+        from datetime import datetime
+
+        year = datetime.now().year
+        numbers = set()
+        while len(numbers) < count:
+            candidates = {
+                f"PAY-{year}-{''.join(random.choices(string.digits, k=6))}"
+                for _ in range(count - len(numbers))
+            }
+            taken = set(cls.objects.filter(payment_number__in=candidates).values_list('payment_number', flat=True))
+            numbers |= candidates - taken
+        return list(numbers)
     
     def generate_payment_number(self):
         """Generate unique payment number"""
@@ -197,7 +299,7 @@ class Payment(TimeStampedModel):
                 return number
 
 
-class Refund(TimeStampedModel):
+class Refund(LockedRateMixin, TimeStampedModel):
     """Refund records"""
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -213,6 +315,10 @@ class Refund(TimeStampedModel):
     
     # Refund details
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, blank=True, help_text="Leave empty for the currency of the original payment")
+    exchange_rate = models.DecimalField(max_digits=14, decimal_places=6, default=1)
+    base_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                      help_text="Amount in the hotel currency at the rate of the refund date")
     reason = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
@@ -231,12 +337,28 @@ class Refund(TimeStampedModel):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"Refund {self.refund_number} - ${self.amount}"
+        return f"Refund {self.refund_number} - {self.amount} {self.currency}"
     
     def save(self, *args, **kwargs):
+        from .ledger import post_refund
+
         if not self.refund_number:
             self.refund_number = self.generate_refund_number()
-        super().save(*args, **kwargs)
+        if not self.currency:
+            self.currency = self.original_payment.currency
+        lock_exchange_rate(self, timezone.now())
+        self.base_amount = to_base(self.amount, self.exchange_rate)
+        created = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            post_refund(self, created=created)
+    
+    def delete(self, *args, **kwargs):
+        from .ledger import post_refund
+
+        with transaction.atomic():
+            post_refund(self, reverse=True)
+            return super().delete(*args, **kwargs)
     
     def generate_refund_number(self):
         """Generate unique refund number"""
@@ -252,3 +374,186 @@ class Refund(TimeStampedModel):
                 return number
 
 
+class LedgerEntry(models.Model):
+    """Append-only folio ledger entry with the account's running balance"""
+    ENTRY_TYPE_CHOICES = [
+        ('charge', 'Charge'),
+        ('payment', 'Payment'),
+        ('refund', 'Refund'),
+        ('adjustment', 'Adjustment'),
+    ]
+
+    # The account is the reservation folio, or the invoice for direct billing
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='ledger_entries', null=True, blank=True)
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='ledger_entries', null=True, blank=True)
+    guest = models.ForeignKey(Guest, on_delete=models.CASCADE, related_name='ledger_entries')
+
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES)
+    description = models.CharField(max_length=200)
+    # Positive amounts increase what the guest owes
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+
+    # Origin of the entry
+    source_model = models.CharField(max_length=50)
+    source_id = models.PositiveBigIntegerField()
+
+    posted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = "Ledger entries"
+        indexes = [
+            models.Index(fields=['reservation', 'id']),
+            models.Index(fields=['invoice', 'id']),
+            models.Index(fields=['source_model', 'source_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entry_type_display()} {self.amount} -> {self.balance_after}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError("Ledger entries are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Ledger entries are append-only")
+
+
+class LedgerSnapshot(models.Model):
+    """Closing balance of a ledger account on a date"""
+    snapshot_date = models.DateField()
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='ledger_snapshots', null=True, blank=True)
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='ledger_snapshots', null=True, blank=True)
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    last_entry_id = models.PositiveBigIntegerField()
+
+    class Meta:
+        ordering = ['-snapshot_date']
+        indexes = [
+            models.Index(fields=['snapshot_date']),
+            models.Index(fields=['reservation', 'snapshot_date']),
+            models.Index(fields=['invoice', 'snapshot_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.snapshot_date}: {self.balance}"
+
+
+class SettlementBatch(TimeStampedModel):
+    """An imported bank or card settlement file"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    file = models.FileField(upload_to='settlements/')
+    processor = models.CharField(max_length=100, blank=True, help_text="Bank or card processor that sent the file")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    # Settlement dates covered by the file
+    window_start = models.DateField(null=True, blank=True)
+    window_end = models.DateField(null=True, blank=True)
+
+    lines = models.PositiveIntegerField(default=0)
+    matched = models.PositiveIntegerField(default=0)
+    exceptions = models.PositiveIntegerField(default=0)
+    duration_ms = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = "Settlement batches"
+
+    def __str__(self):
+        return f"Settlement {self.file.name} ({self.get_status_display()})"
+
+
+class SettlementException(models.Model):
+    """A settlement line or payment that could not be reconciled"""
+    REASON_CHOICES = [
+        ('unmatched', 'No matching payment'),
+        ('amount_mismatch', 'Amount differs from payment'),
+        ('duplicate', 'Payment already matched in this file'),
+        ('already_reconciled', 'Payment reconciled by an earlier file'),
+        ('invalid', 'Unreadable line'),
+        ('missing', 'Payment missing from settlement'),
+    ]
+
+    batch = models.ForeignKey(SettlementBatch, on_delete=models.CASCADE, related_name='exception_lines')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    line_number = models.PositiveIntegerField(null=True, blank=True)
+    transaction_id = models.CharField(max_length=100, blank=True)
+    reference_number = models.CharField(max_length=100, blank=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    settled_date = models.DateField(null=True, blank=True)
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='settlement_exceptions')
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['batch', 'reason']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_reason_display()} (line {self.line_number or '-'})"
+
+
+class IdempotencyKey(models.Model):
+    """Stored response of an API request, replayed when the same key is retried"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'key']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.key}"
+
+
+class OutletCharge(models.Model):
+    """A point-of-sale charge queued for posting to a guest's room"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('posted', 'Posted'),
+        ('rejected', 'Rejected'),
+    ]
+
+    outlet = models.CharField(max_length=50, help_text="Restaurant, bar, spa or other outlet code")
+    ticket_number = models.CharField(max_length=100, help_text="The outlet's own check or ticket number")
+    room_number = models.CharField(max_length=10)
+    description = models.CharField(max_length=200)
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    charged_at = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    error = models.CharField(max_length=200, blank=True)
+    reservation = models.ForeignKey('reservations.Reservation', on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='outlet_charges')
+    received_at = models.DateTimeField(auto_now_add=True)
+    posted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        unique_together = ['outlet', 'ticket_number']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    @property
+    def total_amount(self):
+        return self.quantity * self.unit_price
+
+    def __str__(self):
+        return f"{self.outlet} {self.ticket_number} - Room {self.room_number}"
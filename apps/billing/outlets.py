@@ -0,0 +1,211 @@
+"""
+Point-of-sale charge posting.
+
+Outlets (restaurant, bar, spa...) hand charges in through the API or by
+dropping CSV files into OUTLET_DROP_DIR. Either way they are only staged as
+queued OutletCharge rows, which is a single insert, and a drain task is
+scheduled to run BATCH_WINDOW_SECONDS later. Everything queued by then is
+posted as one micro-batch: rooms are resolved against a cached map of
+in-house reservations, reservation services and folio line items are
+bulk-created, and each folio's totals are refreshed once per batch.
+"""
+import csv
+import logging
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+BATCH_WINDOW_SECONDS = 0.25
+DRAIN_SCHEDULED_KEY = 'billing:outlet_charges:drain_scheduled'
+DRAIN_SCHEDULED_TIMEOUT = 10
+IN_HOUSE_ROOMS_KEY = 'billing:outlet_charges:in_house_rooms'
+IN_HOUSE_ROOMS_TIMEOUT = 5 * 60
+
+
+def in_house_rooms():
+    """Map room number -> (reservation id, guest id, check-out date) of checked-in stays"""
+    from apps.reservations.models import Reservation
+
+    rooms = cache.get(IN_HOUSE_ROOMS_KEY)
+    if rooms is None:
+        rooms = {
+            room_number: (reservation_id, guest_id, check_out_date)
+            for reservation_id, guest_id, check_out_date, room_number in Reservation.objects.filter(
+                status='checked_in',
+                room__isnull=False,
+            ).order_by('check_in_date').values_list('id', 'guest_id', 'check_out_date', 'room__number')
+        }
+        cache.set(IN_HOUSE_ROOMS_KEY, rooms, IN_HOUSE_ROOMS_TIMEOUT)
+    return rooms
+
+
+def in_house_rooms_changed():
+    """Drop the room map once the current transaction commits"""
+    transaction.on_commit(lambda: cache.delete(IN_HOUSE_ROOMS_KEY))
+
+
+def schedule_drain():
+    """Queue a drain unless one is already waiting to run"""
+    from .tasks import drain_outlet_charges
+
+    if cache.add(DRAIN_SCHEDULED_KEY, True, DRAIN_SCHEDULED_TIMEOUT):
+        drain_outlet_charges.apply_async(countdown=BATCH_WINDOW_SECONDS)
+
+
+def enqueue_outlet_charges(rows):
+    """Stage validated charge rows; returns (queued, duplicates)
+
+    Outlets may resend a ticket, e.g. after a timeout, so a ticket number
+    already received from the same outlet is counted as a duplicate.
+    """
+    from .models import OutletCharge
+
+    received = OutletCharge.objects.filter(
+        outlet__in={row['outlet'] for row in rows},
+        ticket_number__in={row['ticket_number'] for row in rows},
+    ).values_list('outlet', 'ticket_number')
+    seen = set(received)
+    charges = []
+    for row in rows:
+        key = (row['outlet'], row['ticket_number'])
+        if key not in seen:
+            seen.add(key)
+            charges.append(OutletCharge(**row))
+
+    with transaction.atomic():
+        OutletCharge.objects.bulk_create(charges, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        if charges:
+            transaction.on_commit(schedule_drain)
+    return len(charges), len(rows) - len(charges)
+
+
+def post_outlet_charges(limit=BATCH_SIZE):
+    """Post up to `limit` queued charges as one batch; returns (posted, rejected)"""
+    from apps.frontdesk.business_date import get_business_date
+    from apps.reservations.models import ReservationService
+    from .folios import get_or_create_folios, hotel_tax_rate, refresh_invoice_totals
+    from .ledger import post_line_items
+    from .models import InvoiceLineItem, OutletCharge
+
+    with transaction.atomic():
+        charges = list(OutletCharge.objects.select_for_update(skip_locked=True).filter(
+            status='queued',
+        ).order_by('id')[:limit])
+        if not charges:
+            return 0, 0
+
+        rooms = in_house_rooms()
+        accepted = []
+        for charge in charges:
+            stay = rooms.get(charge.room_number)
+            if stay is None:
+                charge.status = 'rejected'
+                charge.error = f"Room {charge.room_number} has no checked-in reservation"
+            else:
+                charge.reservation_id = stay[0]
+                accepted.append(charge)
+
+        now = timezone.now()
+        folio_ids = set()
+        if accepted:
+            folios = get_or_create_folios(
+                {rooms[charge.room_number] for charge in accepted},
+                issue_date=get_business_date(),
+            )
+            services = []
+            line_items = []
+            for charge in accepted:
+                posting_key = f"outlet:{charge.pk}"
+                service_date = timezone.localdate(charge.charged_at)
+                services.append(ReservationService(
+                    reservation_id=charge.reservation_id,
+                    service_name=charge.description,
+                    service_description=f"{charge.outlet} ticket {charge.ticket_number}",
+                    quantity=charge.quantity,
+                    unit_price=charge.unit_price,
+                    total_price=charge.total_amount,
+                    service_date=service_date,
+                    outlet=charge.outlet,
+                    posting_key=posting_key,
+                ))
+                line_items.append(InvoiceLineItem(
+                    invoice_id=folios[charge.reservation_id],
+                    item_type='charge',
+                    description=f"{charge.outlet}: {charge.description}"[:200],
+                    quantity=charge.quantity,
+                    unit_price=charge.unit_price,
+                    total_amount=charge.total_amount,
+                    service_date=service_date,
+                    posting_key=posting_key,
+                ))
+                folio_ids.add(folios[charge.reservation_id])
+                charge.status = 'posted'
+                charge.posted_at = now
+
+            # Unique posting keys make a repeated batch a no-op
+            tax_rate = hotel_tax_rate()
+            ReservationService.objects.bulk_create(services, batch_size=BATCH_SIZE, ignore_conflicts=True)
+            InvoiceLineItem.objects.bulk_create(line_items, batch_size=BATCH_SIZE, ignore_conflicts=True)
+            post_line_items(InvoiceLineItem.objects.filter(
+                posting_key__in=[item.posting_key for item in line_items]
+            ), tax_rate)
+            refresh_invoice_totals(list(folio_ids), tax_rate)
+
+        OutletCharge.objects.bulk_update(charges, ['status', 'error', 'reservation', 'posted_at'], batch_size=BATCH_SIZE)
+
+    rejected = len(charges) - len(accepted)
+    if rejected:
+        logger.warning("Rejected %s outlet charges for rooms that are not in house", rejected)
+    return len(accepted), rejected
+
+
+def drain_queue():
+    """Post queued charges in batches until the queue is empty"""
+    # Charges staged from here on schedule a drain of their own
+    cache.delete(DRAIN_SCHEDULED_KEY)
+    posted = rejected = 0
+    while True:
+        batch_posted, batch_rejected = post_outlet_charges()
+        posted += batch_posted
+        rejected += batch_rejected
+        if batch_posted + batch_rejected < BATCH_SIZE:
+            return posted, rejected
+
+
+def import_drop_files(directory=None):
+    """Stage the charges of every CSV file in the drop directory
+
+    Files are moved to a processed/ subdirectory once staged; rows that do
+    not validate are logged and skipped. Returns (files, queued, duplicates).
+    """
+    from .serializers import OutletChargeSerializer
+
+    directory = Path(directory or settings.OUTLET_DROP_DIR)
+    if not directory.is_dir():
+        return 0, 0, 0
+    processed_dir = directory / 'processed'
+    files = queued = duplicates = 0
+    for path in sorted(directory.glob('*.csv')):
+        with path.open(newline='', encoding='utf-8-sig') as handle:
+            rows = []
+            for line_number, row in enumerate(csv.DictReader(handle), start=2):
+                serializer = OutletChargeSerializer(data=row)
+                if serializer.is_valid():
+                    rows.append(serializer.validated_data)
+                else:
+                    logger.warning("%s line %s skipped: %s", path.name, line_number, serializer.errors)
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch_queued, batch_duplicates = enqueue_outlet_charges(rows[start:start + BATCH_SIZE])
+            queued += batch_queued
+            duplicates += batch_duplicates
+        processed_dir.mkdir(exist_ok=True)
+        shutil.move(str(path), processed_dir / f"{timezone.now():%Y%m%d%H%M%S}-{path.name}")
+        files += 1
+    return files, queued, duplicates
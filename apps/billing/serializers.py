@@ -0,0 +1,69 @@
+from django.utils import timezone
+from rest_framework import serializers
+from apps.core.exchange_rates import ExchangeRateMissing, get_exchange_rate
+from .models import OutletCharge, Payment
+
+
+class PaymentPostingSerializer(serializers.ModelSerializer):
+    """A payment posted by a terminal, POS or other machine client"""
+    status = serializers.ChoiceField(choices=['pending', 'completed'], default='completed')
+
+    class Meta:
+        model = Payment
+        fields = [
+            'id', 'payment_number', 'invoice', 'reservation', 'guest', 'amount', 'currency', 'exchange_rate',
+            'base_amount', 'payment_method', 'payment_date', 'transaction_id', 'reference_number', 'status', 'notes',
+        ]
+        read_only_fields = ['id', 'payment_number', 'exchange_rate', 'base_amount']
+        extra_kwargs = {
+            'guest': {'required': False},
+            'payment_date': {'required': False},
+        }
+
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Amount must be positive.")
+        return value
+
+    def validate(self, attrs):
+        invoice, reservation = attrs.get('invoice'), attrs.get('reservation')
+        if not invoice and not reservation:
+            raise serializers.ValidationError("An invoice or a reservation is required.")
+        if invoice and reservation and invoice.reservation_id not in (None, reservation.id):
+            raise serializers.ValidationError("The invoice belongs to a different reservation.")
+        if invoice and invoice.status in ['cancelled', 'refunded']:
+            raise serializers.ValidationError(f"Invoice {invoice.invoice_number} is {invoice.status}.")
+        if 'guest' not in attrs:
+            attrs['guest_id'] = invoice.guest_id if invoice else reservation.guest_id
+        try:
+            get_exchange_rate(attrs.get('currency'), attrs.get('payment_date'))
+        except ExchangeRateMissing as exc:
+            raise serializers.ValidationError({'currency': str(exc)})
+        return attrs
+
+
+class PaymentBatchSerializer(serializers.Serializer):
+    payments = PaymentPostingSerializer(many=True, allow_empty=False, max_length=500)
+
+
+class OutletChargeSerializer(serializers.ModelSerializer):
+    """A charge sent by a point-of-sale outlet for a guest's room"""
+    charged_at = serializers.DateTimeField(default=timezone.now)
+
+    class Meta:
+        model = OutletCharge
+        fields = ['outlet', 'ticket_number', 'room_number', 'description', 'quantity', 'unit_price', 'charged_at']
+        # Uniqueness is settled when staging, a resent ticket is a duplicate rather than an error
+        validators = []
+
+    def validate_unit_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Unit price must be positive.")
+        return value
+
+    def validate_room_number(self, value):
+        return value.strip()
+
+
+class OutletChargeBatchSerializer(serializers.Serializer):
+    charges = OutletChargeSerializer(many=True, allow_empty=False, max_length=1000)
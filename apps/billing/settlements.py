@@ -0,0 +1,285 @@
+"""
+Settlement file reconciliation.
+
+A settlement CSV is read as a stream three times: the first pass only finds
+the settlement date window, the second matches lines by transaction id or
+reference and the third matches the rest by amount and date. Before
+matching, every candidate payment in the window is loaded in one query into
+hash indexes, so each line costs a few dictionary lookups. Memory is bounded by the payments in the window,
+not by the size of the file; exceptions and reconciled ids are flushed in
+chunks.
+"""
+import csv
+import io
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = 5000
+# Card settlements usually land a day or two after the payment
+DATE_TOLERANCE_DAYS = 3
+RECONCILABLE_STATUSES = ['completed', 'refunded']
+
+COLUMN_ALIASES = {
+    'transaction_id': ['transaction_id', 'txn_id', 'authorization', 'auth_code'],
+    'reference_number': ['reference_number', 'reference', 'ref', 'merchant_reference'],
+    'amount': ['amount', 'settled_amount', 'gross_amount'],
+    'settled_date': ['settled_date', 'settlement_date', 'date', 'transaction_date'],
+}
+DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%d.%m.%Y', '%Y%m%d']
+
+
+class SettlementFormatError(Exception):
+    pass
+
+
+def _parse_date(value):
+    value = value.strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date {value!r}")
+
+
+def _to_cents(value):
+    return int((Decimal(value.strip().replace(',', '')) * 100).to_integral_value())
+
+
+def _columns(header):
+    """Map canonical column names to positions in the file's header"""
+    normalized = [name.strip().lower().replace(' ', '_').replace('-', '_') for name in header]
+    columns = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[column] = normalized.index(alias)
+                break
+    missing = {'amount', 'settled_date'} - columns.keys()
+    if missing or not {'transaction_id', 'reference_number'} & columns.keys():
+        raise SettlementFormatError(
+            "Settlement file needs amount, settled date and a transaction id or reference column"
+        )
+    return columns
+
+
+def _read_lines(stream):
+    """Yield (line_number, transaction_id, reference, amount_cents, settled_date, error) per row"""
+    reader = csv.reader(stream)
+    columns = _columns(next(reader, []))
+    for line_number, row in enumerate(reader, start=2):
+        if not any(row):
+            continue
+        transaction_id = row[columns['transaction_id']].strip() if 'transaction_id' in columns else ''
+        reference = row[columns['reference_number']].strip() if 'reference_number' in columns else ''
+        try:
+            amount = _to_cents(row[columns['amount']])
+            settled_date = _parse_date(row[columns['settled_date']])
+        except (IndexError, ValueError, InvalidOperation) as exc:
+            yield line_number, transaction_id, reference, None, None, str(exc)
+            continue
+        yield line_number, transaction_id, reference, amount, settled_date, None
+
+
+def _date_window(stream):
+    first = last = None
+    for _, _, _, _, settled_date, error in _read_lines(stream):
+        if error:
+            continue
+        if first is None or settled_date < first:
+            first = settled_date
+        if last is None or settled_date > last:
+            last = settled_date
+    return first, last
+
+
+class PaymentIndex:
+    """Hash indexes over the candidate payments of a settlement window"""
+
+    def __init__(self, rows):
+        self.by_transaction = {}
+        self.by_reference = {}
+        self.by_amount_date = defaultdict(list)
+        self.amounts = {}
+        self.reconciled = set()
+        for payment_id, transaction_id, reference, amount, payment_date, reconciled_at in rows:
+            cents = int(amount * 100)
+            self.amounts[payment_id] = cents
+            if reconciled_at:
+                self.reconciled.add(payment_id)
+            if transaction_id:
+                self.by_transaction.setdefault(transaction_id, payment_id)
+            if reference:
+                self.by_reference.setdefault(reference, payment_id)
+            self.by_amount_date[(cents, payment_date.date().toordinal())].append(payment_id)
+
+    def exact(self, transaction_id, reference):
+        """Payment named by the line's transaction id or reference"""
+        payment_id = self.by_transaction.get(transaction_id) if transaction_id else None
+        if payment_id is None and reference:
+            payment_id = self.by_reference.get(reference)
+        return payment_id
+
+    def fuzzy(self, amount, settled_date, used):
+        """First unused payment with the same amount on or shortly before the settlement date"""
+        day = settled_date.toordinal()
+        for offset in range(DATE_TOLERANCE_DAYS + 1):
+            for payment_id in self.by_amount_date.get((amount, day - offset), ()):
+                if payment_id not in used and payment_id not in self.reconciled:
+                    return payment_id
+        return None
+
+
+def _candidate_payments(window_start, window_end):
+    from .models import Payment
+
+    start = timezone.make_aware(datetime.combine(window_start - timedelta(days=DATE_TOLERANCE_DAYS), datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(window_end + timedelta(days=1), datetime.min.time()))
+    # Served by the (status, payment_date) index
+    return Payment.objects.filter(
+        status__in=RECONCILABLE_STATUSES,
+        payment_date__gte=start,
+        payment_date__lt=end,
+    ).values_list(
+        'id', 'transaction_id', 'reference_number', 'amount', 'payment_date', 'reconciled_at'
+    ).iterator(chunk_size=FLUSH_SIZE)
+
+
+def reconcile_settlement(batch):
+    """Match a settlement batch's file against payments and record exceptions"""
+    started = time.monotonic()
+    batch.status = 'processing'
+    batch.save(update_fields=['status', 'updated_at'])
+
+    try:
+        with transaction.atomic():
+            window_start, window_end, counts = _match_file(batch)
+    except Exception as exc:
+        batch.status = 'failed'
+        batch.error = str(exc)
+        batch.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+
+    batch.window_start = window_start
+    batch.window_end = window_end
+    batch.lines = counts['lines']
+    batch.matched = counts['matched']
+    batch.exceptions = counts['exceptions']
+    batch.duration_ms = round((time.monotonic() - started) * 1000)
+    batch.status = 'completed'
+    batch.error = ''
+    batch.save()
+    logger.info("Settlement %s reconciled: %s", batch.pk, counts)
+    return counts
+
+
+def _match_file(batch):
+    from .models import Payment, SettlementException
+
+    # Re-running a batch starts from scratch
+    Payment.objects.filter(settlement_batch=batch).update(reconciled_at=None, settlement_batch=None)
+    batch.exception_lines.all().delete()
+
+    with batch.file.open('rb') as handle:
+        stream = io.TextIOWrapper(handle, encoding='utf-8-sig', newline='')
+        window_start, window_end = _date_window(stream)
+        stream.seek(0)
+
+        index = PaymentIndex(_candidate_payments(window_start, window_end) if window_start else [])
+        reconciled_at = timezone.now()
+        used = set()
+        pending_ids = []
+        pending_exceptions = []
+        counts = {'lines': 0, 'matched': 0, 'exceptions': 0}
+
+        def flush():
+            if pending_ids:
+                Payment.objects.filter(id__in=pending_ids).update(reconciled_at=reconciled_at, settlement_batch=batch)
+                pending_ids.clear()
+            if pending_exceptions:
+                SettlementException.objects.bulk_create(pending_exceptions, batch_size=1000)
+                pending_exceptions.clear()
+
+        def exception(reason, line_number=None, transaction_id='', reference='', amount=None, settled_date=None, payment_id=None):
+            counts['exceptions'] += 1
+            pending_exceptions.append(SettlementException(
+                batch=batch,
+                reason=reason,
+                line_number=line_number,
+                transaction_id=transaction_id[:100],
+                reference_number=reference[:100],
+                amount=Decimal(amount) / 100 if amount is not None else None,
+                settled_date=settled_date,
+                payment_id=payment_id,
+            ))
+
+        def settle(payment_id, line):
+            line_number, transaction_id, reference, amount, settled_date, _ = line
+            if payment_id in used:
+                exception('duplicate', line_number, transaction_id, reference, amount, settled_date, payment_id)
+            elif payment_id in index.reconciled:
+                exception('already_reconciled', line_number, transaction_id, reference, amount, settled_date, payment_id)
+            else:
+                used.add(payment_id)
+                pending_ids.append(payment_id)
+                counts['matched'] += 1
+            if len(pending_ids) >= FLUSH_SIZE or len(pending_exceptions) >= FLUSH_SIZE:
+                flush()
+
+        # Exact matches first, so a fuzzy match can never take a payment a later line names
+        for line in _read_lines(stream):
+            line_number, transaction_id, reference, amount, settled_date, error = line
+            counts['lines'] += 1
+            if error:
+                exception('invalid', line_number, transaction_id, reference)
+                continue
+            payment_id = index.exact(transaction_id, reference)
+            if payment_id is None:
+                continue
+            if index.amounts[payment_id] != amount:
+                # Seen in the file, so neither reported missing nor taken by a fuzzy match
+                used.add(payment_id)
+                exception('amount_mismatch', line_number, transaction_id, reference, amount, settled_date, payment_id)
+            else:
+                settle(payment_id, line)
+
+        # Then amount and date for the lines no identifier matched
+        stream.seek(0)
+        for line in _read_lines(stream):
+            line_number, transaction_id, reference, amount, settled_date, error = line
+            if error or index.exact(transaction_id, reference) is not None:
+                continue
+            payment_id = index.fuzzy(amount, settled_date, used)
+            if payment_id is None:
+                exception('unmatched', line_number, transaction_id, reference, amount, settled_date)
+            else:
+                settle(payment_id, line)
+
+        # Received payments in the window that the processor never settled
+        for payment_id, cents in index.amounts.items():
+            if payment_id not in used and payment_id not in index.reconciled:
+                exception('missing', amount=cents, payment_id=payment_id)
+                if len(pending_exceptions) >= FLUSH_SIZE:
+                    flush()
+        flush()
+
+    return window_start, window_end, counts
+
+
+def exceptions_csv_rows(batch):
+    """Yield the exceptions report of a batch as CSV rows"""
+    yield ['Reason', 'Line', 'Transaction ID', 'Reference', 'Amount', 'Settled date', 'Payment']
+    reasons = dict(batch.exception_lines.model.REASON_CHOICES)
+    for reason, line_number, transaction_id, reference, amount, settled_date, payment_number in batch.exception_lines.values_list(
+        'reason', 'line_number', 'transaction_id', 'reference_number', 'amount', 'settled_date', 'payment__payment_number'
+    ).iterator(chunk_size=FLUSH_SIZE):
+        yield [reasons[reason], line_number or '', transaction_id, reference, amount if amount is not None else '',
+               settled_date.isoformat() if settled_date else '', payment_number or '']
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete
+from apps.reservations.models import Reservation
+from apps.rooms.models import Room
+from .outlets import in_house_rooms_changed
+
+
+def invalidate_in_house_rooms(sender, **kwargs):
+    """Drop the cached room map on check-ins, check-outs and room moves"""
+    in_house_rooms_changed()
+
+
+for model in [Reservation, Room]:
+    post_save.connect(invalidate_in_house_rooms, sender=model, dispatch_uid=f'billing_{model.__name__}_save')
+    post_delete.connect(invalidate_in_house_rooms, sender=model, dispatch_uid=f'billing_{model.__name__}_delete')
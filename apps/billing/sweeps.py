@@ -0,0 +1,30 @@
+import logging
+import time
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def mark_overdue_invoices(as_of=None):
+    """Move pending invoices due before `as_of` to overdue"""
+    from apps.frontdesk.business_date import get_business_date
+    from .models import Invoice
+
+    started = time.monotonic()
+    if as_of is None:
+        as_of = get_business_date()
+
+    # Single UPDATE served by the (status, due_date, guest) index
+    updated = Invoice.objects.filter(status='pending', due_date__lt=as_of).update(
+        status='overdue',
+        updated_at=timezone.now(),
+    )
+
+    metrics = {
+        'as_of': as_of.isoformat(),
+        'overdue': updated,
+        'duration_ms': round((time.monotonic() - started) * 1000, 1),
+    }
+    logger.info("Overdue invoice sweep: %s", metrics)
+    return metrics
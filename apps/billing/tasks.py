@@ -0,0 +1,96 @@
+from celery import shared_task
+from .sweeps import mark_overdue_invoices
+
+
+@shared_task
+def sweep_overdue_invoices():
+    """Periodic overdue invoice transition"""
+    return mark_overdue_invoices()
+
+
+@shared_task
+def recompute_open_invoice_totals():
+    """Recompute totals of every open invoice, e.g. after a tax rate change"""
+    from .folios import OPEN_INVOICE_STATUSES, refresh_invoice_totals
+    from .models import Invoice
+
+    return refresh_invoice_totals(Invoice.objects.filter(status__in=OPEN_INVOICE_STATUSES))
+
+
+@shared_task
+def render_invoice_document(invoice_id):
+    """Render an invoice PDF if its content changed"""
+    from django.core.cache import cache
+    from .documents import document_path, ensure_document, invoice_payload
+    from .models import Invoice
+
+    invoice = Invoice.objects.select_related('guest', 'reservation').get(pk=invoice_id)
+    payload = invoice_payload(invoice)
+    try:
+        return ensure_document(payload)
+    finally:
+        cache.delete(f"documents:rendering:{document_path(payload)}")
+
+
+@shared_task
+def render_folio_document(reservation_id):
+    """Render a reservation folio PDF if its content changed"""
+    from django.core.cache import cache
+    from apps.reservations.models import Reservation
+    from .documents import document_path, ensure_document, folio_payload
+
+    reservation = Reservation.objects.select_related('guest', 'room').get(pk=reservation_id)
+    payload = folio_payload(reservation)
+    try:
+        return ensure_document(payload)
+    finally:
+        cache.delete(f"documents:rendering:{document_path(payload)}")
+
+
+@shared_task
+def render_departure_folios(checkout_date=None):
+    """Render the folios of every departure on a day (default: the business date)"""
+    from datetime import date
+    from apps.frontdesk.business_date import get_business_date
+    from .documents import render_checkout_folios
+
+    checkout_date = date.fromisoformat(checkout_date) if checkout_date else get_business_date()
+    return render_checkout_folios(checkout_date)
+
+
+@shared_task
+def reconcile_settlement_batch(batch_id):
+    """Reconcile an uploaded settlement file"""
+    from .models import SettlementBatch
+    from .settlements import reconcile_settlement
+
+    return reconcile_settlement(SettlementBatch.objects.get(pk=batch_id))
+
+
+@shared_task
+def purge_idempotency_keys():
+    """Delete stored API idempotency keys past their retention"""
+    from .idempotency import purge_expired
+
+    return purge_expired()
+
+
+@shared_task
+def drain_outlet_charges():
+    """Post every queued point-of-sale charge in micro-batches"""
+    from .outlets import drain_queue
+
+    return drain_queue()
+
+
+@shared_task
+def poll_outlet_charges():
+    """Stage dropped outlet files and drain anything left queued"""
+    from .models import OutletCharge
+    from .outlets import import_drop_files, schedule_drain
+
+    files, queued, _ = import_drop_files()
+    # Safety net for a drain lost between staging and the worker
+    if not queued and OutletCharge.objects.filter(status='queued').exists():
+        schedule_drain()
+    return files, queued
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'billing'
 
@@ -7,6 +7,13 @@ urlpatterns = [
     path('', views.invoice_list, name='invoice_list'),
     path('invoices/<int:invoice_id>/', views.invoice_detail, name='invoice_detail'),
     path('invoices/create/', views.create_invoice, name='create_invoice'),
+    path('invoices/<int:invoice_id>/pdf/', views.invoice_pdf, name='invoice_pdf'),
+    path('folios/<int:reservation_id>/pdf/', views.folio_pdf, name='folio_pdf'),
     path('payments/', views.payment_list, name='payment_list'),
     path('payments/create/', views.create_payment, name='create_payment'),
+    path('api/payments/', api.PaymentPostingView.as_view(), name='api_payments'),
+    path('api/outlet-charges/', api.OutletChargeView.as_view(), name='api_outlet_charges'),
+    path('ar-aging/', views.ar_aging, name='ar_aging'),
+    path('settlements/', views.settlement_list, name='settlement_list'),
+    path('settlements/<int:batch_id>/exceptions.csv', views.settlement_exceptions, name='settlement_exceptions'),
 ]
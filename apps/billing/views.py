@@ -3,8 +3,19 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q, Sum
-from .models import Invoice, Payment, InvoiceLineItem
-from .forms import InvoiceForm, PaymentForm
+import csv
+from datetime import datetime
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from apps.frontdesk.business_date import get_business_date
+from apps.reservations.models import Reservation
+from .aging import BUCKETS, GROUPINGS, aging_csv_rows, aging_rows, aging_totals, bucket_amounts
+from .models import Invoice, Payment, InvoiceLineItem, SettlementBatch
+from .forms import InvoiceForm, PaymentForm, SettlementUploadForm
+from .documents import content_hash, document_path, folio_payload, invoice_payload, request_render, serve_document
+from .settlements import exceptions_csv_rows
+from .tasks import reconcile_settlement_batch, render_folio_document, render_invoice_document
 
 @login_required
 def invoice_list(request):
@@ -107,3 +118,102 @@ def create_payment(request):
     
     context = {'form': form, 'title': 'Record Payment'}
     return render(request, 'billing/payment_form.html', context)
+
+def _document_response(request, payload, task, object_id):
+    """Serve a rendered PDF, or queue rendering and show a waiting page"""
+    digest = content_hash(payload)
+    path = document_path(payload, digest)
+    if not default_storage.exists(path):
+        request_render(payload, task, object_id)
+        # Eager task execution renders inline
+        if not default_storage.exists(path):
+            return render(request, 'billing/document_pending.html', {'title': payload['title']}, status=202)
+    return serve_document(request, path, digest, f"{payload['key']}.pdf")
+
+@login_required
+def invoice_pdf(request, invoice_id):
+    """Download invoice PDF"""
+    invoice = get_object_or_404(Invoice.objects.select_related('guest', 'reservation'), id=invoice_id)
+    return _document_response(request, invoice_payload(invoice), render_invoice_document, invoice.id)
+
+@login_required
+def folio_pdf(request, reservation_id):
+    """Download reservation folio PDF"""
+    reservation = get_object_or_404(Reservation.objects.select_related('guest', 'room'), id=reservation_id)
+    return _document_response(request, folio_payload(reservation), render_folio_document, reservation.id)
+
+@login_required
+def settlement_list(request):
+    """Upload settlement files and list reconciliation results"""
+    if request.method == 'POST':
+        form = SettlementUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            batch = form.save(commit=False)
+            batch.uploaded_by = request.user
+            batch.save()
+            transaction.on_commit(lambda: reconcile_settlement_batch.delay(batch.id))
+            messages.success(request, 'Settlement file uploaded, reconciliation has started.')
+            return redirect('billing:settlement_list')
+    else:
+        form = SettlementUploadForm()
+
+    paginator = Paginator(SettlementBatch.objects.select_related('uploaded_by'), 20)
+    context = {
+        'form': form,
+        'batches': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, 'billing/settlement_list.html', context)
+
+class _Echo:
+    """File-like object that hands each written CSV row straight back"""
+    def write(self, value):
+        return value
+
+@login_required
+def settlement_exceptions(request, batch_id):
+    """Download the exceptions report of a settlement batch as CSV"""
+    batch = get_object_or_404(SettlementBatch, id=batch_id)
+    writer = csv.writer(_Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in exceptions_csv_rows(batch)),
+        content_type='text/csv',
+    )
+    response['Content-Disposition'] = f'attachment; filename="settlement-{batch.id}-exceptions.csv"'
+    return response
+
+@login_required
+def ar_aging(request):
+    """Accounts receivable aging by guest or booking source"""
+    as_of = request.GET.get('as_of')
+    as_of = datetime.strptime(as_of, '%Y-%m-%d').date() if as_of else get_business_date()
+    group_by = request.GET.get('group_by')
+    if group_by not in GROUPINGS:
+        group_by = 'guest'
+
+    if request.GET.get('format') == 'csv':
+        writer = csv.writer(_Echo())
+        response = StreamingHttpResponse(
+            (writer.writerow(row) for row in aging_csv_rows(as_of, group_by)),
+            content_type='text/csv',
+        )
+        response['Content-Disposition'] = f'attachment; filename="ar-aging-{group_by}-{as_of.isoformat()}.csv"'
+        return response
+
+    paginator = Paginator(aging_rows(as_of, group_by), 50)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    totals = aging_totals(as_of)
+    sources = dict(Reservation.BOOKING_SOURCE_CHOICES)
+    for row in page_obj:
+        row['amounts'] = bucket_amounts(row)
+        if group_by == 'source':
+            row['label'] = sources.get(row['reservation__booking_source'], 'No reservation')
+
+    context = {
+        'rows': page_obj,
+        'buckets': [label for _, label in BUCKETS],
+        'totals': [totals[name] for name, _ in BUCKETS],
+        'grand_total': totals['total'],
+        'as_of': as_of,
+        'group_by': group_by,
+    }
+    return render(request, 'billing/ar_aging.html', context)
@@ -1,6 +1,7 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils.html import format_html
-from .models import HotelSettings, AuditLog
+from .models import HotelSettings, AuditLog, ExchangeRate
 
 
 @admin.register(HotelSettings)
@@ -11,7 +12,7 @@ class HotelSettingsAdmin(admin.ModelAdmin):
             'fields': ('hotel_name', 'hotel_address', 'hotel_phone', 'hotel_email', 'hotel_website')
         }),
         ('Business Settings', {
-            'fields': ('check_in_time', 'check_out_time', 'currency', 'tax_rate')
+            'fields': ('check_in_time', 'check_out_time', 'currency', 'tax_rate', 'no_show_fee_nights')
         }),
         ('Email Configuration', {
             'fields': ('smtp_host', 'smtp_port', 'smtp_username', 'smtp_password', 'smtp_use_tls'),
@@ -22,6 +23,14 @@ class HotelSettingsAdmin(admin.ModelAdmin):
         }),
     )
     
+    def save_model(self, request, obj, form, change):
+        # Saving bumps the settings version, so every worker reloads it
+        super().save_model(request, obj, form, change)
+        if change and 'tax_rate' in form.changed_data:
+            from apps.billing.tasks import recompute_open_invoice_totals
+
+            transaction.on_commit(recompute_open_invoice_totals.delay)
+    
     def has_add_permission(self, request):
         # Only allow one settings instance
         return not HotelSettings.objects.exists()
@@ -31,6 +40,13 @@ class HotelSettingsAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ['currency', 'rate_date', 'rate', 'updated_at']
+    list_filter = ['currency']
+    date_hierarchy = 'rate_date'
+
+
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ['user', 'action', 'model_name', 'object_repr', 'timestamp', 'ip_address']
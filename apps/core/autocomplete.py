@@ -0,0 +1,145 @@
+"""
+Autocomplete widgets for foreign keys to large tables.
+
+A plain Select renders an <option> for every row of the related table, so a
+reservation form lists every guest ever registered (and Room.__str__ reads
+each room's type on top). AutocompleteSelect renders only the selected value:
+a hidden input with its id and a search box showing its label, found with
+one primary key query. Options are fetched as the user types from the
+autocomplete endpoint, one keyset page at a time, through a lookup that
+filters on an indexed prefix (a guest search term range, a reservation or
+invoice number, a room number, a username). The form field stays a
+ModelChoiceField, whose validation of a submitted id is a single
+queryset.get(pk=...), so a form costs the same whatever the table sizes.
+
+Lookups are registered by name in _lookups(): the base queryset (with the
+relations the label reads), the keyset ordering, the search filter and the
+secondary line shown under each option.
+"""
+from collections import namedtuple
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.urls import reverse
+
+from .pagination import keyset_page
+
+PER_PAGE = 10
+
+Lookup = namedtuple('Lookup', ['queryset', 'ordering', 'search', 'detail'])
+
+
+def _search_guests(queryset, query):
+    from apps.guests.search import matching_terms
+
+    terms = matching_terms(query)
+    # Too short to narrow the term index: browse in name order instead
+    return queryset if terms is None else queryset.filter(id__in=terms.values('guest_id'))
+
+
+def _search_by_number(field):
+    """Prefix of a document number, or any search term of its guest"""
+    def search(queryset, query):
+        from apps.guests.search import matching_terms
+
+        condition = Q(**{f'{field}__startswith': query.upper()})
+        terms = matching_terms(query)
+        if terms is not None:
+            condition |= Q(guest_id__in=terms.values('guest_id'))
+        return queryset.filter(condition)
+    return search
+
+
+def _lookups():
+    """Lookup name -> Lookup"""
+    from django.contrib.auth.models import User
+    from apps.billing.models import Invoice
+    from apps.guests.models import Guest
+    from apps.reservations.models import Reservation
+    from apps.rooms.models import Room
+
+    return {
+        'guest': Lookup(
+            Guest.objects.only('id', 'title', 'first_name', 'middle_name', 'last_name', 'email'),
+            [('last_name', False), ('first_name', False), ('id', False)],
+            _search_guests,
+            lambda guest: guest.email,
+        ),
+        'room': Lookup(
+            Room.objects.select_related('room_type'),
+            [('number', False)],
+            lambda queryset, query: queryset.filter(number__startswith=query),
+            lambda room: f"Floor {room.floor} · {room.get_status_display()}",
+        ),
+        'reservation': Lookup(
+            Reservation.objects.select_related('guest'),
+            [('id', True)],
+            _search_by_number('reservation_number'),
+            lambda reservation: f"{reservation.check_in_date:%b %d} - {reservation.check_out_date:%b %d, %Y}",
+        ),
+        'invoice': Lookup(
+            Invoice.objects.select_related('guest'),
+            [('id', True)],
+            _search_by_number('invoice_number'),
+            lambda invoice: f"{invoice.get_status_display()} · Balance {invoice.balance_due}",
+        ),
+        'user': Lookup(
+            User.objects.all(),
+            [('username', False)],
+            lambda queryset, query: queryset.filter(username__startswith=query),
+            lambda user: user.get_full_name(),
+        ),
+    }
+
+
+def get_lookup(name):
+    """The lookup registered as `name`, raising KeyError for unknown ones"""
+    return _lookups()[name]
+
+
+def _option(lookup, obj):
+    return {'id': obj.pk, 'label': str(obj), 'detail': lookup.detail(obj)}
+
+
+def search_options(name, query='', cursor=None, per_page=PER_PAGE):
+    """One page of options matching `query` and the cursor of the next page"""
+    lookup = get_lookup(name)
+    queryset = lookup.queryset
+    query = query.strip()
+    if query:
+        queryset = lookup.search(queryset, query)
+    rows, next_cursor = keyset_page(queryset, lookup.ordering, cursor, per_page)
+    return [_option(lookup, obj) for obj in rows], next_cursor
+
+
+def selected_option(name, value):
+    """The option of a selected id, None if it is empty or does not exist"""
+    if value in (None, ''):
+        return None
+    lookup = get_lookup(name)
+    try:
+        obj = lookup.queryset.filter(pk=value).first()
+    except (ValueError, TypeError, ValidationError):
+        return None
+    return _option(lookup, obj) if obj else None
+
+
+class AutocompleteSelect(forms.Widget):
+    """Search box for a ModelChoiceField rendering only the selected option"""
+    template_name = 'core/widgets/autocomplete.html'
+
+    def __init__(self, lookup, attrs=None):
+        super().__init__(attrs)
+        self.lookup = lookup
+        # ModelChoiceField hands every widget its choices; they are never iterated here
+        self.choices = ()
+
+    def format_value(self, value):
+        return '' if value is None else str(value)
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['url'] = reverse('core:autocomplete', args=[self.lookup])
+        context['widget']['selected'] = selected_option(self.lookup, context['widget']['value'])
+        return context
@@ -0,0 +1,124 @@
+"""
+Exchange rates into the hotel currency, with a process-local cache.
+
+Amounts in a foreign currency are converted when they are posted and the
+rate is stored next to them, so reports sum converted amounts in SQL and
+later rate changes never rewrite history. Rates are looked up by
+(currency, date), using the latest rate on or before the date, and kept in
+memory per worker; saving a rate bumps a shared version stamp that workers
+check at most every VERSION_CHECK_SECONDS, like the hotel settings cache.
+"""
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+VERSION_KEY = 'core:exchange_rates:version'
+VERSION_CHECK_SECONDS = 5
+MAX_CACHED_RATES = 10000
+CENTS = Decimal('0.01')
+ONE = Decimal('1')
+
+_local = {'version': None, 'rates': {}, 'checked_at': 0.0}
+
+
+class ExchangeRateMissing(ValueError):
+    pass
+
+
+def bump_exchange_rates_version():
+    """Make every worker drop its cached rates on its next lookup"""
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, None)
+    _local['rates'] = {}
+    return version
+
+
+def exchange_rates_changed():
+    """Bump the version once the current transaction commits"""
+    _local['rates'] = {}
+    transaction.on_commit(bump_exchange_rates_version)
+
+
+def base_currency():
+    """The hotel currency every amount is converted into"""
+    from .hotel_settings import get_hotel_settings
+
+    return get_hotel_settings().currency.upper()
+
+
+def _rates():
+    now = time.monotonic()
+    if now - _local['checked_at'] >= VERSION_CHECK_SECONDS:
+        version = cache.get(VERSION_KEY) or bump_exchange_rates_version()
+        if _local['version'] != version:
+            _local['rates'] = {}
+            _local['version'] = version
+        _local['checked_at'] = now
+    if len(_local['rates']) > MAX_CACHED_RATES:
+        _local['rates'] = {}
+    return _local['rates']
+
+
+def get_exchange_rate(currency, on_date=None):
+    """Hotel currency units per unit of `currency` on a date"""
+    from .models import ExchangeRate
+
+    currency = (currency or '').upper()
+    if not currency or currency == base_currency():
+        return ONE
+    if on_date is None:
+        on_date = timezone.localdate()
+    elif isinstance(on_date, datetime):
+        on_date = timezone.localdate(on_date) if timezone.is_aware(on_date) else on_date.date()
+
+    rates = _rates()
+    key = (currency, on_date)
+    if key not in rates:
+        rate = ExchangeRate.objects.filter(currency=currency, rate_date__lte=on_date).order_by(
+            '-rate_date'
+        ).values_list('rate', flat=True).first()
+        if rate is None:
+            raise ExchangeRateMissing(f"No {currency} exchange rate on or before {on_date}")
+        rates[key] = rate
+    return rates[key]
+
+
+class LockedRateMixin:
+    """Remembers a loaded document's currency, so lock_exchange_rate can tell when it changes"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'currency' in field_names:
+            instance._loaded_currency = values[field_names.index('currency')]
+        return instance
+
+
+def lock_exchange_rate(instance, on_date):
+    """
+    Set currency and rate on a new document, or on a saved one whose currency
+    changed; otherwise saved documents keep the rate they were posted at.
+    Returns whether a saved document's rate was locked again.
+    """
+    if not instance.currency:
+        instance.currency = base_currency()
+    instance.currency = instance.currency.upper()
+    relocked = not instance._state.adding and instance.currency != getattr(
+        instance, '_loaded_currency', instance.currency
+    )
+    if instance._state.adding or relocked:
+        instance.exchange_rate = get_exchange_rate(instance.currency, on_date)
+        instance._loaded_currency = instance.currency
+    return relocked
+
+
+def to_base(amount, exchange_rate):
+    """Convert an amount at a stored rate, rounded to cents"""
+    if amount is None:
+        return None
+    return (amount * exchange_rate).quantize(CENTS)
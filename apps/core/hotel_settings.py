@@ -0,0 +1,59 @@
+"""
+Process-local cache of the HotelSettings singleton.
+
+Each worker keeps the loaded row in memory along with the version stamp it
+was loaded under. Saving the settings writes a new stamp to the shared
+cache; workers compare stamps at most every VERSION_CHECK_SECONDS and
+reload lazily on the next read after a change, so normal reads cost no
+database query.
+"""
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'core:hotel_settings:version'
+VERSION_CHECK_SECONDS = 5
+
+_local = {'version': None, 'settings': None, 'checked_at': 0.0}
+
+
+def bump_hotel_settings_version():
+    """Make every worker reload the settings on its next read"""
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, None)
+    _local['settings'] = None
+    return version
+
+
+def _default_settings():
+    from .models import HotelSettings
+
+    # Field defaults are declared as strings and floats, coerce them like a loaded row
+    settings = HotelSettings()
+    for field in HotelSettings._meta.concrete_fields:
+        setattr(settings, field.attname, field.to_python(getattr(settings, field.attname)))
+    return settings
+
+
+def get_hotel_settings():
+    """Get the hotel settings, or an unsaved default instance if none exist"""
+    from .models import HotelSettings
+
+    now = time.monotonic()
+    if _local['settings'] is not None and now - _local['checked_at'] < VERSION_CHECK_SECONDS:
+        return _local['settings']
+
+    version = cache.get(VERSION_KEY) or bump_hotel_settings_version()
+    if _local['settings'] is None or _local['version'] != version:
+        _local['settings'] = HotelSettings.objects.first() or _default_settings()
+        _local['version'] = version
+    _local['checked_at'] = now
+    return _local['settings']
+
+
+def hotel_settings_changed():
+    """Bump the version once the current transaction commits"""
+    _local['settings'] = None
+    transaction.on_commit(bump_hotel_settings_version)
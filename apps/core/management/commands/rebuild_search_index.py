@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.search import CHUNK_SIZE, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the global search documents of guests, reservations, rooms and invoices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Records indexed per transaction')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('Chunk size must be positive')
+
+        indexed = rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} records"))
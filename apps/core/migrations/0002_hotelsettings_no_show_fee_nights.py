@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotelsettings',
+            name='no_show_fee_nights',
+            field=models.PositiveIntegerField(default=1, help_text='Nights charged when a guest does not arrive'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_hotelsettings_no_show_fee_nights'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('currency', models.CharField(help_text='ISO 4217 code, e.g. EUR', max_length=3)),
+                ('rate_date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=6, help_text='Hotel currency units per one unit of this currency', max_digits=14)),
+            ],
+            options={
+                'ordering': ['-rate_date', 'currency'],
+                'unique_together': {('currency', 'rate_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:38
+
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE core_searchdocument_fts USING fts5("
+    "title, body, content='core_searchdocument', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER core_searchdocument_fts_insert AFTER INSERT ON core_searchdocument BEGIN "
+    "INSERT INTO core_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER core_searchdocument_fts_delete AFTER DELETE ON core_searchdocument BEGIN "
+    "INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER core_searchdocument_fts_update AFTER UPDATE ON core_searchdocument BEGIN "
+    "INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO core_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_update",
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_delete",
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_insert",
+    "DROP TABLE IF EXISTS core_searchdocument_fts",
+]
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX core_searchdocument_tsv ON core_searchdocument USING GIN (("
+    "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')))",
+]
+POSTGRESQL_REVERSE = [
+    "DROP INDEX IF EXISTS core_searchdocument_tsv",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+create_text_index = _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD})
+drop_text_index = _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_exchangerate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('guest', 'Guest'), ('reservation', 'Reservation'), ('room', 'Room'), ('invoice', 'Invoice')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('subtitle', models.CharField(blank=True, max_length=200)),
+                ('body', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+    ]
@@ -0,0 +1,98 @@
+from django.db import migrations
+
+CHUNK_SIZE = 2000
+TITLE_LENGTH = 200
+
+
+# Frozen copies of the document builders in apps.core.search as of this migration
+def _join(*parts):
+    return ' '.join(str(part) for part in parts if part)
+
+
+def _clip(text):
+    return text[:TITLE_LENGTH]
+
+
+def _full_name(guest):
+    return ' '.join(filter(None, [guest.title, guest.first_name, guest.middle_name, guest.last_name]))
+
+
+def _display_name(guest):
+    return f"{guest.first_name} {guest.last_name}"
+
+
+def guest_document(guest):
+    return {
+        'title': _clip(_full_name(guest)),
+        'subtitle': _clip(_join(guest.email, guest.phone)),
+        'body': _join(guest.first_name, guest.last_name, guest.email, guest.phone, guest.alternate_phone),
+    }
+
+
+def reservation_document(reservation):
+    guest = reservation.guest
+    room = reservation.room.number if reservation.room_id else ''
+    return {
+        'title': _clip(_join(reservation.reservation_number, _display_name(guest))),
+        'subtitle': _join(f"{reservation.check_in_date:%b %d, %Y} - {reservation.check_out_date:%b %d, %Y}",
+                          room and f"Room {room}"),
+        'body': _join(reservation.reservation_number, reservation.booking_reference, guest.first_name,
+                      guest.last_name, guest.email, room),
+    }
+
+
+def room_document(room):
+    return {
+        'title': f"Room {room.number}",
+        'subtitle': _join(room.room_type.name, f"Floor {room.floor}"),
+        'body': _join(room.number, room.room_type.name),
+    }
+
+
+def invoice_document(invoice):
+    guest = invoice.guest
+    reservation_number = invoice.reservation.reservation_number if invoice.reservation_id else ''
+    return {
+        'title': _clip(_join(invoice.invoice_number, _display_name(guest))),
+        'subtitle': _join(f"Issued {invoice.issue_date:%b %d, %Y}", reservation_number),
+        'body': _join(invoice.invoice_number, reservation_number, guest.first_name, guest.last_name, guest.email),
+    }
+
+
+def index_documents(apps, schema_editor):
+    """Build the search documents of existing records, so search works right after upgrading"""
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    sources = {
+        'guest': (guest_document, apps.get_model('guests', 'Guest').objects.all()),
+        'reservation': (reservation_document,
+                        apps.get_model('reservations', 'Reservation').objects.select_related('guest', 'room')),
+        'room': (room_document, apps.get_model('rooms', 'Room').objects.select_related('room_type')),
+        'invoice': (invoice_document,
+                    apps.get_model('billing', 'Invoice').objects.select_related('guest', 'reservation')),
+    }
+    for kind, (build, queryset) in sources.items():
+        SearchDocument.objects.filter(kind=kind).delete()
+        last_id = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_id).order_by('pk')[:CHUNK_SIZE])
+            if not chunk:
+                break
+            SearchDocument.objects.bulk_create(
+                SearchDocument(kind=kind, object_id=instance.pk, **build(instance)) for instance in chunk
+            )
+            last_id = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_searchdocument'),
+        ('billing', '0001_initial'),
+        ('guests', '0001_initial'),
+        ('reservations', '0001_initial'),
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_documents, migrations.RunPython.noop),
+    ]
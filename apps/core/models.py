@@ -25,6 +25,7 @@ class HotelSettings(models.Model):
     check_out_time = models.TimeField(default="11:00")
     currency = models.CharField(max_length=3, default="USD")
     tax_rate = models.DecimalField(max_digits=5, decimal_places=4, default=0.0875)
+    no_show_fee_nights = models.PositiveIntegerField(default=1, help_text="Nights charged when a guest does not arrive")
     
     # Email settings
     smtp_host = models.CharField(max_length=100, blank=True)
@@ -46,6 +47,71 @@ class HotelSettings(models.Model):
     
     def __str__(self):
         return self.hotel_name
+    
+    def save(self, *args, **kwargs):
+        from .hotel_settings import hotel_settings_changed
+
+        super().save(*args, **kwargs)
+        hotel_settings_changed()
+    
+    def delete(self, *args, **kwargs):
+        from .hotel_settings import hotel_settings_changed
+
+        result = super().delete(*args, **kwargs)
+        hotel_settings_changed()
+        return result
+
+
+class ExchangeRate(TimeStampedModel):
+    """Daily rate of a foreign currency in the hotel currency"""
+    currency = models.CharField(max_length=3, help_text="ISO 4217 code, e.g. EUR")
+    rate_date = models.DateField()
+    rate = models.DecimalField(max_digits=14, decimal_places=6,
+                               help_text="Hotel currency units per one unit of this currency")
+
+    class Meta:
+        ordering = ['-rate_date', 'currency']
+        unique_together = ['currency', 'rate_date']
+
+    def __str__(self):
+        return f"{self.currency} {self.rate_date}: {self.rate}"
+
+    def save(self, *args, **kwargs):
+        from .exchange_rates import exchange_rates_changed
+
+        self.currency = self.currency.upper()
+        super().save(*args, **kwargs)
+        exchange_rates_changed()
+
+    def delete(self, *args, **kwargs):
+        from .exchange_rates import exchange_rates_changed
+
+        result = super().delete(*args, **kwargs)
+        exchange_rates_changed()
+        return result
+
+
+class SearchDocument(models.Model):
+    """Denormalized text of a guest, reservation, room or invoice for global search"""
+    KIND_CHOICES = [
+        ('guest', 'Guest'),
+        ('reservation', 'Reservation'),
+        ('room', 'Room'),
+        ('invoice', 'Invoice'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=200)
+    subtitle = models.CharField(max_length=200, blank=True)
+    body = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['kind', 'object_id']
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
 
 
 class AuditLog(models.Model):
@@ -0,0 +1,131 @@
+"""
+Keyset pagination and cheap row counts for long lists.
+
+An OFFSET page has to read and discard every row before it, and Paginator
+also counts the whole filtered table on every request, so deep pages of a
+large table get slower and slower. A keyset page instead continues after
+the sort key of the last row it showed (an opaque cursor in the URL), which
+is one index range read whatever the depth. Counts shown next to such lists
+come from the planner's statistics on PostgreSQL for unfiltered tables, or
+are cached for a short while otherwise.
+"""
+import base64
+import hashlib
+import json
+from datetime import date, time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+
+COUNT_CACHE_SECONDS = 60
+
+
+def _attribute(obj, path):
+    for part in path.split('__'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _field(model, path):
+    parts = path.split('__')
+    for part in parts[:-1]:
+        model = model._meta.get_field(part).related_model
+    return model._meta.get_field(parts[-1])
+
+
+def _json_value(value):
+    # Full isoformat: DjangoJSONEncoder drops microseconds, which would skip rows
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(obj, ordering):
+    """Opaque cursor holding the sort key of `obj`"""
+    values = [_json_value(_attribute(obj, path)) for path, _ in ordering]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, model, ordering):
+    """Sort key values of a cursor, or None if it is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(ordering):
+            return None
+        return [_field(model, path).to_python(value) for (path, _), value in zip(ordering, values)]
+    except (ValueError, TypeError, AttributeError, ValidationError):
+        return None
+
+
+def _after(ordering, values):
+    """Rows sorting after a key: (a > x) or (a = x and b > y) ..., per direction"""
+    condition = Q()
+    equal = {}
+    for (path, descending), value in zip(ordering, values):
+        condition |= Q(**equal, **{f"{path}__{'lt' if descending else 'gt'}": value})
+        equal[path] = value
+    # A plain bound on the leading column lets the planner start an index range scan
+    (path, descending), value = ordering[0], values[0]
+    return Q(**{f"{path}__{'lte' if descending else 'gte'}": value}) & condition
+
+
+def keyset_page(queryset, ordering, cursor=None, per_page=25):
+    """One page of `queryset` and the cursor of the next page (None on the last)
+
+    `ordering` is a list of (field path, descending) ending in a unique
+    field, and the sort columns must not be null.
+    """
+    queryset = queryset.order_by(*[f"-{path}" if descending else path for path, descending in ordering])
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        if values is not None:
+            queryset = queryset.filter(_after(ordering, values))
+
+    rows = list(queryset[:per_page + 1])
+    next_cursor = encode_cursor(rows[per_page - 1], ordering) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+
+def segmented_keyset_page(segments, cursor=None, per_page=25):
+    """keyset_page over several (queryset, ordering) segments listed one after another
+
+    Lets rows whose sort key is null follow the sorted ones in a second
+    segment with its own ordering. The cursor is the segment index and the
+    cursor within that segment.
+    """
+    index, _, inner = (cursor or '').partition('.')
+    index = int(index) if index.isdigit() and int(index) < len(segments) else 0
+    inner = inner or None
+
+    rows = []
+    while True:
+        queryset, ordering = segments[index]
+        page, next_cursor = keyset_page(queryset, ordering, inner, per_page - len(rows))
+        rows.extend(page)
+        if next_cursor:
+            return rows, f"{index}.{next_cursor}"
+        index, inner = index + 1, None
+        if index == len(segments):
+            return rows, None
+        if len(rows) == per_page:
+            return rows, f"{index}." if segments[index][0].exists() else None
+
+
+def estimated_count(queryset):
+    """Row count for display: planner estimate or a short-lived cached count"""
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # reltuples is -1 (or 0 on old servers) until the table is first analyzed
+        if row and row[0] > 0:
+            return int(row[0])
+
+    sql, params = queryset.query.sql_with_params()
+    key = 'count:' + hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, COUNT_CACHE_SECONDS)
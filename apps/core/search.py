@@ -0,0 +1,211 @@
+"""
+Global search over guests, reservations, rooms and invoices.
+
+Every searchable record has one SearchDocument row holding its display title
+and the text it can be found by, kept current by model signals. The text is
+indexed by the database's own full-text engine, so a search is one ranked
+index lookup across all four kinds instead of an icontains scan per table:
+
+* SQLite: an external-content FTS5 table, synced by triggers, ranked by bm25.
+* PostgreSQL: a GIN index on the weighted tsvector of title and body, ranked
+  by ts_rank.
+
+Both are created by the core migration for the database in use. Any other
+database falls back to icontains on the document table. Every query word is
+matched as a prefix and all words must match.
+"""
+import re
+
+from django.db import connection
+from django.urls import reverse
+
+RESULT_LIMIT = 20
+CHUNK_SIZE = 2000
+# max_length of SearchDocument.title and subtitle
+TITLE_LENGTH = 200
+QUERY_WORD = re.compile(r'\w+')
+
+FTS_TABLE = 'core_searchdocument_fts'
+# Must match the expression of the core_searchdocument_tsv index
+PG_VECTOR = (
+    "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')"
+)
+
+DETAIL_URLS = {
+    'guest': 'guests:guest_detail',
+    'reservation': 'reservations:reservation_detail',
+    'room': 'rooms:room_detail',
+    'invoice': 'billing:invoice_detail',
+}
+
+
+def _join(*parts):
+    return ' '.join(str(part) for part in parts if part)
+
+
+def _clip(text):
+    """Cut a title or subtitle built from guest fields to its column, which PostgreSQL enforces"""
+    return text[:TITLE_LENGTH]
+
+
+def guest_document(guest):
+    return {
+        'title': _clip(guest.full_name),
+        'subtitle': _clip(_join(guest.email, guest.phone)),
+        'body': _join(guest.first_name, guest.last_name, guest.email, guest.phone, guest.alternate_phone),
+    }
+
+
+def reservation_document(reservation):
+    guest = reservation.guest
+    room = reservation.room.number if reservation.room_id else ''
+    return {
+        'title': _clip(_join(reservation.reservation_number, guest.display_name)),
+        'subtitle': _join(f"{reservation.check_in_date:%b %d, %Y} - {reservation.check_out_date:%b %d, %Y}",
+                          room and f"Room {room}"),
+        'body': _join(reservation.reservation_number, reservation.booking_reference, guest.first_name,
+                      guest.last_name, guest.email, room),
+    }
+
+
+def room_document(room):
+    return {
+        'title': f"Room {room.number}",
+        'subtitle': _join(room.room_type.name, f"Floor {room.floor}"),
+        'body': _join(room.number, room.room_type.name),
+    }
+
+
+def invoice_document(invoice):
+    guest = invoice.guest
+    reservation_number = invoice.reservation.reservation_number if invoice.reservation_id else ''
+    return {
+        'title': _clip(_join(invoice.invoice_number, guest.display_name)),
+        'subtitle': _join(f"Issued {invoice.issue_date:%b %d, %Y}", reservation_number),
+        'body': _join(invoice.invoice_number, reservation_number, guest.first_name, guest.last_name, guest.email),
+    }
+
+
+def _sources():
+    """Kind, document builder and a queryset loading what the builder reads"""
+    from apps.billing.models import Invoice
+    from apps.guests.models import Guest
+    from apps.reservations.models import Reservation
+    from apps.rooms.models import Room
+
+    return {
+        'guest': (guest_document, Guest.objects.all()),
+        'reservation': (reservation_document, Reservation.objects.select_related('guest', 'room')),
+        'room': (room_document, Room.objects.select_related('room_type')),
+        'invoice': (invoice_document, Invoice.objects.select_related('guest', 'reservation')),
+    }
+
+
+def index_object(kind, instance):
+    """Create or refresh the search document of one record"""
+    from .models import SearchDocument
+
+    build, _ = _sources()[kind]
+    SearchDocument.objects.update_or_create(kind=kind, object_id=instance.pk, defaults=build(instance))
+
+
+def index_objects(kind, queryset):
+    """Replace the documents of several records of one kind, e.g. after a bulk_create"""
+    from .models import SearchDocument
+
+    build, base = _sources()[kind]
+    instances = list(base.filter(pk__in=queryset.values('pk')))
+    SearchDocument.objects.filter(kind=kind, object_id__in=[instance.pk for instance in instances]).delete()
+    SearchDocument.objects.bulk_create(
+        SearchDocument(kind=kind, object_id=instance.pk, **build(instance)) for instance in instances
+    )
+
+
+def unindex_object(kind, object_id):
+    from .models import SearchDocument
+
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild_index(chunk_size=CHUNK_SIZE):
+    """Rebuild every search document, walking each table in primary key chunks"""
+    from django.db import transaction
+    from .models import SearchDocument
+
+    indexed = 0
+    for kind, (build, queryset) in _sources().items():
+        SearchDocument.objects.filter(kind=kind).delete()
+        last_id = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_id).order_by('pk')[:chunk_size])
+            if not chunk:
+                break
+            with transaction.atomic():
+                SearchDocument.objects.bulk_create(
+                    SearchDocument(kind=kind, object_id=instance.pk, **build(instance)) for instance in chunk
+                )
+            indexed += len(chunk)
+            last_id = chunk[-1].pk
+    return indexed
+
+
+def _words(query):
+    return QUERY_WORD.findall(query.lower())
+
+
+def _sqlite_search(words, limit):
+    # Quoted prefix terms, so words are never read as FTS5 operators
+    match = ' '.join(f'"{word}"*' for word in words)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT d.kind, d.object_id, d.title, d.subtitle FROM {FTS_TABLE} "
+            f"JOIN core_searchdocument d ON d.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) LIMIT %s",
+            [match, limit],
+        )
+        return cursor.fetchall()
+
+
+def _postgresql_search(words, limit):
+    tsquery = ' & '.join(f'{word}:*' for word in words)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT kind, object_id, title, subtitle FROM core_searchdocument, to_tsquery('simple', %s) query "
+            f"WHERE ({PG_VECTOR}) @@ query ORDER BY ts_rank({PG_VECTOR}, query) DESC LIMIT %s",
+            [tsquery, limit],
+        )
+        return cursor.fetchall()
+
+
+def _fallback_search(words, limit):
+    from .models import SearchDocument
+
+    documents = SearchDocument.objects.all()
+    for word in words:
+        documents = documents.filter(body__icontains=word)
+    return documents.order_by('title').values_list('kind', 'object_id', 'title', 'subtitle')[:limit]
+
+
+def search(query, limit=RESULT_LIMIT):
+    """Best matches of every kind, as dicts with kind, object id, title, subtitle and url"""
+    words = _words(query)
+    if not words:
+        return []
+
+    if connection.vendor == 'sqlite':
+        rows = _sqlite_search(words, limit)
+    elif connection.vendor == 'postgresql':
+        rows = _postgresql_search(words, limit)
+    else:
+        rows = _fallback_search(words, limit)
+
+    return [
+        {
+            'kind': kind,
+            'object_id': object_id,
+            'title': title,
+            'subtitle': subtitle,
+            'url': reverse(DETAIL_URLS[kind], args=[object_id]),
+        }
+        for kind, object_id, title, subtitle in rows
+    ]
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_save, post_delete
+from apps.billing.models import Invoice
+from apps.guests.models import Guest
+from apps.reservations.models import Reservation
+from apps.rooms.models import Room
+from .search import index_object, index_objects, unindex_object
+
+SEARCH_MODELS = {'guest': Guest, 'reservation': Reservation, 'room': Room, 'invoice': Invoice}
+
+
+def _guest_documents_changed(guest, created):
+    """Whether a saved guest's name or email differs from what was loaded"""
+    values = tuple(getattr(guest, field) for field in Guest.DOCUMENT_FIELDS)
+    changed = not created and values != getattr(guest, '_loaded_document_values', None)
+    guest._loaded_document_values = values
+    return changed
+
+
+def _index_handler(kind):
+    def handler(sender, instance, created=False, raw=False, **kwargs):
+        if raw:
+            return
+        index_object(kind, instance)
+        if kind == 'guest' and _guest_documents_changed(instance, created):
+            # Reservation and invoice documents carry the guest's name and email
+            index_objects('reservation', instance.reservations.all())
+            index_objects('invoice', instance.invoices.all())
+    return handler
+
+
+def _unindex_handler(kind):
+    def handler(sender, instance, **kwargs):
+        unindex_object(kind, instance.pk)
+    return handler
+
+
+# Renumbering a room leaves its reservations' documents stale until the next
+# rebuild_search_index, rather than rewriting them on every room status change
+for kind, model in SEARCH_MODELS.items():
+    post_save.connect(_index_handler(kind), sender=model, weak=False, dispatch_uid=f'core_search_{kind}_save')
+    post_delete.connect(_unindex_handler(kind), sender=model, weak=False, dispatch_uid=f'core_search_{kind}_delete')
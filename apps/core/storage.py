@@ -0,0 +1,185 @@
+"""
+Content-addressed file storage and file downloads.
+
+ContentAddressedStorage keeps one copy of each distinct upload. An upload is
+streamed in chunks into a temporary file while its SHA-256 is computed, then
+moved to <upload dir>/<aa>/<bb>/<sha256>, sharded by the first hex digits so
+no directory grows too large. If that blob already exists (a returning guest
+scanning the same passport again) the temporary copy is dropped and the new
+record points at the existing blob. Blobs are shared, so deleting a record
+never deletes its file; reclaim_blobs removes blobs no record references.
+
+serve_file answers downloads with an ETag, 304s and single byte ranges,
+streaming the file in chunks. When SENDFILE_BACKEND is set, the body is
+handed to the front-end server instead (X-Accel-Redirect for nginx,
+X-Sendfile for Apache or lighttpd), which also handles ranges itself.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.deconstruct import deconstructible
+from django.utils.http import content_disposition_header, parse_etags, quote_etag
+
+CHUNK_SIZE = 64 * 1024
+TEMP_DIR = 'tmp'
+DIGEST = re.compile(r'^[0-9a-f]{64}$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def blob_name(directory, digest):
+    return posixpath.join(directory, digest[:2], digest[2:4], digest)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage keeping one blob per distinct content, named by its SHA-256"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content is hashed in _save
+        return name
+
+    def _save(self, name, content):
+        temp_dir = self.path(TEMP_DIR)
+        os.makedirs(temp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    temp.write(chunk)
+            name = blob_name(posixpath.dirname(name), digest.hexdigest())
+            path = self.path(name)
+            if os.path.exists(path):
+                # Referenced again: restart the reclaim grace period
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                # Atomic on one file system, so concurrent identical uploads are harmless
+                os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+    def delete(self, name):
+        """Blobs may be shared between records; reclaim_blobs removes unreferenced ones"""
+
+    def digest(self, name):
+        """SHA-256 of a blob from its name, None for files stored before content addressing"""
+        digest = posixpath.basename(name or '')
+        return digest if DIGEST.match(digest) else None
+
+
+def reclaim_blobs(storage, directory, referenced, grace_seconds=24 * 60 * 60, dry_run=False):
+    """Delete blobs under `directory` that `referenced(names)` does not return
+
+    `referenced` is called with the blob names of one shard at a time and
+    returns the subset still in use. Blobs and leftover temporary files
+    younger than the grace period are kept, since a record may be about to
+    point at them.
+    """
+    cutoff = time.time() - grace_seconds
+    reclaimed = 0
+    root = storage.path(directory)
+    for shard in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        if not re.match(r'^[0-9a-f]{2}$', shard):
+            continue
+        names = []
+        for subshard in sorted(os.listdir(os.path.join(root, shard))):
+            for digest in os.listdir(os.path.join(root, shard, subshard)):
+                names.append(posixpath.join(directory, shard, subshard, digest))
+        in_use = referenced(names)
+        for name in names:
+            if name not in in_use and os.path.getmtime(storage.path(name)) < cutoff:
+                if not dry_run:
+                    os.remove(storage.path(name))
+                reclaimed += 1
+
+    temp_dir = storage.path(TEMP_DIR)
+    for temp in os.listdir(temp_dir) if os.path.isdir(temp_dir) else []:
+        path = os.path.join(temp_dir, temp)
+        if os.path.getmtime(path) < cutoff and not dry_run:
+            os.remove(path)
+    return reclaimed
+
+
+def _range_chunks(handle, start, length):
+    try:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
+
+def _sendfile(storage, name, content_type):
+    """A response the front-end server fills in, or None when offloading is off"""
+    backend = getattr(settings, 'SENDFILE_BACKEND', '')
+    if backend == 'xaccel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(settings.SENDFILE_URL_PREFIX + name)
+        return response
+    if backend == 'xsendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = storage.path(name)
+        return response
+    return None
+
+
+def serve_file(request, storage, name, etag, filename, content_type, disposition='inline'):
+    """Serve a stored file with ETag and single byte-range support"""
+    etag = quote_etag(etag)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    response = _sendfile(storage, name, content_type)
+    if response is None:
+        size = storage.size(name)
+        start, end = 0, size - 1
+        partial = False
+        if_range = request.headers.get('If-Range')
+        match = RANGE_RE.match(request.headers.get('Range', '').strip())
+        if match and (if_range is None or if_range == etag) and match.group(1) + match.group(2):
+            first, last = match.groups()
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            else:
+                start = max(size - int(last), 0)
+            if start > end or start >= size:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f"bytes */{size}"
+                return response
+            partial = True
+
+        handle = storage.open(name, 'rb')
+        if partial:
+            response = StreamingHttpResponse(_range_chunks(handle, start, end - start + 1), status=206,
+                                             content_type=content_type)
+            response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        else:
+            response = FileResponse(handle, content_type=content_type)
+        response['Content-Length'] = end - start + 1
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = content_disposition_header(disposition == 'attachment', filename)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
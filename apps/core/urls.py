@@ -6,6 +6,8 @@ app_name = 'core'
 urlpatterns = [
     path('', views.landing_page, name='landing_page'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('search/', views.global_search, name='global_search'),
+    path('autocomplete/<slug:lookup>/', views.autocomplete, name='autocomplete'),
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
     path('features/', views.features, name='features'),
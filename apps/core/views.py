@@ -1,12 +1,15 @@
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
 from django.db.models import Count, Sum, Q
 from apps.rooms.models import Room
 from apps.reservations.models import Reservation
 from apps.housekeeping.models import HousekeepingTask
 from apps.guests.models import Guest
 from apps.billing.models import Payment
+from apps.frontdesk.business_date import get_business_date
+from .autocomplete import search_options
+from .search import search
 
 def landing_page(request):
     """Landing page with parallax scrolling and SEO optimization"""
@@ -46,7 +49,7 @@ def features(request):
 @login_required
 def dashboard(request):
     """Enhanced dashboard with comprehensive metrics"""
-    today = timezone.now().date()
+    today = get_business_date()
     
     # Room statistics
     total_rooms = Room.objects.count()
@@ -75,17 +78,17 @@ def dashboard(request):
         status='checked_in'
     ).count()
     
-    # Revenue statistics
+    # Revenue statistics, in the hotel currency
     today_revenue = Payment.objects.filter(
         payment_date__date=today,
         status='completed'
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    ).aggregate(total=Sum('base_amount'))['total'] or 0
     
     month_revenue = Payment.objects.filter(
         payment_date__month=today.month,
         payment_date__year=today.year,
         status='completed'
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    ).aggregate(total=Sum('base_amount'))['total'] or 0
     
     # Housekeeping statistics
     pending_tasks = HousekeepingTask.objects.filter(status='pending').count()
@@ -142,3 +145,31 @@ def dashboard(request):
     }
     
     return render(request, 'core/dashboard.html', context)
+
+
+@login_required
+def global_search(request):
+    """Search guests, reservations, rooms and invoices from one box"""
+    query = request.GET.get('q', '').strip()
+    results = search(query) if query else []
+
+    context = {'results': results, 'query': query}
+    if request.htmx:
+        return render(request, 'core/partials/search_results.html', context)
+    return render(request, 'core/search_results.html', context)
+
+
+@login_required
+def autocomplete(request, lookup):
+    """Options for an autocomplete field: a dropdown page for HTMX, JSON otherwise"""
+    query = request.GET.get('q', '')
+    try:
+        options, next_cursor = search_options(lookup, query, request.GET.get('cursor'))
+    except KeyError:
+        raise Http404('Unknown lookup')
+
+    if request.htmx:
+        context = {'options': options, 'next_cursor': next_cursor, 'lookup': lookup, 'query': query,
+                   'more': bool(request.GET.get('cursor'))}
+        return render(request, 'core/partials/autocomplete_options.html', context)
+    return JsonResponse({'results': options, 'next_cursor': next_cursor})
@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import NightAudit
 
-# Register your models here.
+
+@admin.register(NightAudit)
+class NightAuditAdmin(admin.ModelAdmin):
+    list_display = ['business_date', 'status', 'room_charges_posted', 'no_shows_marked', 'invoices_marked_overdue', 'completed_at']
+    list_filter = ['status']
+    readonly_fields = ['business_date', 'status', 'current_step', 'room_charges_posted', 'tax_charges_posted',
+                       'no_shows_marked', 'invoices_marked_overdue', 'started_at', 'completed_at', 'error']
+    date_hierarchy = 'business_date'
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,27 @@
+from datetime import timedelta
+from django.core.cache import cache
+from django.utils import timezone
+
+BUSINESS_DATE_KEY = 'frontdesk:business_date'
+
+
+def get_business_date():
+    """Get the hotel's current business date (day after the last closed audit)"""
+    business_date = cache.get(BUSINESS_DATE_KEY)
+    if business_date is None:
+        from .models import NightAudit
+
+        last_closed = NightAudit.objects.filter(status='completed').order_by('-business_date').values_list(
+            'business_date', flat=True
+        ).first()
+        if last_closed is None:
+            # No audit has ever run, follow the calendar
+            return timezone.localdate()
+        business_date = last_closed + timedelta(days=1)
+        cache.set(BUSINESS_DATE_KEY, business_date, None)
+    return business_date
+
+
+def set_business_date(business_date):
+    """Publish a rolled business date to every worker"""
+    cache.set(BUSINESS_DATE_KEY, business_date, None)
@@ -0,0 +1,29 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from apps.frontdesk.night_audit import run_night_audit, NightAuditError
+
+
+class Command(BaseCommand):
+    help = 'Run the night audit for the current (or given) business date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Business date to close (YYYY-MM-DD), defaults to the current business date')
+        parser.add_argument('--skip-refresh', action='store_true', help='Do not rebuild snapshots and rate recommendations')
+
+    def handle(self, *args, **options):
+        business_date = None
+        if options['date']:
+            try:
+                business_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Date must be in YYYY-MM-DD format')
+
+        try:
+            audit = run_night_audit(business_date, refresh=not options['skip_refresh'])
+        except NightAuditError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {audit.business_date}: {audit.room_charges_posted} room charges, "
+            f"{audit.no_shows_marked} no-shows, {audit.invoices_marked_overdue} overdue invoices"
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NightAudit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business_date', models.DateField(unique=True)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', max_length=20)),
+                ('current_step', models.CharField(blank=True, max_length=50)),
+                ('room_charges_posted', models.PositiveIntegerField(default=0)),
+                ('tax_charges_posted', models.PositiveIntegerField(default=0)),
+                ('no_shows_marked', models.PositiveIntegerField(default=0)),
+                ('invoices_marked_overdue', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-business_date'],
+                'indexes': [models.Index(fields=['status', 'business_date'], name='frontdesk_n_status_f6c512_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,34 @@
 from django.db import models
+from apps.core.models import TimeStampedModel
 
-# Create your models here.
+
+class NightAudit(TimeStampedModel):
+    """Night audit run closing one business date"""
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    business_date = models.DateField(unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    current_step = models.CharField(max_length=50, blank=True)
+
+    # Results
+    room_charges_posted = models.PositiveIntegerField(default=0)
+    tax_charges_posted = models.PositiveIntegerField(default=0)
+    no_shows_marked = models.PositiveIntegerField(default=0)
+    invoices_marked_overdue = models.PositiveIntegerField(default=0)
+
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-business_date']
+        indexes = [
+            models.Index(fields=['status', 'business_date']),
+        ]
+
+    def __str__(self):
+        return f"Night audit {self.business_date} ({self.status})"
@@ -0,0 +1,192 @@
+"""
+Night audit: close a business date and roll to the next one.
+
+Every step is idempotent (charges carry a unique posting key, status
+changes are plain UPDATEs), so an audit that crashed part-way can simply be
+run again for the same business date.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.billing.sweeps import mark_overdue_invoices
+from apps.reservations.sweeps import mark_no_shows
+from .business_date import get_business_date, set_business_date
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = 'frontdesk:night_audit_lock'
+LOCK_TIMEOUT = 30 * 60
+CENTS = Decimal('0.01')
+
+
+class NightAuditError(Exception):
+    pass
+
+
+def post_room_charges(business_date):
+    """Post one night of room and tax charges for every in-house reservation"""
+    from apps.billing.folios import get_or_create_folios, hotel_tax_rate, refresh_invoice_totals
+    from apps.billing.ledger import post_line_items
+    from apps.billing.models import InvoiceLineItem
+    from apps.rates.pricing import get_rate_matrix
+    from apps.reservations.models import Reservation
+
+    in_house = list(Reservation.objects.filter(
+        status='checked_in',
+        check_in_date__lte=business_date,
+        check_out_date__gt=business_date,
+    ).values_list(
+        'id', 'guest_id', 'room_type_id', 'rate_plan_id', 'room_rate', 'check_out_date', 'room__number'
+    ))
+    if not in_house:
+        return 0, 0
+
+    tax_rate = hotel_tax_rate()
+
+    # One folio per reservation, due at check-out
+    folios = get_or_create_folios(
+        [(reservation_id, guest_id, check_out_date) for reservation_id, guest_id, _, _, _, check_out_date, _ in in_house],
+        issue_date=business_date,
+    )
+
+    already_posted = set(InvoiceLineItem.objects.filter(
+        invoice_id__in=folios.values(),
+        service_date=business_date,
+        posting_key__isnull=False,
+    ).values_list('posting_key', flat=True))
+
+    # Rate plan prices come from the shared rate cache, one lookup per plan
+    matrices = {}
+    line_items = []
+    room_charges = tax_charges = 0
+    for reservation_id, _, room_type_id, rate_plan_id, room_rate, _, room_number in in_house:
+        room_key = f"audit:{business_date.isoformat()}:room:{reservation_id}"
+        if room_key in already_posted:
+            continue
+
+        amount = room_rate
+        if rate_plan_id:
+            if rate_plan_id not in matrices:
+                matrices[rate_plan_id] = get_rate_matrix(rate_plan_id, business_date, business_date + timedelta(days=1))
+            prices = matrices[rate_plan_id]['room_types'].get(room_type_id)
+            if prices:
+                amount = prices['nightly'][0]
+        tax = (amount * tax_rate).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+        invoice_id = folios[reservation_id]
+        line_items.append(InvoiceLineItem(
+            invoice_id=invoice_id,
+            item_type='room',
+            description=f"Room charge - Room {room_number or '-'} ({business_date:%b %d, %Y})",
+            quantity=1,
+            unit_price=amount,
+            total_amount=amount,
+            service_date=business_date,
+            posting_key=room_key,
+        ))
+        line_items.append(InvoiceLineItem(
+            invoice_id=invoice_id,
+            item_type='tax',
+            description=f"Room tax ({business_date:%b %d, %Y})",
+            quantity=1,
+            unit_price=tax,
+            total_amount=tax,
+            service_date=business_date,
+            posting_key=f"audit:{business_date.isoformat()}:tax:{reservation_id}",
+        ))
+        room_charges += 1
+        tax_charges += 1
+
+    with transaction.atomic():
+        # Unique posting keys make a concurrent or repeated run a no-op
+        InvoiceLineItem.objects.bulk_create(line_items, batch_size=1000, ignore_conflicts=True)
+        post_line_items(InvoiceLineItem.objects.filter(
+            posting_key__in=[item.posting_key for item in line_items]
+        ), tax_rate)
+        refresh_invoice_totals(list(folios.values()), tax_rate)
+
+    return room_charges, tax_charges
+
+
+def refresh_downstream(business_date):
+    """Rebuild fact tables and caches that depend on the business date"""
+    from apps.billing.ledger import take_ledger_snapshot
+    from apps.rates.revenue import generate_rate_recommendations
+    from apps.reports.snapshots import take_snapshot, purge_snapshots
+
+    take_ledger_snapshot(business_date - timedelta(days=1))
+    take_snapshot(business_date)
+    purge_snapshots(business_date)
+    generate_rate_recommendations(business_date)
+
+
+def run_night_audit(business_date=None, refresh=True):
+    """Close a business date; safe to re-run after a crash"""
+    from .models import NightAudit
+
+    current_business_date = get_business_date()
+    if business_date is None:
+        if NightAudit.objects.filter(status='completed').exists():
+            business_date = current_business_date
+        else:
+            # The first audit closes the day that just ended, not the one that just began
+            business_date = timezone.localdate() - timedelta(days=1)
+    if business_date > current_business_date:
+        raise NightAuditError(f"Cannot close {business_date}, the current business date is {current_business_date}")
+    if business_date >= timezone.localdate():
+        raise NightAuditError(f"Cannot close {business_date} before the day is over")
+
+    if not cache.add(LOCK_KEY, business_date.isoformat(), LOCK_TIMEOUT):
+        raise NightAuditError("Another night audit is already running")
+
+    try:
+        audit, _ = NightAudit.objects.get_or_create(business_date=business_date)
+        if audit.status == 'completed':
+            return audit
+
+        audit.status = 'running'
+        audit.error = ''
+        audit.started_at = audit.started_at or timezone.now()
+        audit.save()
+
+        def step(name):
+            audit.current_step = name
+            audit.save(update_fields=['current_step', 'updated_at'])
+            logger.info("Night audit %s: %s", business_date, name)
+
+        try:
+            step('post_room_charges')
+            room_charges, tax_charges = post_room_charges(business_date)
+            audit.room_charges_posted += room_charges
+            audit.tax_charges_posted += tax_charges
+
+            # Sweeps treat dates before the next business date as past
+            next_date = business_date + timedelta(days=1)
+            step('mark_no_shows')
+            audit.no_shows_marked += mark_no_shows(next_date)['no_shows']
+
+            step('flag_overdue_invoices')
+            audit.invoices_marked_overdue += mark_overdue_invoices(next_date)['overdue']
+
+            step('roll_business_date')
+            audit.status = 'completed'
+            audit.current_step = ''
+            audit.completed_at = timezone.now()
+            audit.save()
+            set_business_date(business_date + timedelta(days=1))
+        except Exception as exc:
+            audit.status = 'failed'
+            audit.error = str(exc)
+            audit.save(update_fields=['status', 'error', 'updated_at'])
+            raise
+    finally:
+        cache.delete(LOCK_KEY)
+
+    if refresh:
+        refresh_downstream(business_date + timedelta(days=1))
+    return audit
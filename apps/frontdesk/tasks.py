@@ -0,0 +1,14 @@
+from celery import shared_task
+from .night_audit import run_night_audit
+
+
+@shared_task
+def night_audit():
+    """Close the current business date"""
+    audit = run_night_audit()
+    return {
+        'business_date': audit.business_date.isoformat(),
+        'room_charges_posted': audit.room_charges_posted,
+        'no_shows_marked': audit.no_shows_marked,
+        'invoices_marked_overdue': audit.invoices_marked_overdue,
+    }
@@ -7,10 +7,11 @@ from apps.reservations.models import Reservation
 from apps.rooms.models import Room
 from apps.guests.models import Guest
 from apps.housekeeping.models import HousekeepingTask
+from .business_date import get_business_date
 
 @login_required
 def frontdesk_dashboard(request):
-    today = timezone.now().date()
+    today = get_business_date()
     
     # Today's arrivals
     arrivals = Reservation.objects.filter(
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Guest, GuestDocument, GuestPreference
+from .models import Guest, GuestDocument, GuestPreference, GuestSegment, GuestStats
 
 
 class GuestDocumentInline(admin.TabularInline):
@@ -55,7 +55,7 @@ class GuestAdmin(admin.ModelAdmin):
     total_stays_display.short_description = 'Total Stays'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related('reservations')
+        return super().get_queryset(request).select_related('stats')
 
 
 @admin.register(GuestDocument)
@@ -67,3 +67,22 @@ class GuestDocumentAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('guest')
+
+
+@admin.register(GuestStats)
+class GuestStatsAdmin(admin.ModelAdmin):
+    list_display = ['guest', 'stays', 'nights', 'average_daily_rate', 'total_spent', 'last_stay', 'cancellations']
+    search_fields = ['guest__first_name', 'guest__last_name', 'guest__email']
+    readonly_fields = ['guest', 'stays', 'nights', 'room_revenue', 'average_daily_rate', 'total_spent',
+                       'first_stay', 'last_stay', 'cancellations', 'updated_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('guest')
+
+
+@admin.register(GuestSegment)
+class GuestSegmentAdmin(admin.ModelAdmin):
+    list_display = ['name', 'member_count', 'is_active', 'refreshed_at']
+    list_filter = ['is_active']
+    search_fields = ['name', 'description']
+    readonly_fields = ['member_count', 'refreshed_at', 'created_at', 'updated_at']
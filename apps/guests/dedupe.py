@@ -0,0 +1,269 @@
+"""
+Duplicate guest detection and merging.
+
+Comparing every pair of profiles is quadratic, so guests are first grouped
+into blocks sharing a key: normalized phone digits, the email local part,
+the phonetic (Soundex) last name with the first initial, or the date of
+birth with the last name's code. Only guests within a block are compared
+and scored; pairs scoring at least the threshold are joined into clusters
+with union-find. Oversized blocks (a placeholder phone number, a common
+surname) are skipped, keeping the work near-linear in the number of guests.
+
+A cluster is merged into its oldest profile: every foreign key to the
+duplicates is re-pointed with one UPDATE per table, blank survivor fields
+are filled from the duplicates, the duplicates are deleted and the
+survivor's stats recomputed, all in one transaction per cluster.
+"""
+import re
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+
+from .stats import refresh_guest_stats
+
+CHUNK_SIZE = 5000
+MAX_BLOCK_SIZE = 50
+MIN_SCORE = 0.6
+PHONE_DIGITS = 9
+NON_DIGIT = re.compile(r'\D+')
+NON_ALPHA = re.compile(r'[^a-z]+')
+
+# Fields copied from a duplicate when the survivor has no value
+FILLED_FIELDS = [
+    'title', 'middle_name', 'date_of_birth', 'gender', 'nationality', 'phone', 'alternate_phone',
+    'address_line1', 'address_line2', 'city', 'state_province', 'postal_code', 'country',
+    'id_type', 'id_number', 'id_expiry_date', 'preferred_room_type', 'dietary_restrictions',
+    'special_requests', 'emergency_contact_name', 'emergency_contact_phone',
+]
+
+Profile = namedtuple('Profile', ['first', 'last', 'last_code', 'email_local', 'phone', 'date_of_birth'])
+Cluster = namedtuple('Cluster', ['guest_ids', 'score'])
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def soundex(name):
+    """Four character Soundex code of a name, '' for names without letters"""
+    name = NON_ALPHA.sub('', (name or '').lower())
+    if not name:
+        return ''
+    code = name[0].upper()
+    previous = SOUNDEX_CODES.get(name[0], '')
+    for letter in name[1:]:
+        digit = SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code
+        if letter not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def email_local(email):
+    """Local part of an email, lowercased and without dots or a +tag"""
+    local = (email or '').lower().split('@')[0].split('+')[0]
+    return local.replace('.', '')
+
+
+def phone_key(phone):
+    """The last digits of a phone number, ignoring formatting and country code"""
+    digits = NON_DIGIT.sub('', phone or '')
+    return digits[-PHONE_DIGITS:] if len(digits) >= 7 else ''
+
+
+def profile(first_name, last_name, email, phone, date_of_birth):
+    return Profile(
+        first=NON_ALPHA.sub('', (first_name or '').lower()),
+        last=NON_ALPHA.sub('', (last_name or '').lower()),
+        last_code=soundex(last_name),
+        email_local=email_local(email),
+        phone=phone_key(phone),
+        date_of_birth=date_of_birth,
+    )
+
+
+def blocking_keys(p):
+    """Keys under which a profile is compared with others"""
+    keys = []
+    if p.phone:
+        keys.append(f"phone:{p.phone}")
+    if len(p.email_local) >= 3:
+        keys.append(f"email:{p.email_local}")
+    if p.last_code and p.first:
+        keys.append(f"name:{p.last_code}:{p.first[0]}")
+    if p.date_of_birth:
+        keys.append(f"dob:{p.date_of_birth.isoformat()}:{p.last_code}")
+    return keys
+
+
+def score_pair(a, b):
+    """Likelihood in [0, 1] that two profiles are the same person"""
+    score = 0.0
+    if a.email_local and a.email_local == b.email_local:
+        score += 0.35
+    if a.phone and a.phone == b.phone:
+        score += 0.35
+    if a.last_code and a.last_code == b.last_code:
+        # A phonetic match catches misspellings but counts less than the same name
+        score += 0.2 if a.last == b.last else 0.1
+        if a.first and a.first == b.first:
+            score += 0.1
+        elif a.first[:1] and a.first[:1] == b.first[:1]:
+            score += 0.05
+    if a.date_of_birth and b.date_of_birth:
+        score += 0.3 if a.date_of_birth == b.date_of_birth else -0.4
+    return max(0.0, min(score, 1.0))
+
+
+def _profiles(queryset):
+    """Guest id -> Profile, reading the table in primary key chunks"""
+    profiles = {}
+    last_id = 0
+    fields = ['id', 'first_name', 'last_name', 'email', 'phone', 'date_of_birth']
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values_list(*fields)[:CHUNK_SIZE])
+        if not rows:
+            return profiles
+        for guest_id, *values in rows:
+            profiles[guest_id] = profile(*values)
+        last_id = rows[-1][0]
+
+
+def _find(parents, guest_id):
+    while parents[guest_id] != guest_id:
+        parents[guest_id] = parents[parents[guest_id]]
+        guest_id = parents[guest_id]
+    return guest_id
+
+
+def find_duplicate_clusters(queryset=None, min_score=MIN_SCORE):
+    """Clusters of likely duplicate guests, best scoring first"""
+    from .models import Guest
+
+    profiles = _profiles(queryset if queryset is not None else Guest.objects.all())
+    blocks = defaultdict(list)
+    for guest_id, p in profiles.items():
+        for key in blocking_keys(p):
+            blocks[key].append(guest_id)
+
+    parents = {}
+    best = {}
+    compared = set()
+    for guest_ids in blocks.values():
+        if len(guest_ids) < 2 or len(guest_ids) > MAX_BLOCK_SIZE:
+            continue
+        for i, a in enumerate(guest_ids):
+            for b in guest_ids[i + 1:]:
+                if (a, b) in compared:
+                    continue
+                compared.add((a, b))
+                score = score_pair(profiles[a], profiles[b])
+                if score < min_score:
+                    continue
+                parents.setdefault(a, a)
+                parents.setdefault(b, b)
+                root_a, root_b = _find(parents, a), _find(parents, b)
+                if root_a != root_b:
+                    parents[max(root_a, root_b)] = min(root_a, root_b)
+                best[a] = max(best.get(a, 0), score)
+                best[b] = max(best.get(b, 0), score)
+
+    clusters = defaultdict(list)
+    for guest_id in parents:
+        clusters[_find(parents, guest_id)].append(guest_id)
+    return sorted(
+        (Cluster(sorted(ids), min(best[guest_id] for guest_id in ids)) for ids in clusters.values()),
+        key=lambda cluster: (-cluster.score, cluster.guest_ids[0]),
+    )
+
+
+def _guest_relations():
+    """Models whose `guest` foreign key moves to the surviving profile"""
+    from apps.billing.models import Invoice, LedgerEntry, Payment, Refund
+    from apps.reservations.models import Reservation, ReservationGuest
+    from .models import GuestDocument
+
+    return [Reservation, ReservationGuest, Invoice, Payment, Refund, LedgerEntry, GuestDocument]
+
+
+def _drop_repeated_listings(survivor_id, duplicate_ids):
+    """Delete duplicates' reservation listings that would repeat one of the merged guest"""
+    from apps.reservations.models import ReservationGuest
+
+    listed = set(ReservationGuest.objects.filter(guest_id=survivor_id).values_list('reservation_id', flat=True))
+    repeated, primary = [], set()
+    rows = ReservationGuest.objects.filter(guest_id__in=duplicate_ids).order_by('id')
+    for row_id, reservation_id, is_primary in rows.values_list('id', 'reservation_id', 'is_primary'):
+        if reservation_id in listed:
+            repeated.append(row_id)
+            if is_primary:
+                primary.add(reservation_id)
+        else:
+            listed.add(reservation_id)
+    ReservationGuest.objects.filter(pk__in=repeated).delete()
+    # The listing that stays keeps the primary flag of any it absorbed
+    ReservationGuest.objects.filter(
+        guest_id__in=[survivor_id, *duplicate_ids], reservation_id__in=primary,
+    ).update(is_primary=True)
+
+
+def merge_guests(survivor, duplicate_ids):
+    """Merge duplicate profiles into `survivor` and delete them"""
+    from apps.billing.models import Invoice
+    from apps.core.search import index_objects
+    from apps.reservations.models import Reservation
+    from .models import Guest, GuestPreference
+
+    duplicate_ids = [guest_id for guest_id in duplicate_ids if guest_id != survivor.pk]
+    if not duplicate_ids:
+        return survivor
+
+    with transaction.atomic():
+        survivor = Guest.objects.select_for_update().get(pk=survivor.pk)
+        duplicates = list(Guest.objects.select_for_update().filter(pk__in=duplicate_ids).order_by('id'))
+        duplicate_ids = [duplicate.pk for duplicate in duplicates]
+
+        _drop_repeated_listings(survivor.pk, duplicate_ids)
+        moved_reservations = list(Reservation.objects.filter(guest_id__in=duplicate_ids).values_list('id', flat=True))
+        moved_invoices = list(Invoice.objects.filter(guest_id__in=duplicate_ids).values_list('id', flat=True))
+        # Queryset updates skip save(), so append-only ledger entries only change owner
+        for model in _guest_relations():
+            model.objects.filter(guest_id__in=duplicate_ids).update(guest_id=survivor.pk)
+
+        if not GuestPreference.objects.filter(guest_id=survivor.pk).exists():
+            preference = GuestPreference.objects.filter(guest_id__in=duplicate_ids).order_by('-updated_at').first()
+            if preference:
+                GuestPreference.objects.filter(pk=preference.pk).update(guest_id=survivor.pk)
+
+        for duplicate in duplicates:
+            for field in FILLED_FIELDS:
+                if not getattr(survivor, field) and getattr(duplicate, field):
+                    setattr(survivor, field, getattr(duplicate, field))
+            survivor.is_vip = survivor.is_vip or duplicate.is_vip
+            if duplicate.is_blacklisted and not survivor.is_blacklisted:
+                survivor.is_blacklisted = True
+                survivor.blacklist_reason = duplicate.blacklist_reason
+            survivor.marketing_consent = survivor.marketing_consent or duplicate.marketing_consent
+        merged = ', '.join(duplicate.email for duplicate in duplicates)
+        survivor.notes = '\n'.join(filter(None, [survivor.notes, f"Merged duplicate profiles: {merged}"]))
+
+        Guest.objects.filter(pk__in=duplicate_ids).delete()
+        survivor.save()
+        # The moves skipped signals, so the documents still carry the duplicates' names
+        index_objects('reservation', Reservation.objects.filter(pk__in=moved_reservations))
+        index_objects('invoice', Invoice.objects.filter(pk__in=moved_invoices))
+        refresh_guest_stats([survivor.pk])
+    return survivor
+
+
+def merge_cluster(cluster):
+    """Merge a cluster into its oldest profile"""
+    from .models import Guest
+
+    survivor = Guest.objects.get(pk=cluster.guest_ids[0])
+    return merge_guests(survivor, cluster.guest_ids[1:])
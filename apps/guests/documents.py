@@ -0,0 +1,76 @@
+"""
+Guest document downloads and blob reclaim.
+
+Document files live in content-addressed storage (see apps.core.storage):
+one blob per distinct scan, shared by every record that uploaded it. A blob
+becomes garbage when the last record pointing at it is deleted or changed,
+which the nightly reclaim job finds by checking each shard's blob names
+against the document table in a few indexed queries.
+"""
+import logging
+
+from apps.core.storage import reclaim_blobs, serve_file
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = 'guest_documents'
+RECLAIM_GRACE_SECONDS = 24 * 60 * 60
+# Keeps each reference query under SQLite's limit on query parameters
+NAMES_PER_QUERY = 900
+# Scan types shown in the browser, by their leading bytes; anything else is a download
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'%PDF-', 'application/pdf'),
+]
+INLINE_TYPES = {content_type for _, content_type in SIGNATURES}
+DOWNLOAD_TYPE = 'application/octet-stream'
+
+
+def sniff_content_type(content):
+    """Type of an uploaded file from its first bytes, never from the browser's header"""
+    position = content.tell()
+    content.seek(0)
+    head = content.read(16)
+    content.seek(position)
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return DOWNLOAD_TYPE
+
+
+def serve_guest_document(request, document):
+    """Stream a document file, with ranges and an ETag of its content hash"""
+    storage = document.file.storage
+    digest = storage.digest(document.file.name)
+    if digest is None:
+        # Uploaded before content addressing: identify the version by size and age
+        digest = f"{storage.size(document.file.name)}-{int(document.updated_at.timestamp())}"
+    # Anything that could run script on our origin (HTML, SVG) is only ever downloaded
+    if document.content_type in INLINE_TYPES:
+        content_type, disposition = document.content_type, 'inline'
+    else:
+        content_type, disposition = DOWNLOAD_TYPE, 'attachment'
+    return serve_file(request, storage, document.file.name, digest, document.download_name,
+                      content_type, disposition)
+
+
+def _referenced(names):
+    from .models import GuestDocument
+
+    in_use = set()
+    for start in range(0, len(names), NAMES_PER_QUERY):
+        in_use.update(GuestDocument.objects.filter(
+            file__in=names[start:start + NAMES_PER_QUERY]
+        ).values_list('file', flat=True))
+    return in_use
+
+
+def reclaim_document_blobs(grace_seconds=RECLAIM_GRACE_SECONDS, dry_run=False):
+    """Delete document blobs no guest document references, returning how many"""
+    from .models import GuestDocument
+
+    storage = GuestDocument._meta.get_field('file').storage
+    reclaimed = reclaim_blobs(storage, UPLOAD_DIR, _referenced, grace_seconds, dry_run)
+    logger.info("Guest document blobs reclaimed: %s", reclaimed)
+    return reclaimed
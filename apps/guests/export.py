@@ -0,0 +1,179 @@
+"""
+Streaming guest exports.
+
+Exports for CRM syncs, marketing lists and GDPR requests can cover every
+guest, so nothing here builds a list of model instances: guests are read as
+plain value tuples with iterator(chunk_size=...), each row is encoded as one
+CSV or JSON line as soon as it is read, and gzip output is compressed
+incrementally as the lines go by. A StreamingHttpResponse or a file written
+line by line therefore holds one chunk of rows at a time, whatever the row
+count. An export can be limited to the members of campaign segments, read a
+slice of ids at a time.
+
+A GDPR bundle is one JSON document with everything held about a guest:
+the profile, stats, preferences, reservations, invoices with their items and
+payments, and identity document records. Related rows are streamed the same
+way, so a guest with years of history does not need to fit in memory either.
+"""
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+CHUNK_SIZE = 2000
+ID_CHUNK_SIZE = 900
+FORMATS = ['csv', 'jsonl']
+
+# Column name -> field path; stats columns are blank for guests without a stats row
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'title': 'title',
+    'first_name': 'first_name',
+    'middle_name': 'middle_name',
+    'last_name': 'last_name',
+    'email': 'email',
+    'phone': 'phone',
+    'alternate_phone': 'alternate_phone',
+    'date_of_birth': 'date_of_birth',
+    'gender': 'gender',
+    'nationality': 'nationality',
+    'address_line1': 'address_line1',
+    'address_line2': 'address_line2',
+    'city': 'city',
+    'state_province': 'state_province',
+    'postal_code': 'postal_code',
+    'country': 'country',
+    'preferred_room_type': 'preferred_room_type',
+    'marketing_consent': 'marketing_consent',
+    'newsletter_subscription': 'newsletter_subscription',
+    'is_vip': 'is_vip',
+    'is_blacklisted': 'is_blacklisted',
+    'created_at': 'created_at',
+    'stays': 'stats__stays',
+    'nights': 'stats__nights',
+    'room_revenue': 'stats__room_revenue',
+    'average_daily_rate': 'stats__average_daily_rate',
+    'total_spent': 'stats__total_spent',
+    'first_stay': 'stats__first_stay',
+    'last_stay': 'stats__last_stay',
+    'cancellations': 'stats__cancellations',
+}
+DEFAULT_COLUMNS = ['id', 'first_name', 'last_name', 'email', 'phone', 'country',
+                   'marketing_consent', 'newsletter_subscription', 'is_vip', 'stays', 'total_spent', 'last_stay']
+
+
+def parse_columns(value):
+    """Column names from a comma separated string, raising ValueError on unknown ones"""
+    columns = [column.strip() for column in (value or '').split(',') if column.strip()]
+    unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return columns or DEFAULT_COLUMNS
+
+
+def filter_guests(queryset, marketing_consent=None, newsletter_subscription=None, is_vip=None,
+                  min_stays=None, min_spent=None, stayed_since=None):
+    """Narrow a guest queryset; None leaves a filter off"""
+    if marketing_consent is not None:
+        queryset = queryset.filter(marketing_consent=marketing_consent)
+    if newsletter_subscription is not None:
+        queryset = queryset.filter(newsletter_subscription=newsletter_subscription)
+    if is_vip is not None:
+        queryset = queryset.filter(is_vip=is_vip)
+    if min_stays:
+        queryset = queryset.filter(stats__stays__gte=min_stays)
+    if min_spent:
+        queryset = queryset.filter(stats__total_spent__gte=min_spent)
+    if stayed_since:
+        queryset = queryset.filter(stats__last_stay__gte=stayed_since)
+    return queryset
+
+
+def guest_rows(queryset, columns, chunk_size=CHUNK_SIZE, guest_ids=None):
+    """Value tuples of the selected columns, fetched chunk_size rows at a time
+
+    `guest_ids`, an ascending sequence such as a segment's members, limits
+    the export to those guests.
+    """
+    paths = [EXPORT_COLUMNS[column] for column in columns]
+    rows = queryset.order_by('id').values_list(*paths)
+    if guest_ids is None:
+        return rows.iterator(chunk_size=chunk_size)
+    return _member_rows(rows, guest_ids)
+
+
+def _member_rows(rows, guest_ids):
+    # A slice of ids per query keeps under SQLite's limit on query parameters
+    for start in range(0, len(guest_ids), ID_CHUNK_SIZE):
+        yield from rows.filter(id__in=[int(guest_id) for guest_id in guest_ids[start:start + ID_CHUNK_SIZE]])
+
+
+class _Echo:
+    """File-like object that hands each written CSV row straight back"""
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _json(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def jsonl_lines(rows, columns):
+    for row in rows:
+        yield _json(dict(zip(columns, row))) + '\n'
+
+
+def export_lines(queryset, columns, fmt='csv', chunk_size=CHUNK_SIZE, guest_ids=None):
+    """Text lines of a guest export in `fmt`"""
+    encode = csv_lines if fmt == 'csv' else jsonl_lines
+    return encode(guest_rows(queryset, columns, chunk_size, guest_ids), columns)
+
+
+def gzip_stream(lines):
+    """Gzip compress text lines on the fly, yielding compressed bytes as they are produced"""
+    # wbits=31 writes the gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for line in lines:
+        data = compressor.compress(line.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _records(queryset, chunk_size=CHUNK_SIZE):
+    """A JSON array streamed element by element"""
+    yield '['
+    for index, row in enumerate(queryset.values().iterator(chunk_size=chunk_size)):
+        yield (',' if index else '') + _json(row)
+    yield ']'
+
+
+def gdpr_bundle(guest, chunk_size=CHUNK_SIZE):
+    """Everything held about a guest as one JSON document, in pieces"""
+    from apps.billing.models import Invoice, InvoiceLineItem, Payment, Refund
+    from apps.reservations.models import Reservation
+    from .models import Guest, GuestDocument, GuestPreference, GuestStats
+
+    sections = [
+        ('reservations', Reservation.objects.filter(guest=guest).order_by('id')),
+        ('invoices', Invoice.objects.filter(guest=guest).order_by('id')),
+        ('invoice_items', InvoiceLineItem.objects.filter(invoice__guest=guest).order_by('id')),
+        ('payments', Payment.objects.filter(guest=guest).order_by('id')),
+        ('refunds', Refund.objects.filter(guest=guest).order_by('id')),
+        ('documents', GuestDocument.objects.filter(guest=guest).order_by('id')),
+    ]
+    yield '{"profile":' + _json(Guest.objects.filter(pk=guest.pk).values().get())
+    yield ',"stats":' + _json(GuestStats.objects.filter(guest=guest).values().first())
+    yield ',"preferences":' + _json(GuestPreference.objects.filter(guest=guest).values().first())
+    for name, queryset in sections:
+        yield f',"{name}":'
+        yield from _records(queryset, chunk_size)
+    yield '}\n'
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Guest
+from .models import Guest, GuestDocument
 
 class GuestForm(forms.ModelForm):
     class Meta:
@@ -85,3 +85,24 @@ class GuestForm(forms.ModelForm):
                 'class': 'h-4 w-4 text-primary-600 focus:ring-primary-500 border-gray-300 rounded'
             }),
         }
+
+
+class GuestDocumentForm(forms.ModelForm):
+    class Meta:
+        model = GuestDocument
+        fields = ['document_type', 'document_number', 'expiry_date', 'file']
+        widgets = {
+            'document_type': forms.Select(attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
+            }),
+            'document_number': forms.TextInput(attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
+            }),
+            'expiry_date': forms.DateInput(attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
+                'type': 'date'
+            }),
+            'file': forms.ClearableFileInput(attrs={
+                'class': 'mt-1 block w-full text-sm text-gray-700 dark:text-gray-300'
+            }),
+        }
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.guests.dedupe import MIN_SCORE, find_duplicate_clusters, merge_cluster
+from apps.guests.models import Guest
+
+
+class Command(BaseCommand):
+    help = 'Find clusters of duplicate guest profiles and optionally merge them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-score', type=float, default=MIN_SCORE, help='Pair score needed to cluster two guests')
+        parser.add_argument('--merge', action='store_true', help='Merge each cluster into its oldest profile')
+
+    def handle(self, *args, **options):
+        if not 0 < options['min_score'] <= 1:
+            raise CommandError('Minimum score must be between 0 and 1')
+
+        clusters = find_duplicate_clusters(min_score=options['min_score'])
+        failed = []
+        for cluster in clusters:
+            names = Guest.objects.filter(pk__in=cluster.guest_ids).order_by('id').values_list('id', 'first_name', 'last_name', 'email')
+            self.stdout.write(f"{cluster.score:.2f}  " + ' | '.join(f"#{pk} {first} {last} <{email}>" for pk, first, last, email in names))
+            if options['merge']:
+                try:
+                    merge_cluster(cluster)
+                except Exception as exc:
+                    # Each merge is its own transaction; carry on with the other clusters
+                    failed.append(cluster)
+                    self.stderr.write(self.style.ERROR(f"Could not merge {cluster.guest_ids}: {exc}"))
+
+        merged = [cluster for cluster in clusters if cluster not in failed]
+        action = 'Merged' if options['merge'] else 'Found'
+        duplicates = sum(len(cluster.guest_ids) - 1 for cluster in merged)
+        self.stdout.write(self.style.SUCCESS(f"{action} {len(merged)} clusters ({duplicates} duplicate profiles)"))
+        if failed:
+            raise CommandError(f"{len(failed)} clusters could not be merged")
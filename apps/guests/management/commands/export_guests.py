@@ -0,0 +1,82 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.guests.export import (
+    CHUNK_SIZE, DEFAULT_COLUMNS, EXPORT_COLUMNS, FORMATS, export_lines, filter_guests, gdpr_bundle,
+    gzip_stream, parse_columns,
+)
+from apps.guests.models import Guest, GuestSegment
+from apps.guests.segments import bitmap_ids, intersect
+
+
+def _flag(value):
+    return {'yes': True, 'no': False}[value] if value else None
+
+
+class Command(BaseCommand):
+    help = 'Stream guests to a CSV or JSON lines file, or write the GDPR bundle of one guest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='File to write, standard output if omitted')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--columns', help=f"Comma separated, default {','.join(DEFAULT_COLUMNS)}; "
+                                              f"available: {','.join(EXPORT_COLUMNS)}")
+        parser.add_argument('--gzip', action='store_true', help='Compress the output')
+        parser.add_argument('--marketing-consent', choices=['yes', 'no'])
+        parser.add_argument('--newsletter', choices=['yes', 'no'])
+        parser.add_argument('--vip', choices=['yes', 'no'])
+        parser.add_argument('--min-stays', type=int, help='Only guests with at least this many stays')
+        parser.add_argument('--min-spent', type=int, help='Only guests who paid at least this much')
+        parser.add_argument('--stayed-since', type=date.fromisoformat, help='Only guests with a stay ending on or after YYYY-MM-DD')
+        parser.add_argument('--segment', action='append', default=[], help='Only members of this segment (repeat to intersect)')
+        parser.add_argument('--gdpr', type=int, metavar='GUEST_ID', help='Write the GDPR bundle of one guest instead')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('Chunk size must be positive')
+
+        if options['gdpr']:
+            guest = Guest.objects.filter(pk=options['gdpr']).first()
+            if guest is None:
+                raise CommandError(f"Guest {options['gdpr']} does not exist")
+            lines = gdpr_bundle(guest, options['chunk_size'])
+        else:
+            try:
+                columns = parse_columns(options['columns'])
+            except ValueError as e:
+                raise CommandError(e)
+            guests = filter_guests(
+                Guest.objects.all(),
+                marketing_consent=_flag(options['marketing_consent']),
+                newsletter_subscription=_flag(options['newsletter']),
+                is_vip=_flag(options['vip']),
+                min_stays=options['min_stays'],
+                min_spent=options['min_spent'],
+                stayed_since=options['stayed_since'],
+            )
+            guest_ids = None
+            if options['segment']:
+                segments = list(GuestSegment.objects.filter(name__in=options['segment']))
+                missing = set(options['segment']) - {segment.name for segment in segments}
+                if missing:
+                    raise CommandError(f"Unknown segments: {', '.join(sorted(missing))}")
+                guest_ids = bitmap_ids(intersect(segments))
+            lines = export_lines(guests, columns, options['format'], options['chunk_size'], guest_ids)
+
+        if options['gzip']:
+            output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+            chunks = gzip_stream(lines)
+        else:
+            output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+            chunks = lines
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Exported to {options['output']}"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.guests.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the guest autocomplete index in primary key chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Guests indexed per transaction')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('Chunk size must be positive')
+
+        indexed = rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} guests"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.guests.documents import RECLAIM_GRACE_SECONDS, reclaim_document_blobs
+
+
+class Command(BaseCommand):
+    help = 'Delete stored guest document files that no document references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=RECLAIM_GRACE_SECONDS / 3600,
+                            help='Keep unreferenced files younger than this')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the files that would be deleted')
+
+    def handle(self, *args, **options):
+        if options['grace_hours'] < 0:
+            raise CommandError('Grace period cannot be negative')
+
+        reclaimed = reclaim_document_blobs(options['grace_hours'] * 3600, options['dry_run'])
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{action} {reclaimed} unreferenced files"))
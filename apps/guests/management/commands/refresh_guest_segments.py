@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from apps.guests.models import GuestSegment
+from apps.guests.segments import refresh_segments
+
+
+class Command(BaseCommand):
+    help = 'Re-evaluate campaign segments for guests changed since the last refresh'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Re-evaluate every guest')
+
+    def handle(self, *args, **options):
+        evaluated = refresh_segments(full=options['full'])
+        for segment in GuestSegment.objects.filter(is_active=True):
+            self.stdout.write(f"{segment.name}: {segment.member_count} guests")
+        self.stdout.write(self.style.SUCCESS(f"Evaluated {evaluated} guests"))
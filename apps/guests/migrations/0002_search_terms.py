@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:36
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of the normalization in apps.guests.search as of this migration
+MAX_TERM_LENGTH = 60
+NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+NON_DIGIT = re.compile(r'\D+')
+
+
+def normalize(value):
+    value = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode()
+    return NON_ALPHANUMERIC.sub('', value.lower())[:MAX_TERM_LENGTH]
+
+
+def guest_terms(first_name, last_name, email, phone, alternate_phone=''):
+    terms = {
+        normalize(first_name),
+        normalize(last_name),
+        normalize(f"{first_name}{last_name}"),
+        normalize(f"{last_name}{first_name}"),
+        normalize(email),
+        NON_DIGIT.sub('', phone or '')[:MAX_TERM_LENGTH],
+        NON_DIGIT.sub('', alternate_phone or '')[:MAX_TERM_LENGTH],
+    }
+    terms.discard('')
+    return terms
+
+
+def index_guests(apps, schema_editor):
+    Guest = apps.get_model('guests', 'Guest')
+    GuestSearchTerm = apps.get_model('guests', 'GuestSearchTerm')
+    rows = []
+    for guest in Guest.objects.only('id', 'first_name', 'last_name', 'email', 'phone', 'alternate_phone').iterator(chunk_size=5000):
+        rows.extend(
+            GuestSearchTerm(guest_id=guest.id, term=term)
+            for term in guest_terms(guest.first_name, guest.last_name, guest.email, guest.phone, guest.alternate_phone)
+        )
+        if len(rows) >= 5000:
+            GuestSearchTerm.objects.bulk_create(rows)
+            rows = []
+    GuestSearchTerm.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=60)),
+                ('guest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='guests.guest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'guest'], name='guests_search_term_idx')],
+            },
+        ),
+        migrations.RunPython(index_guests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0002_search_terms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestStats',
+            fields=[
+                ('guest', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='guests.guest')),
+                ('stays', models.PositiveIntegerField(default=0)),
+                ('nights', models.PositiveIntegerField(default=0)),
+                ('room_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('average_daily_rate', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('first_stay', models.DateField(blank=True, null=True)),
+                ('last_stay', models.DateField(blank=True, null=True)),
+                ('cancellations', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Guest stats',
+                'indexes': [models.Index(fields=['stays'], name='guests_gues_stays_829512_idx'), models.Index(fields=['total_spent'], name='guests_gues_total_s_a23467_idx'), models.Index(fields=['last_stay'], name='guests_gues_last_st_d6213a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0003_guest_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='gueststats',
+            name='guests_gues_stays_829512_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='gueststats',
+            name='guests_gues_total_s_a23467_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='gueststats',
+            name='guests_gues_last_st_d6213a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['created_at', 'id'], name='guests_gues_created_42fa11_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gueststats',
+            index=models.Index(fields=['stays', 'guest'], name='guests_gues_stays_7152b8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gueststats',
+            index=models.Index(fields=['total_spent', 'guest'], name='guests_gues_total_s_180f89_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gueststats',
+            index=models.Index(fields=['last_stay', 'guest'], name='guests_gues_last_st_942574_idx'),
+        ),
+    ]
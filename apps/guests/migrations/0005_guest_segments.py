@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0004_guest_list_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('rules', models.JSONField(help_text='e.g. {"all": [{"feature": "is_vip", "op": "==", "value": true}, {"feature": "stays_12m", "op": ">=", "value": 3}]}')),
+                ('is_active', models.BooleanField(default=True)),
+                ('members', models.BinaryField(default=b'')),
+                ('member_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('refreshed_at', models.DateTimeField(blank=True, editable=False, null=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='guest',
+            index=models.Index(fields=['updated_at'], name='guests_gues_updated_da19b1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gueststats',
+            index=models.Index(fields=['updated_at'], name='guests_gues_updated_642e26_idx'),
+        ),
+    ]
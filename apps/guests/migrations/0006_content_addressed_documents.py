@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:55
+
+import mimetypes
+import os
+
+import apps.core.storage
+from django.db import migrations, models
+
+
+def describe_existing_uploads(apps, schema_editor):
+    GuestDocument = apps.get_model('guests', 'GuestDocument')
+    for document in GuestDocument.objects.only('id', 'file').iterator(chunk_size=2000):
+        name = os.path.basename(document.file.name)
+        GuestDocument.objects.filter(pk=document.pk).update(
+            original_name=name,
+            content_type=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0005_guest_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guestdocument',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='guestdocument',
+            name='original_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='guestdocument',
+            name='file',
+            field=models.FileField(storage=apps.core.storage.ContentAddressedStorage(), upload_to='guest_documents/'),
+        ),
+        migrations.AddIndex(
+            model_name='guestdocument',
+            index=models.Index(fields=['file'], name='guests_gues_file_55280c_idx'),
+        ),
+        migrations.RunPython(describe_existing_uploads, migrations.RunPython.noop),
+    ]
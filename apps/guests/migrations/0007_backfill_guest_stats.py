@@ -0,0 +1,74 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations
+from django.db.models import Count, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+CENTS = Decimal('0.01')
+ZERO = Decimal('0.00')
+CHUNK_SIZE = 2000
+
+
+# Frozen copy of apps.guests.stats._computed_stats as of this migration
+def computed_stats(apps, guest_ids):
+    LedgerEntry = apps.get_model('billing', 'LedgerEntry')
+    Reservation = apps.get_model('reservations', 'Reservation')
+
+    stayed = Q(status='checked_out')
+    stays = Reservation.objects.filter(guest_id__in=guest_ids).values('guest_id').annotate(
+        stays=Count('id', filter=stayed),
+        nights=Coalesce(Sum('total_nights', filter=stayed), 0),
+        room_revenue=Coalesce(Sum('subtotal', filter=stayed), Value(ZERO)),
+        first_stay=Min('check_in_date', filter=stayed),
+        last_stay=Max('check_out_date', filter=stayed),
+        cancellations=Count('id', filter=Q(status='cancelled')),
+    ).order_by()
+    paid = dict(LedgerEntry.objects.filter(
+        guest_id__in=guest_ids, entry_type__in=['payment', 'refund'],
+    ).values('guest_id').annotate(total=Sum('amount')).order_by().values_list('guest_id', 'total'))
+
+    computed = {}
+    for row in stays:
+        guest_id = row.pop('guest_id')
+        row['room_revenue'] = Decimal(row['room_revenue']).quantize(CENTS)
+        row['average_daily_rate'] = (
+            (row['room_revenue'] / row['nights']).quantize(CENTS, ROUND_HALF_UP) if row['nights'] else ZERO
+        )
+        computed[guest_id] = row
+    for guest_id in guest_ids:
+        row = computed.setdefault(guest_id, {
+            'stays': 0, 'nights': 0, 'room_revenue': ZERO, 'average_daily_rate': ZERO,
+            'first_stay': None, 'last_stay': None, 'cancellations': 0,
+        })
+        row['total_spent'] = -Decimal(paid.get(guest_id) or ZERO).quantize(CENTS)
+    return computed
+
+
+def backfill_guest_stats(apps, schema_editor):
+    """Compute the stats of existing guests, so lists and reports are right after upgrading"""
+    Guest = apps.get_model('guests', 'Guest')
+    GuestStats = apps.get_model('guests', 'GuestStats')
+
+    last_id = 0
+    while True:
+        guest_ids = list(Guest.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:CHUNK_SIZE])
+        if not guest_ids:
+            break
+        GuestStats.objects.bulk_create(
+            [GuestStats(guest_id=guest_id, **values) for guest_id, values in computed_stats(apps, guest_ids).items()],
+            ignore_conflicts=True,
+        )
+        last_id = guest_ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0006_content_addressed_documents'),
+        ('billing', '0004_backfill_ledger'),
+        ('reservations', '0003_reservation_amount_paid'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_guest_stats, migrations.RunPython.noop),
+    ]
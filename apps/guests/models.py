@@ -1,6 +1,9 @@
+import os
+
 from django.db import models
 from django.core.validators import RegexValidator
 from apps.core.models import TimeStampedModel
+from apps.core.storage import ContentAddressedStorage
 
 
 class Guest(TimeStampedModel):
@@ -80,11 +83,26 @@ class Guest(TimeStampedModel):
             models.Index(fields=['phone']),
             models.Index(fields=['last_name', 'first_name']),
             models.Index(fields=['is_vip']),
+            # Keyset pagination of the guest list
+            models.Index(fields=['created_at', 'id']),
+            # Guests changed since the last segment refresh
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self):
         return self.full_name
 
+    # Copied into the search documents of the guest's reservations and invoices
+    DOCUMENT_FIELDS = ('first_name', 'last_name', 'email')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so saving can tell whether those documents need rewriting
+        if all(field in field_names for field in cls.DOCUMENT_FIELDS):
+            instance._loaded_document_values = tuple(values[field_names.index(field)] for field in cls.DOCUMENT_FIELDS)
+        return instance
+
     @property
     def full_name(self):
         parts = [self.title, self.first_name, self.middle_name, self.last_name]
@@ -108,19 +126,13 @@ class Guest(TimeStampedModel):
 
     def get_total_stays(self):
         """Get total number of completed stays"""
-        return self.reservations.filter(status='checked_out').count()
+        stats = getattr(self, 'stats', None)
+        return stats.stays if stats else 0
 
     def get_total_spent(self):
-        """Get total amount spent by guest"""
-        from apps.billing.models import Invoice
-        from django.db.models import Sum
-
-        total = Invoice.objects.filter(
-            guest=self,
-            status='paid'
-        ).aggregate(total=Sum('total_amount'))['total']
-
-        return total or 0
+        """Get net amount paid by guest, in the hotel currency"""
+        stats = getattr(self, 'stats', None)
+        return stats.total_spent if stats else 0
 
 
 class GuestDocument(TimeStampedModel):
@@ -139,15 +151,35 @@ class GuestDocument(TimeStampedModel):
     issue_date = models.DateField(null=True, blank=True)
     expiry_date = models.DateField(null=True, blank=True)
     issuing_authority = models.CharField(max_length=200, blank=True)
-    file = models.FileField(upload_to='guest_documents/')
+    # Stored once per distinct content; the blob name is its SHA-256
+    file = models.FileField(upload_to='guest_documents/', storage=ContentAddressedStorage())
+    original_name = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
     notes = models.TextField(blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Reference checks of the blob reclaim job
+            models.Index(fields=['file']),
+        ]
 
     def __str__(self):
         return f"{self.guest.display_name} - {self.get_document_type_display()}"
 
+    def save(self, *args, **kwargs):
+        # The blob name says nothing about the upload, keep its name and sniffed type
+        if self.file and not self.file._committed:
+            from .documents import sniff_content_type
+
+            self.original_name = os.path.basename(self.file.name)
+            self.content_type = sniff_content_type(self.file.file)
+        super().save(*args, **kwargs)
+
+    @property
+    def download_name(self):
+        return self.original_name or os.path.basename(self.file.name)
+
 
 class GuestPreference(TimeStampedModel):
     """Guest preferences and special requirements"""
@@ -179,3 +211,86 @@ class GuestPreference(TimeStampedModel):
 
     def __str__(self):
         return f"{self.guest.display_name} - Preferences"
+
+
+class GuestStats(models.Model):
+    """Lifetime statistics of a guest, kept up to date incrementally"""
+    guest = models.OneToOneField(Guest, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    stays = models.PositiveIntegerField(default=0)
+    nights = models.PositiveIntegerField(default=0)
+    room_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    average_daily_rate = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Net payments received, in the hotel currency
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    first_stay = models.DateField(null=True, blank=True)
+    last_stay = models.DateField(null=True, blank=True)
+    cancellations = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Guest stats"
+        indexes = [
+            # The guest id tie-breaker lets the guest list page through them by keyset
+            models.Index(fields=['stays', 'guest']),
+            models.Index(fields=['total_spent', 'guest']),
+            models.Index(fields=['last_stay', 'guest']),
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.guest.display_name} - {self.stays} stays"
+
+
+class GuestSearchTerm(models.Model):
+    """Normalized name, email or phone term of a guest, matched by prefix for autocomplete"""
+    guest = models.ForeignKey(Guest, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=60)
+
+    class Meta:
+        indexes = [
+            # Covers the prefix range scan, guest ids come straight from the index
+            models.Index(fields=['term', 'guest'], name='guests_search_term_idx'),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+class GuestSegment(TimeStampedModel):
+    """A saved campaign audience rule, with its members stored as a bitmap of guest ids"""
+    name = models.CharField(max_length=100, unique=True)
+    description = models.TextField(blank=True)
+    rules = models.JSONField(help_text='e.g. {"all": [{"feature": "is_vip", "op": "==", "value": true}, '
+                                       '{"feature": "stays_12m", "op": ">=", "value": 3}]}')
+    is_active = models.BooleanField(default=True)
+    members = models.BinaryField(default=b'', editable=False)
+    member_count = models.PositiveIntegerField(default=0, editable=False)
+    refreshed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .segments import validate_rules
+
+        try:
+            validate_rules(self.rules)
+        except ValueError as e:
+            raise ValidationError({'rules': str(e)})
+
+    def save(self, *args, **kwargs):
+        # A changed rule is evaluated from scratch on the next refresh
+        if self.pk and 'update_fields' not in kwargs:
+            previous = GuestSegment.objects.filter(pk=self.pk).values_list('rules', flat=True).first()
+            if previous != self.rules:
+                self.refreshed_at = None
+        super().save(*args, **kwargs)
+
+    def member_ids(self):
+        """Member guest ids as an ascending NumPy array"""
+        from .segments import bitmap_ids
+        return bitmap_ids(self.members)
@@ -0,0 +1,128 @@
+"""
+Guest autocomplete index.
+
+Each guest is indexed under a handful of normalized terms (first name, last
+name, both name orders, email and phone digits), lowercased and stripped to
+letters and digits. A search normalizes the query the same way and reads
+the terms between it and its successor, a range scan on the plain term
+index on any database instead of a LIKE '%q%' scan over every guest. Guest saves keep the terms in step; the
+rebuild_guest_search_index command rebuilds them in chunks.
+"""
+import re
+import unicodedata
+
+MIN_QUERY_LENGTH = 2
+MAX_TERM_LENGTH = 60
+RESULT_LIMIT = 10
+# A guest can match several terms, read a few extra rows to fill the limit
+CANDIDATE_ROWS = RESULT_LIMIT * 4
+NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+NON_DIGIT = re.compile(r'\D+')
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def normalize(value):
+    """Lowercase ASCII letters and digits only"""
+    value = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode()
+    return NON_ALPHANUMERIC.sub('', value.lower())[:MAX_TERM_LENGTH]
+
+
+def prefix_successor(prefix):
+    """The smallest term sorting after every term that starts with `prefix`"""
+    # Terms only hold ALPHABET characters, which sort the same in every collation
+    while prefix and prefix[-1] == ALPHABET[-1]:
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + ALPHABET[ALPHABET.index(prefix[-1]) + 1]
+
+
+def guest_terms(first_name, last_name, email, phone, alternate_phone=''):
+    """The distinct search terms of a guest"""
+    terms = {
+        normalize(first_name),
+        normalize(last_name),
+        normalize(f"{first_name}{last_name}"),
+        normalize(f"{last_name}{first_name}"),
+        normalize(email),
+        NON_DIGIT.sub('', phone or '')[:MAX_TERM_LENGTH],
+        NON_DIGIT.sub('', alternate_phone or '')[:MAX_TERM_LENGTH],
+    }
+    terms.discard('')
+    return terms
+
+
+def _term_rows(guest_id, first_name, last_name, email, phone, alternate_phone):
+    from .models import GuestSearchTerm
+
+    return [
+        GuestSearchTerm(guest_id=guest_id, term=term)
+        for term in guest_terms(first_name, last_name, email, phone, alternate_phone)
+    ]
+
+
+INDEXED_FIELDS = ['id', 'first_name', 'last_name', 'email', 'phone', 'alternate_phone']
+
+
+def index_guest(guest):
+    """Replace the search terms of one guest"""
+    from .models import GuestSearchTerm
+
+    GuestSearchTerm.objects.filter(guest_id=guest.pk).delete()
+    GuestSearchTerm.objects.bulk_create(_term_rows(*(getattr(guest, field) for field in INDEXED_FIELDS)))
+
+
+def rebuild_index(chunk_size=5000):
+    """Rebuild every guest's terms, replacing them one primary key chunk at a time"""
+    from django.db import transaction
+    from .models import Guest, GuestSearchTerm
+
+    indexed = 0
+    last_id = 0
+    while True:
+        # Each chunk swaps its guests' terms atomically, so searches keep finding them mid-rebuild
+        with transaction.atomic():
+            guests = list(
+                Guest.objects.filter(id__gt=last_id).order_by('id').values_list(*INDEXED_FIELDS)[:chunk_size]
+            )
+            if not guests:
+                return indexed
+            GuestSearchTerm.objects.filter(guest_id__gt=last_id, guest_id__lte=guests[-1][0]).delete()
+            rows = [row for guest in guests for row in _term_rows(*guest)]
+            GuestSearchTerm.objects.bulk_create(rows, batch_size=chunk_size)
+        indexed += len(guests)
+        last_id = guests[-1][0]
+
+
+def matching_terms(query):
+    """Search terms starting with the query, None if it is too short to search"""
+    from .models import GuestSearchTerm
+
+    prefix = normalize(query)
+    if len(prefix) < MIN_QUERY_LENGTH:
+        return None
+
+    terms = GuestSearchTerm.objects.filter(term__gte=prefix)
+    successor = prefix_successor(prefix)
+    if successor:
+        terms = terms.filter(term__lt=successor)
+    return terms
+
+
+def search_guests(query, limit=RESULT_LIMIT):
+    """Guests with a term starting with the query, in term order"""
+    from .models import Guest
+
+    terms = matching_terms(query)
+    if terms is None:
+        return []
+
+    guest_ids = []
+    for guest_id in terms.order_by('term').values_list('guest_id', flat=True)[:CANDIDATE_ROWS]:
+        if guest_id not in guest_ids:
+            guest_ids.append(guest_id)
+            if len(guest_ids) == limit:
+                break
+
+    guests = Guest.objects.only('id', 'first_name', 'last_name', 'title', 'middle_name', 'email').in_bulk(guest_ids)
+    return [guests[guest_id] for guest_id in guest_ids if guest_id in guests]
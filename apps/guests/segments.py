@@ -0,0 +1,287 @@
+"""
+Guest segmentation for campaigns.
+
+A segment is a saved rule such as "VIP, 3+ stays in the last 12 months and
+subscribed to the newsletter". Rather than translating rules into joins of
+Guest, GuestStats and Reservation at query time, every guest is reduced to a
+row of features (profile flags, lifetime stats from GuestStats, stays and
+revenue over the last twelve months) loaded into NumPy arrays with two
+set-based queries. A rule is then a handful of vectorized comparisons over
+those arrays, and all segments are evaluated over one load.
+
+Rules are JSON: a condition {"feature": "stays_12m", "op": ">=", "value": 3}
+or a combination {"all": [...]}, {"any": [...]} or {"not": rule}.
+
+Members are stored as a bitmap indexed by guest id (about 12 kB per 100,000
+guests), so intersecting segments is a bitwise AND and exporting one is a
+scan of set bits. Refreshes are incremental: only guests whose profile or
+stats changed since the last refresh, or whose stays left the twelve month
+window, are re-evaluated and their bits flipped. The nightly full refresh
+also drops guests that were deleted.
+"""
+import logging
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, FloatField, IntegerField, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 365
+# Days since a stay for guests who never stayed, so "within N days" never matches them
+NEVER = 10 ** 6
+CHUNK_SIZE = 5000
+
+# Feature name -> NumPy dtype
+FEATURES = {
+    'is_vip': bool,
+    'marketing_consent': bool,
+    'newsletter_subscription': bool,
+    'is_blacklisted': bool,
+    'country': object,
+    'stays': np.int64,
+    'nights': np.int64,
+    'cancellations': np.int64,
+    'room_revenue': np.float64,
+    'average_daily_rate': np.float64,
+    'total_spent': np.float64,
+    'days_since_first_stay': np.int64,
+    'days_since_last_stay': np.int64,
+    'stays_12m': np.int64,
+    'revenue_12m': np.float64,
+}
+OPERATORS = {
+    '==': np.equal,
+    '!=': np.not_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    'in': lambda column, values: np.isin(column, values),
+}
+# Flags and stats read as plain numbers, already zero for guests without a stats row:
+# Django's per-value Decimal and boolean converters would dominate the load time
+NUMERIC_COLUMNS = {
+    'is_vip': ('is_vip', IntegerField),
+    'marketing_consent': ('marketing_consent', IntegerField),
+    'newsletter_subscription': ('newsletter_subscription', IntegerField),
+    'is_blacklisted': ('is_blacklisted', IntegerField),
+    'stays': ('stats__stays', IntegerField),
+    'nights': ('stats__nights', IntegerField),
+    'cancellations': ('stats__cancellations', IntegerField),
+    'room_revenue': ('stats__room_revenue', FloatField),
+    'average_daily_rate': ('stats__average_daily_rate', FloatField),
+    'total_spent': ('stats__total_spent', FloatField),
+}
+
+
+def _valid_value(feature, value):
+    """Whether `value` compares with the feature's column without a type error"""
+    dtype = FEATURES[feature]
+    if dtype is bool:
+        return isinstance(value, bool)
+    if dtype is object:
+        return isinstance(value, str)
+    # bool is an int subclass, but a flag compared with a count is a mistake
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_rules(rules):
+    """Raise ValueError unless `rules` is a well formed rule"""
+    if not isinstance(rules, dict):
+        raise ValueError('A rule is an object with "feature", "all", "any" or "not"')
+    if 'feature' in rules:
+        if rules['feature'] not in FEATURES:
+            raise ValueError(f"Unknown feature {rules['feature']!r}, use one of {', '.join(FEATURES)}")
+        if rules.get('op') not in OPERATORS:
+            raise ValueError(f"Unknown operator {rules.get('op')!r}, use one of {', '.join(OPERATORS)}")
+        if 'value' not in rules or (rules['op'] == 'in') != isinstance(rules['value'], list):
+            raise ValueError('A condition needs a value, a list for "in" and a single value otherwise')
+        values = rules['value'] if rules['op'] == 'in' else [rules['value']]
+        if not all(_valid_value(rules['feature'], value) for value in values):
+            kind = {bool: 'true or false', object: 'text'}.get(FEATURES[rules['feature']], 'a number')
+            raise ValueError(f"Values of {rules['feature']!r} must be {kind}")
+    elif len(rules) == 1 and ('all' in rules or 'any' in rules):
+        children = rules.get('all', rules.get('any'))
+        if not isinstance(children, list) or not children:
+            raise ValueError('"all" and "any" take a non-empty list of rules')
+        for child in children:
+            validate_rules(child)
+    elif len(rules) == 1 and 'not' in rules:
+        validate_rules(rules['not'])
+    else:
+        raise ValueError('A rule is an object with "feature", "all", "any" or "not"')
+
+
+def _days_since(dates, today):
+    return np.array([(today - value).days if value else NEVER for value in dates], dtype=np.int64)
+
+
+def load_features(guest_ids=None, today=None):
+    """Guest ids (sorted) and a feature name -> array mapping aligned with them"""
+    from apps.frontdesk.business_date import get_business_date
+    from apps.reservations.models import Reservation
+    from .models import Guest
+
+    today = today or get_business_date()
+    guests = Guest.objects.all()
+    stays = Reservation.objects.filter(status='checked_out', check_out_date__gt=today - timedelta(days=WINDOW_DAYS))
+    if guest_ids is not None:
+        guests = guests.filter(id__in=guest_ids)
+        stays = stays.filter(guest_id__in=guest_ids)
+
+    columns = {
+        name: Coalesce(Cast(path, output_field()), Value(0), output_field=output_field())
+        for name, (path, output_field) in NUMERIC_COLUMNS.items()
+    }
+    rows = guests.order_by('id').values_list(
+        'id', 'country', 'stats__first_stay', 'stats__last_stay', *columns.values(),
+    ).iterator(chunk_size=CHUNK_SIZE)
+    values = list(zip(*rows)) or [()] * (4 + len(columns))
+    ids = np.array(values[0], dtype=np.int64)
+    features = {'country': np.array(values[1], dtype=object)}
+    features['days_since_first_stay'] = _days_since(values[2], today)
+    features['days_since_last_stay'] = _days_since(values[3], today)
+    for name, column in zip(columns, values[4:]):
+        features[name] = np.array(column, dtype=FEATURES[name])
+    del values
+
+    features['stays_12m'] = np.zeros(len(ids), dtype=np.int64)
+    features['revenue_12m'] = np.zeros(len(ids), dtype=np.float64)
+    window = stays.values('guest_id').annotate(count=Count('id'), revenue=Sum('subtotal')).order_by()
+    for guest_id, count, revenue in window.values_list('guest_id', 'count', 'revenue'):
+        row = np.searchsorted(ids, guest_id)
+        if row < len(ids) and ids[row] == guest_id:
+            features['stays_12m'][row] = count
+            features['revenue_12m'][row] = float(revenue or 0)
+    return ids, features
+
+
+def evaluate(rules, features):
+    """Boolean mask of the rows matching `rules`"""
+    if 'all' in rules:
+        return np.logical_and.reduce([evaluate(child, features) for child in rules['all']])
+    if 'any' in rules:
+        return np.logical_or.reduce([evaluate(child, features) for child in rules['any']])
+    if 'not' in rules:
+        return ~evaluate(rules['not'], features)
+    return np.asarray(OPERATORS[rules['op']](features[rules['feature']], rules['value']), dtype=bool)
+
+
+def to_bitmap(bits):
+    """Pack a boolean array indexed by guest id into bytes"""
+    return np.packbits(bits, bitorder='little').tobytes()
+
+
+def from_bitmap(data, size=0):
+    """Unpack a bitmap into a boolean array of at least `size` entries"""
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder='little').astype(bool)
+    if len(bits) < size:
+        bits = np.concatenate([bits, np.zeros(size - len(bits), dtype=bool)])
+    return bits
+
+
+def bitmap_ids(data):
+    """Guest ids set in a bitmap, ascending"""
+    return np.flatnonzero(from_bitmap(data))
+
+
+def intersect(segments):
+    """Bitmap of the guests in every one of `segments`"""
+    bitmaps = [from_bitmap(segment.members) for segment in segments]
+    if not bitmaps:
+        return b''
+    size = min(len(bits) for bits in bitmaps)
+    return to_bitmap(np.logical_and.reduce([bits[:size] for bits in bitmaps]))
+
+
+def _changed_guest_ids(since, today):
+    """Guests whose features may have changed since a refresh at `since`"""
+    from apps.reservations.models import Reservation
+    from .models import Guest, GuestStats
+
+    changed = set(Guest.objects.filter(updated_at__gte=since).values_list('id', flat=True))
+    changed.update(GuestStats.objects.filter(updated_at__gte=since).values_list('guest_id', flat=True))
+    # Stays that have left the twelve month window since then (a day of slack for the business date)
+    changed.update(Reservation.objects.filter(
+        status='checked_out',
+        check_out_date__gt=since.date() - timedelta(days=WINDOW_DAYS + 1),
+        check_out_date__lte=today - timedelta(days=WINDOW_DAYS),
+    ).values_list('guest_id', flat=True))
+    return sorted(changed)
+
+
+def refresh_segments(full=False):
+    """Re-evaluate active segments, only for changed guests unless `full`; returns guests evaluated"""
+    from apps.frontdesk.business_date import get_business_date
+    from .models import GuestSegment
+
+    started = time.monotonic()
+    now = timezone.now()
+    today = get_business_date()
+    segments = list(GuestSegment.objects.filter(is_active=True))
+    if not segments:
+        return 0
+
+    stale = [segment for segment in segments if full or segment.refreshed_at is None]
+    current = [segment for segment in segments if segment not in stale]
+    evaluated = 0
+
+    if stale:
+        ids, features = load_features(today=today)
+        size = int(ids[-1]) + 1 if len(ids) else 0
+        for segment in stale:
+            mask = _evaluate_segment(segment, features)
+            if mask is None:
+                continue
+            bits = np.zeros(size, dtype=bool)
+            bits[ids[mask]] = True
+            _save_members(segment, bits, now)
+        evaluated += len(ids)
+
+    if current:
+        since = min(segment.refreshed_at for segment in current)
+        changed = _changed_guest_ids(since, today)
+        for start in range(0, len(changed), CHUNK_SIZE):
+            chunk = np.array(changed[start:start + CHUNK_SIZE], dtype=np.int64)
+            ids, features = load_features(chunk, today=today)
+            masks = {segment.pk: _evaluate_segment(segment, features) for segment in current}
+            # A segment that failed on one chunk stays as it was until its rules are fixed
+            current = [segment for segment in current if masks[segment.pk] is not None]
+            masks = {pk: mask for pk, mask in masks.items() if mask is not None}
+            with transaction.atomic():
+                for segment in GuestSegment.objects.select_for_update().filter(pk__in=masks):
+                    bits = from_bitmap(segment.members, int(chunk[-1]) + 1)
+                    # Guests in the chunk but not loaded were deleted and leave every segment
+                    bits[chunk] = False
+                    bits[ids[masks[segment.pk]]] = True
+                    _save_members(segment, bits, now)
+            evaluated += len(chunk)
+        # Segments with no changed guests are still current as of now
+        GuestSegment.objects.filter(pk__in=[segment.pk for segment in current]).update(refreshed_at=now)
+
+    logger.info("Guest segments refreshed: %s guests evaluated in %.0f ms",
+                evaluated, (time.monotonic() - started) * 1000)
+    return evaluated
+
+
+def _evaluate_segment(segment, features):
+    """Mask of a segment's members, or None if its rules cannot be evaluated"""
+    try:
+        return evaluate(segment.rules, features)
+    except Exception:
+        # One broken segment must not hold back the others
+        logger.exception("Guest segment %s (%s) could not be evaluated", segment.pk, segment.name)
+        return None
+
+
+def _save_members(segment, bits, refreshed_at):
+    from .models import GuestSegment
+
+    GuestSegment.objects.filter(pk=segment.pk).update(
+        members=to_bitmap(bits), member_count=int(np.count_nonzero(bits)), refreshed_at=refreshed_at,
+    )
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save
+from .models import Guest, GuestStats
+from .search import index_guest
+
+
+def reindex_guest(sender, instance, raw=False, **kwargs):
+    """Keep the autocomplete terms of a saved guest current"""
+    if not raw:
+        index_guest(instance)
+
+
+def create_guest_stats(sender, instance, created=False, raw=False, **kwargs):
+    """Give every new guest an empty stats row"""
+    if created and not raw:
+        GuestStats.objects.get_or_create(guest=instance)
+
+
+# Terms are deleted with the guest by the foreign key cascade
+post_save.connect(reindex_guest, sender=Guest, dispatch_uid='guests_search_index')
+post_save.connect(create_guest_stats, sender=Guest, dispatch_uid='guests_create_stats')
@@ -0,0 +1,166 @@
+"""
+Guest lifetime statistics.
+
+GuestStats holds one row per guest (stays, nights, room revenue and ADR,
+net amount paid, first and last stay, cancellations) so lists and reports
+sort and filter on indexed columns instead of aggregating reservations per
+guest. Rows are updated in place with F() expressions as events happen: a
+check-out adds a stay, a cancellation counts, and every payment or refund
+posted to the ledger moves total_spent by the same amount. Anything that
+undoes an event (a reservation reopened, guests merged) recomputes the
+affected guests, and the nightly repair job recomputes everyone in chunks
+and rewrites rows that drifted.
+"""
+import logging
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Case, Count, DecimalField, F, FloatField, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CENTS = Decimal('0.01')
+ZERO = Decimal('0.00')
+CHUNK_SIZE = 2000
+STAT_FIELDS = ['stays', 'nights', 'room_revenue', 'average_daily_rate', 'total_spent',
+               'first_stay', 'last_stay', 'cancellations']
+
+
+def _update(guest_id, **changes):
+    """Apply changes to a guest's row, computing it from scratch if it is missing"""
+    from .models import GuestStats
+
+    # update() skips auto_now; segment refreshes find changed rows by updated_at
+    if not GuestStats.objects.filter(guest_id=guest_id).update(updated_at=timezone.now(), **changes):
+        refresh_guest_stats([guest_id])
+
+
+def record_stay(reservation):
+    """Add a checked-out reservation to its guest's stats"""
+    nights = reservation.total_nights or 0
+    revenue = reservation.subtotal or ZERO
+    check_in, check_out = reservation.check_in_date, reservation.check_out_date
+    changes = {
+        'stays': F('stays') + 1,
+        'nights': F('nights') + nights,
+        'room_revenue': F('room_revenue') + revenue,
+        'first_stay': Case(When(Q(first_stay__isnull=True) | Q(first_stay__gt=check_in), then=Value(check_in)),
+                           default=F('first_stay')),
+        'last_stay': Case(When(Q(last_stay__isnull=True) | Q(last_stay__lt=check_out), then=Value(check_out)),
+                          default=F('last_stay')),
+    }
+    if nights:
+        # The right-hand side reads the row as it was before this UPDATE. The
+        # float cast keeps SQLite, which stores whole decimals as integers,
+        # from doing integer division
+        changes['average_daily_rate'] = Round(
+            Cast(F('room_revenue') + revenue, FloatField()) / (F('nights') + nights), 2,
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+    _update(reservation.guest_id, **changes)
+
+
+def record_cancellation(reservation):
+    _update(reservation.guest_id, cancellations=F('cancellations') + 1)
+
+
+def record_payment(guest_id, amount):
+    """Move a guest's total spent by a posted payment (positive) or refund (negative)"""
+    if amount:
+        _update(guest_id, total_spent=F('total_spent') + amount)
+
+
+def reservation_status_changed(reservation, previous_status):
+    """Update stats for a reservation whose status changed from `previous_status`"""
+    if reservation.status == previous_status:
+        return
+    if previous_status in ('checked_out', 'cancelled'):
+        # Undoing a counted event: recompute rather than subtract dates and rates
+        refresh_guest_stats([reservation.guest_id])
+    elif reservation.status == 'checked_out':
+        record_stay(reservation)
+    elif reservation.status == 'cancelled':
+        record_cancellation(reservation)
+
+
+def _computed_stats(guests):
+    """Guest id -> freshly computed stat values, from two grouped queries"""
+    from apps.billing.models import LedgerEntry
+    from apps.reservations.models import Reservation
+
+    stayed = Q(status='checked_out')
+    stays = Reservation.objects.filter(guest_id__in=guests).values('guest_id').annotate(
+        stays=Count('id', filter=stayed),
+        nights=Coalesce(Sum('total_nights', filter=stayed), 0),
+        room_revenue=Coalesce(Sum('subtotal', filter=stayed), Value(ZERO)),
+        first_stay=Min('check_in_date', filter=stayed),
+        last_stay=Max('check_out_date', filter=stayed),
+        cancellations=Count('id', filter=Q(status='cancelled')),
+    ).order_by()
+    paid = dict(LedgerEntry.objects.filter(
+        guest_id__in=guests, entry_type__in=['payment', 'refund'],
+    ).values('guest_id').annotate(total=Sum('amount')).order_by().values_list('guest_id', 'total'))
+
+    computed = {}
+    for row in stays:
+        guest_id = row.pop('guest_id')
+        row['room_revenue'] = Decimal(row['room_revenue']).quantize(CENTS)
+        row['average_daily_rate'] = (
+            (row['room_revenue'] / row['nights']).quantize(CENTS, ROUND_HALF_UP) if row['nights'] else ZERO
+        )
+        computed[guest_id] = row
+    for guest_id in guests:
+        row = computed.setdefault(guest_id, {
+            'stays': 0, 'nights': 0, 'room_revenue': ZERO, 'average_daily_rate': ZERO,
+            'first_stay': None, 'last_stay': None, 'cancellations': 0,
+        })
+        # Ledger credits are negative, so payments net of refunds is minus their sum
+        row['total_spent'] = -Decimal(paid.get(guest_id) or ZERO).quantize(CENTS)
+    return computed
+
+
+def refresh_guest_stats(guest_ids):
+    """Recompute the stats of some guests, returning how many rows changed"""
+    from .models import GuestStats
+
+    guest_ids = list(guest_ids)
+    computed = _computed_stats(guest_ids)
+    existing = GuestStats.objects.in_bulk(guest_ids)
+
+    now = timezone.now()
+    changed, missing = [], []
+    for guest_id, values in computed.items():
+        stats = existing.get(guest_id)
+        if stats is None:
+            missing.append(GuestStats(guest_id=guest_id, **values))
+        elif any(getattr(stats, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(stats, field, value)
+            stats.updated_at = now
+            changed.append(stats)
+
+    GuestStats.objects.bulk_create(missing, ignore_conflicts=True)
+    GuestStats.objects.bulk_update(changed, STAT_FIELDS + ['updated_at'], batch_size=500)
+    return len(changed) + len(missing)
+
+
+def repair_guest_stats(chunk_size=CHUNK_SIZE):
+    """Recompute every guest's stats in primary key chunks and fix rows that drifted"""
+    from django.db import transaction
+    from .models import Guest
+
+    started = time.monotonic()
+    repaired = 0
+    last_id = 0
+    while True:
+        guest_ids = list(Guest.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not guest_ids:
+            break
+        with transaction.atomic():
+            repaired += refresh_guest_stats(guest_ids)
+        last_id = guest_ids[-1]
+
+    logger.info("Guest stats repaired: %s rows in %.0f ms", repaired, (time.monotonic() - started) * 1000)
+    return repaired
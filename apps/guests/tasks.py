@@ -0,0 +1,22 @@
+from celery import shared_task
+from .documents import reclaim_document_blobs as reclaim_blobs
+from .segments import refresh_segments
+from .stats import repair_guest_stats as repair_stats
+
+
+@shared_task
+def repair_guest_stats():
+    """Nightly consistency repair of the denormalized guest stats"""
+    return repair_stats()
+
+
+@shared_task
+def refresh_guest_segments(full=False):
+    """Re-evaluate campaign segments for guests that changed, or for everyone when full"""
+    return refresh_segments(full=full)
+
+
+@shared_task
+def reclaim_document_blobs():
+    """Delete stored document files no longer referenced by any guest document"""
+    return reclaim_blobs()
@@ -0,0 +1,155 @@
+"""
+Guest timeline.
+
+Reservations, payments, invoices, refunds, reservation notes and documents
+of a guest are shown as one stream, newest first. Each page runs exactly one
+query per source table, reading only the columns an entry shows and at most
+a page plus one of rows that sort after the cursor; the sorted streams are
+then k-way merged with heapq.merge. The page size bounds every query, so a
+guest with a long history costs the same per page as a new one.
+
+Entries sort by (timestamp, source, id) descending. The cursor holds that
+key of the last entry shown, which every source can turn into a plain range
+condition on its own timestamp and id.
+"""
+import base64
+import heapq
+import json
+from collections import namedtuple
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import Q
+from django.urls import reverse
+
+PER_PAGE = 20
+
+Event = namedtuple('Event', ['at', 'rank', 'object_id', 'kind', 'title', 'detail', 'status', 'amount', 'url'])
+
+
+def _reservation(row):
+    room = f" · Room {row['room__number']}" if row['room__number'] else ''
+    return {
+        'title': f"Reservation {row['reservation_number']} booked",
+        'detail': f"{row['check_in_date']:%b %d} - {row['check_out_date']:%b %d, %Y}{room}",
+        'status': row['status'],
+        'amount': row['total_amount'],
+        'url': reverse('reservations:reservation_detail', args=[row['id']]),
+    }
+
+
+def _payment(row):
+    return {
+        'title': f"Payment {row['payment_number']}",
+        'detail': row['payment_method'].replace('_', ' ').capitalize(),
+        'status': row['status'],
+        'amount': row['base_amount'],
+        'url': reverse('billing:invoice_detail', args=[row['invoice_id']]) if row['invoice_id'] else '',
+    }
+
+
+def _invoice(row):
+    return {
+        'title': f"Invoice {row['invoice_number']}",
+        'detail': f"Due {row['due_date']:%b %d, %Y}",
+        'status': row['status'],
+        'amount': row['total_amount'],
+        'url': reverse('billing:invoice_detail', args=[row['id']]),
+    }
+
+
+def _refund(row):
+    return {
+        'title': f"Refund {row['refund_number']}",
+        'detail': row['reason'][:120],
+        'status': row['status'],
+        'amount': row['base_amount'],
+        'url': '',
+    }
+
+
+def _note(row):
+    return {
+        'title': f"Note on {row['reservation__reservation_number']}",
+        'detail': row['note'][:200],
+        'status': 'internal' if row['is_internal'] else '',
+        'amount': None,
+        'url': reverse('reservations:reservation_detail', args=[row['reservation_id']]),
+    }
+
+
+def _document(row):
+    return {
+        'title': f"{row['document_type'].replace('_', ' ').capitalize()} uploaded",
+        'detail': row['document_number'],
+        'status': '',
+        'amount': None,
+        'url': reverse('guests:download_document', args=[row['id']]),
+    }
+
+
+def _sources(guest_id):
+    """Kind, timestamp field, column-limited rows and entry builder per source, in tie-break order"""
+    from apps.billing.models import Invoice, Payment, Refund
+    from apps.reservations.models import Reservation, ReservationNote
+    from .models import GuestDocument
+
+    return [
+        ('reservation', 'created_at', Reservation.objects.filter(guest_id=guest_id).values(
+            'id', 'created_at', 'reservation_number', 'check_in_date', 'check_out_date', 'status',
+            'total_amount', 'room__number'), _reservation),
+        ('payment', 'payment_date', Payment.objects.filter(guest_id=guest_id).values(
+            'id', 'payment_date', 'payment_number', 'payment_method', 'status', 'base_amount', 'invoice_id'), _payment),
+        ('invoice', 'created_at', Invoice.objects.filter(guest_id=guest_id).values(
+            'id', 'created_at', 'invoice_number', 'due_date', 'status', 'total_amount'), _invoice),
+        ('refund', 'created_at', Refund.objects.filter(guest_id=guest_id).values(
+            'id', 'created_at', 'refund_number', 'reason', 'status', 'base_amount'), _refund),
+        ('note', 'created_at', ReservationNote.objects.filter(reservation__guest_id=guest_id).values(
+            'id', 'created_at', 'note', 'is_internal', 'reservation_id', 'reservation__reservation_number'), _note),
+        ('document', 'created_at', GuestDocument.objects.filter(guest_id=guest_id).values(
+            'id', 'created_at', 'document_type', 'document_number'), _document),
+    ]
+
+
+def encode_cursor(event):
+    values = [event.at.isoformat(), event.rank, event.object_id]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(timestamp, rank, id) of a cursor, or None if it is malformed"""
+    try:
+        at, rank, object_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(at), int(rank), int(object_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _after(field, rank, cursor):
+    """Rows of source `rank` sorting after the cursor key, newest first"""
+    at, cursor_rank, object_id = cursor
+    if rank < cursor_rank:
+        return Q(**{f'{field}__lte': at})
+    if rank > cursor_rank:
+        return Q(**{f'{field}__lt': at})
+    return Q(**{f'{field}__lt': at}) | Q(**{field: at, 'id__lt': object_id})
+
+
+def timeline_page(guest_id, cursor=None, per_page=PER_PAGE):
+    """One page of a guest's timeline and the cursor of the next (None on the last)"""
+    key = decode_cursor(cursor) if cursor else None
+    streams = []
+    for rank, (kind, field, rows, build) in enumerate(_sources(guest_id)):
+        if key:
+            rows = rows.filter(_after(field, rank, key))
+        streams.append([
+            Event(at=row[field], rank=rank, object_id=row['id'], kind=kind, **build(row))
+            for row in rows.order_by(f'-{field}', '-id')[:per_page + 1]
+        ])
+
+    events = list(islice(
+        heapq.merge(*streams, key=lambda event: (event.at, event.rank, event.object_id), reverse=True),
+        per_page + 1,
+    ))
+    next_cursor = encode_cursor(events[per_page - 1]) if len(events) > per_page else None
+    return events[:per_page], next_cursor
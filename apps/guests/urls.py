@@ -6,8 +6,14 @@ app_name = 'guests'
 urlpatterns = [
     path('', views.guest_list, name='guest_list'),
     path('<int:guest_id>/', views.guest_detail, name='guest_detail'),
+    path('<int:guest_id>/timeline/', views.guest_timeline, name='guest_timeline'),
     path('create/', views.create_guest, name='create_guest'),
     path('<int:guest_id>/edit/', views.edit_guest, name='edit_guest'),
     # path('<int:guest_id>/delete/', views.delete_guest, name='delete_guest'),
     path('search/', views.guest_search, name='guest_search'),
+    path('segments/', views.segment_list, name='segment_list'),
+    path('export/', views.export_guests, name='export_guests'),
+    path('<int:guest_id>/documents/upload/', views.upload_document, name='upload_document'),
+    path('documents/<int:document_id>/', views.download_document, name='download_document'),
+    path('<int:guest_id>/gdpr-export/', views.gdpr_export, name='gdpr_export'),
 ]
@@ -1,18 +1,57 @@
-from django.utils import timezone
+from datetime import date
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.db.models import Q
-from django.http import JsonResponse
-from .models import Guest
-from .forms import GuestForm
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from .models import Guest, GuestDocument, GuestSegment
+from .forms import GuestDocumentForm, GuestForm
+from .documents import serve_guest_document
+from .timeline import timeline_page
+from .search import search_guests
+from .segments import bitmap_ids, intersect
+from .export import FORMATS, export_lines, filter_guests, gdpr_bundle, gzip_stream, parse_columns
+from apps.core.pagination import estimated_count, segmented_keyset_page
+from apps.frontdesk.business_date import get_business_date
+
+
+# (field path, descending) keys, each served by an index ending in the guest id
+GUEST_SORTS = {
+    'newest': [('created_at', True), ('id', True)],
+    'stays': [('stats__stays', True), ('stats__guest_id', True)],
+    'spent': [('stats__total_spent', True), ('stats__guest_id', True)],
+    'last_stay': [('stats__last_stay', True), ('stats__guest_id', True)],
+}
+# Null sort keys (no stats row yet, never stayed) cannot be keyset paged with the
+# rest, so those guests follow the sorted ones, newest first
+NULL_SORT_FIELDS = {'stays': 'stats', 'spent': 'stats', 'last_stay': 'stats__last_stay'}
+# Only the columns the list shows; Guest has many wide text fields
+GUEST_LIST_FIELDS = [
+    'id', 'title', 'first_name', 'middle_name', 'last_name', 'email', 'phone', 'nationality', 'is_vip',
+    'created_at', 'stats__stays', 'stats__total_spent', 'stats__last_stay',
+]
+GUESTS_PER_PAGE = 25
+
+
+def _sort_segments(guests, sort):
+    if sort not in NULL_SORT_FIELDS:
+        return [(guests, GUEST_SORTS[sort])]
+    field = NULL_SORT_FIELDS[sort]
+    return [
+        (guests.filter(**{f'{field}__isnull': False}), GUEST_SORTS[sort]),
+        (guests.filter(**{f'{field}__isnull': True}), GUEST_SORTS['newest']),
+    ]
 
 
 @login_required
 def guest_list(request):
-    """Display list of all guests with search and filtering"""
-    guests = Guest.objects.all().order_by('-created_at')
+    """Display list of all guests with search and filtering, scrolling by keyset cursor"""
+    sort = request.GET.get('sort')
+    if sort not in GUEST_SORTS:
+        sort = 'newest'
+    guests = Guest.objects.select_related('stats').only(*GUEST_LIST_FIELDS)
 
     # Search functionality
     search = request.GET.get('search')
@@ -30,17 +69,33 @@ def guest_list(request):
     if is_vip:
         guests = guests.filter(is_vip=True)
 
-    # Pagination
-    paginator = Paginator(guests, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Filter by returning guests
+    repeat = request.GET.get('repeat')
+    if repeat:
+        guests = guests.filter(stats__stays__gte=2)
+
+    cursor = request.GET.get('cursor')
+    page, next_cursor = segmented_keyset_page(_sort_segments(guests, sort), cursor, GUESTS_PER_PAGE)
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
 
     context = {
-        'guests': page_obj,
+        'guests': page,
+        'next_query': next_query,
         'search': search,
         'is_vip': is_vip,
+        'repeat': repeat,
+        'sort': sort,
     }
 
+    if request.htmx and cursor:
+        return render(request, 'guests/partials/guest_rows.html', context)
+
+    # Counted for the first page only, and never exactly on large tables
+    context['total_guests'] = estimated_count(guests)
     if request.htmx:
         return render(request, 'guests/partials/guest_list_partial.html', context)
 
@@ -49,33 +104,59 @@ def guest_list(request):
 
 @login_required
 def guest_detail(request, guest_id):
-    """Display guest details and reservation history"""
-    guest = get_object_or_404(Guest, id=guest_id)
-
-    # Get reservation history
-    reservations = guest.reservations.all().order_by('-created_at')
+    """Display guest details, active reservations and the activity timeline"""
+    guest = get_object_or_404(Guest.objects.select_related('stats'), id=guest_id)
 
-    # Get current reservation
-    current_reservation = guest.reservations.filter(
-        status='checked_in'
-    ).first()
+    # Current and upcoming stays in one query
+    active = list(guest.reservations.filter(
+        Q(status='checked_in') | Q(status='confirmed', check_in_date__gte=get_business_date())
+    ).select_related('room').order_by('check_in_date'))
+    current_reservation = next((reservation for reservation in active if reservation.status == 'checked_in'), None)
+    upcoming_reservations = [reservation for reservation in active if reservation.status == 'confirmed']
 
-    # Get upcoming reservations
-    upcoming_reservations = guest.reservations.filter(
-        status='confirmed',
-        check_in_date__gte=timezone.now().date()
-    ).order_by('check_in_date')
+    events, next_cursor = timeline_page(guest.id)
 
     context = {
         'guest': guest,
-        'reservations': reservations,
         'current_reservation': current_reservation,
         'upcoming_reservations': upcoming_reservations,
+        'events': events,
+        'next_cursor': next_cursor,
+        'documents': guest.documents.all(),
+        'document_form': GuestDocumentForm(),
     }
 
     return render(request, 'guests/guest_detail.html', context)
 
 
+@login_required
+def guest_timeline(request, guest_id):
+    """Next page of a guest's timeline: rows for HTMX, JSON otherwise"""
+    guest = get_object_or_404(Guest.objects.only('id'), id=guest_id)
+    events, next_cursor = timeline_page(guest.id, request.GET.get('cursor'))
+
+    if request.htmx:
+        context = {'guest': guest, 'events': events, 'next_cursor': next_cursor}
+        return render(request, 'guests/partials/timeline_items.html', context)
+
+    return JsonResponse({
+        'events': [
+            {
+                'at': event.at.isoformat(),
+                'kind': event.kind,
+                'id': event.object_id,
+                'title': event.title,
+                'detail': event.detail,
+                'status': event.status,
+                'amount': str(event.amount) if event.amount is not None else None,
+                'url': event.url,
+            }
+            for event in events
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
 @login_required
 def create_guest(request):
     """Create a new guest"""
@@ -110,20 +191,111 @@ def edit_guest(request, guest_id):
     return render(request, 'guests/guest_form.html', context)
 
 
+@login_required
+def upload_document(request, guest_id):
+    """Attach an identity document scan to a guest"""
+    guest = get_object_or_404(Guest, id=guest_id)
+    if request.method == 'POST':
+        form = GuestDocumentForm(request.POST, request.FILES)
+        if form.is_valid():
+            document = form.save(commit=False)
+            document.guest = guest
+            document.save()
+            messages.success(request, 'Document uploaded successfully!')
+        else:
+            messages.error(request, 'Please choose a document type and a file.')
+    return redirect('guests:guest_detail', guest_id=guest.id)
+
+
+@login_required
+def download_document(request, document_id):
+    """Download a guest document, with range requests and caching by content hash"""
+    document = get_object_or_404(GuestDocument, id=document_id)
+    return serve_guest_document(request, document)
+
+
 @login_required
 def guest_search(request):
     """HTMX endpoint for guest search"""
     query = request.GET.get('q', '')
 
-    if len(query) >= 2:
-        guests = Guest.objects.filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(email__icontains=query) |
-            Q(phone__icontains=query)
-        )[:10]
-    else:
-        guests = []
+    guests = search_guests(query)
 
     context = {'guests': guests, 'query': query}
     return render(request, 'guests/partials/guest_search_results.html', context)
+
+
+@login_required
+def segment_list(request):
+    """Campaign segments with their sizes, and the overlap of the ones selected"""
+    segments = GuestSegment.objects.defer('members')
+    selected = [pk for pk in request.GET.getlist('segment') if pk.isdigit()]
+    overlap = None
+    if selected:
+        overlap = len(bitmap_ids(intersect(GuestSegment.objects.filter(id__in=selected))))
+
+    context = {
+        'segments': segments,
+        'selected': selected,
+        'overlap': overlap,
+        'selected_query': request.GET.urlencode(),
+    }
+    return render(request, 'guests/segment_list.html', context)
+
+
+def _flag(value):
+    """'1' or '0' from a query string as a boolean filter, anything else as no filter"""
+    return {'1': True, '0': False}.get(value)
+
+
+@staff_member_required
+def export_guests(request):
+    """Stream a CSV or JSON lines export of the filtered guests, optionally gzipped"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest(f"Format must be one of {', '.join(FORMATS)}")
+    try:
+        columns = parse_columns(request.GET.get('columns'))
+        stayed_since = request.GET.get('stayed_since')
+        stayed_since = date.fromisoformat(stayed_since) if stayed_since else None
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    guests = filter_guests(
+        Guest.objects.all(),
+        marketing_consent=_flag(request.GET.get('marketing_consent')),
+        newsletter_subscription=_flag(request.GET.get('newsletter_subscription')),
+        is_vip=_flag(request.GET.get('is_vip')),
+        min_stays=int(request.GET['min_stays']) if request.GET.get('min_stays', '').isdigit() else None,
+        min_spent=int(request.GET['min_spent']) if request.GET.get('min_spent', '').isdigit() else None,
+        stayed_since=stayed_since,
+    )
+    # Several segments export the guests in all of them
+    segment_ids = request.GET.getlist('segment')
+    guest_ids = None
+    if segment_ids:
+        segments = list(GuestSegment.objects.filter(id__in=[pk for pk in segment_ids if pk.isdigit()]))
+        if len(segments) != len(set(segment_ids)):
+            return HttpResponseBadRequest('Unknown segment')
+        guest_ids = bitmap_ids(intersect(segments))
+
+    lines = export_lines(guests, columns, fmt, guest_ids=guest_ids)
+    filename = f"guests-{get_business_date().isoformat()}.{fmt}"
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    if request.GET.get('gzip'):
+        lines = gzip_stream(lines)
+        filename += '.gz'
+        content_type = 'application/gzip'
+
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@staff_member_required
+def gdpr_export(request, guest_id):
+    """Stream everything held about one guest as a JSON document"""
+    guest = get_object_or_404(Guest, id=guest_id)
+    response = StreamingHttpResponse(gdpr_bundle(guest), content_type='application/json')
+    response['Content-Disposition'] = f'attachment; filename="guest-{guest.id}-gdpr.json"'
+    return response
@@ -1,4 +1,5 @@
 from django import forms
+from apps.core.autocomplete import AutocompleteSelect
 from .models import HousekeepingTask, HousekeepingSupply, MaintenanceRequest
 
 class HousekeepingTaskForm(forms.ModelForm):
@@ -6,8 +7,9 @@ class HousekeepingTaskForm(forms.ModelForm):
         model = HousekeepingTask
         fields = ['room', 'task_type', 'title', 'description', 'priority', 'assigned_to', 'estimated_duration', 'scheduled_date', 'scheduled_time']
         widgets = {
-            'room': forms.Select(attrs={
-                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
+            'room': AutocompleteSelect('room', attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
+                'placeholder': 'Room number'
             }),
             'task_type': forms.Select(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
@@ -22,8 +24,9 @@ class HousekeepingTaskForm(forms.ModelForm):
             'priority': forms.Select(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
             }),
-            'assigned_to': forms.Select(attrs={
-                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
+            'assigned_to': AutocompleteSelect('user', attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
+                'placeholder': 'Username'
             }),
             'estimated_duration': forms.TextInput(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
@@ -84,8 +87,9 @@ class MaintenanceRequestForm(forms.ModelForm):
         model = MaintenanceRequest
         fields = ['room', 'title', 'description', 'priority', 'reported_by', 'estimated_cost']
         widgets = {
-            'room': forms.Select(attrs={
-                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
+            'room': AutocompleteSelect('room', attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
+                'placeholder': 'Room number'
             }),
             'title': forms.TextInput(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
@@ -97,8 +101,9 @@ class MaintenanceRequestForm(forms.ModelForm):
             'priority': forms.Select(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
             }),
-            'reported_by': forms.Select(attrs={
-                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
+            'reported_by': AutocompleteSelect('user', attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
+                'placeholder': 'Username'
             }),
             'estimated_cost': forms.NumberInput(attrs={
                 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
@@ -0,0 +1,54 @@
+from django.contrib import admin
+from .models import RatePlan, SeasonalRule, DailyRate, LengthOfStayRule, OccupancyRule, RateRecommendation, ChannelCommission
+
+
+class SeasonalRuleInline(admin.TabularInline):
+    model = SeasonalRule
+    extra = 0
+    fields = ['name', 'room_type', 'start_date', 'end_date', 'weekdays', 'adjustment_type', 'adjustment_value', 'priority', 'is_active']
+
+
+class LengthOfStayRuleInline(admin.TabularInline):
+    model = LengthOfStayRule
+    extra = 0
+
+
+class OccupancyRuleInline(admin.TabularInline):
+    model = OccupancyRule
+    extra = 0
+
+
+@admin.register(RatePlan)
+class RatePlanAdmin(admin.ModelAdmin):
+    list_display = ['name', 'code', 'base_adjustment_percent', 'is_default', 'use_recommended_rates', 'is_active']
+    list_filter = ['is_default', 'use_recommended_rates', 'is_active']
+    search_fields = ['name', 'code']
+    inlines = [SeasonalRuleInline, LengthOfStayRuleInline, OccupancyRuleInline]
+
+
+@admin.register(DailyRate)
+class DailyRateAdmin(admin.ModelAdmin):
+    list_display = ['rate_plan', 'room_type', 'date', 'price']
+    list_filter = ['rate_plan', 'room_type']
+    date_hierarchy = 'date'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('rate_plan', 'room_type')
+
+
+@admin.register(RateRecommendation)
+class RateRecommendationAdmin(admin.ModelAdmin):
+    list_display = ['room_type', 'stay_date', 'rooms_on_books', 'forecast_occupancy', 'current_rate', 'recommended_rate']
+    list_filter = ['room_type']
+    date_hierarchy = 'stay_date'
+    readonly_fields = ['room_type', 'stay_date', 'capacity', 'rooms_on_books', 'pickup_last_7_days', 'forecast_rooms',
+                       'forecast_occupancy', 'current_rate', 'recommended_rate']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('room_type')
+
+
+@admin.register(ChannelCommission)
+class ChannelCommissionAdmin(admin.ModelAdmin):
+    list_display = ['booking_source', 'commission_rate', 'is_active']
+    list_filter = ['is_active']
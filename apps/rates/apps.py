@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class RatesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.rates'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:59
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatePlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('code', models.CharField(max_length=20, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True)),
+                ('base_adjustment_percent', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('is_default', models.BooleanField(default=False)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OccupancyRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('included_adults', models.PositiveIntegerField(default=2)),
+                ('extra_adult_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('extra_child_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('room_type', models.ForeignKey(blank=True, help_text='Leave empty to apply to all room types', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_rules', to='rooms.roomtype')),
+                ('rate_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_rules', to='rates.rateplan')),
+            ],
+            options={
+                'ordering': ['rate_plan'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LengthOfStayRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('min_nights', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('discount_percent', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('room_type', models.ForeignKey(blank=True, help_text='Leave empty to apply to all room types', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='length_of_stay_rules', to='rooms.roomtype')),
+                ('rate_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='length_of_stay_rules', to='rates.rateplan')),
+            ],
+            options={
+                'ordering': ['rate_plan', 'min_nights'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0)])),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rates', to='rooms.roomtype')),
+                ('rate_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rates', to='rates.rateplan')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['rate_plan', 'date'], name='rates_daily_rate_pl_912c48_idx')],
+                'unique_together': {('rate_plan', 'room_type', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SeasonalRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=100)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('weekdays', models.CharField(blank=True, help_text='Weekday digits the rule applies to (0=Mon ... 6=Sun), empty for all days', max_length=7)),
+                ('adjustment_type', models.CharField(choices=[('percent', 'Percentage'), ('amount', 'Fixed Amount'), ('price', 'Set Price')], default='percent', max_length=10)),
+                ('adjustment_value', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('priority', models.PositiveIntegerField(default=0, help_text='Higher priority rules are applied last')),
+                ('is_active', models.BooleanField(default=True)),
+                ('rate_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seasonal_rules', to='rates.rateplan')),
+                ('room_type', models.ForeignKey(blank=True, help_text='Leave empty to apply to all room types', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='seasonal_rules', to='rooms.roomtype')),
+            ],
+            options={
+                'ordering': ['rate_plan', 'priority', 'start_date'],
+                'indexes': [models.Index(fields=['rate_plan', 'start_date', 'end_date'], name='rates_seaso_rate_pl_b79536_idx')],
+            },
+        ),
+    ]
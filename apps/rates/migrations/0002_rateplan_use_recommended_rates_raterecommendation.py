@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rates', '0001_initial'),
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rateplan',
+            name='use_recommended_rates',
+            field=models.BooleanField(default=False, help_text='Use stored rate recommendations instead of the room type base price'),
+        ),
+        migrations.CreateModel(
+            name='RateRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stay_date', models.DateField()),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('rooms_on_books', models.PositiveIntegerField(default=0)),
+                ('pickup_last_7_days', models.IntegerField(default=0)),
+                ('forecast_rooms', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('forecast_occupancy', models.DecimalField(decimal_places=4, default=0, max_digits=5)),
+                ('current_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('recommended_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rate_recommendations', to='rooms.roomtype')),
+            ],
+            options={
+                'ordering': ['stay_date', 'room_type'],
+                'indexes': [models.Index(fields=['stay_date', 'room_type'], name='rates_rater_stay_da_9dbddc_idx')],
+                'unique_together': {('room_type', 'stay_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rates', '0002_rateplan_use_recommended_rates_raterecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChannelCommission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('booking_source', models.CharField(choices=[('direct', 'Direct Booking'), ('phone', 'Phone'), ('email', 'Email'), ('walk_in', 'Walk-in'), ('booking_com', 'Booking.com'), ('expedia', 'Expedia'), ('airbnb', 'Airbnb'), ('other_ota', 'Other OTA'), ('travel_agent', 'Travel Agent'), ('corporate', 'Corporate')], max_length=20, unique=True)),
+                ('commission_rate', models.DecimalField(decimal_places=4, help_text='Fraction of room revenue, e.g. 0.1500 for 15%', max_digits=5)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['booking_source'],
+            },
+        ),
+    ]
@@ -0,0 +1,147 @@
+from django.db import models
+from django.core.validators import MinValueValidator
+from apps.core.models import TimeStampedModel
+from apps.reservations.models import Reservation
+from apps.rooms.models import RoomType
+
+
+class RatePlan(TimeStampedModel):
+    """Sellable rate plan (BAR, non-refundable, corporate, ...)"""
+    code = models.CharField(max_length=20, unique=True)
+    name = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+
+    # Percentage applied to RoomType.base_price before any rule, e.g. -10 for 10% off
+    base_adjustment_percent = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+
+    is_default = models.BooleanField(default=False)
+    use_recommended_rates = models.BooleanField(default=False,
+                                                help_text="Use stored rate recommendations instead of the room type base price")
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.code})"
+
+
+class SeasonalRule(TimeStampedModel):
+    """Season and weekday price rule within a rate plan"""
+    ADJUSTMENT_TYPE_CHOICES = [
+        ('percent', 'Percentage'),
+        ('amount', 'Fixed Amount'),
+        ('price', 'Set Price'),
+    ]
+
+    rate_plan = models.ForeignKey(RatePlan, on_delete=models.CASCADE, related_name='seasonal_rules')
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='seasonal_rules',
+                                  null=True, blank=True, help_text="Leave empty to apply to all room types")
+    name = models.CharField(max_length=100)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    weekdays = models.CharField(max_length=7, blank=True,
+                                help_text="Weekday digits the rule applies to (0=Mon ... 6=Sun), empty for all days")
+    adjustment_type = models.CharField(max_length=10, choices=ADJUSTMENT_TYPE_CHOICES, default='percent')
+    adjustment_value = models.DecimalField(max_digits=10, decimal_places=2)
+    priority = models.PositiveIntegerField(default=0, help_text="Higher priority rules are applied last")
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['rate_plan', 'priority', 'start_date']
+        indexes = [
+            models.Index(fields=['rate_plan', 'start_date', 'end_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.rate_plan.code} - {self.name}"
+
+
+class DailyRate(TimeStampedModel):
+    """Explicit nightly price for a room type on a given date"""
+    rate_plan = models.ForeignKey(RatePlan, on_delete=models.CASCADE, related_name='daily_rates')
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='daily_rates')
+    date = models.DateField()
+    price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+
+    class Meta:
+        ordering = ['date']
+        unique_together = ['rate_plan', 'room_type', 'date']
+        indexes = [
+            models.Index(fields=['rate_plan', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.rate_plan.code} - {self.room_type.name} - {self.date}"
+
+
+class LengthOfStayRule(TimeStampedModel):
+    """Discount applied to stays of at least a number of nights"""
+    rate_plan = models.ForeignKey(RatePlan, on_delete=models.CASCADE, related_name='length_of_stay_rules')
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='length_of_stay_rules',
+                                  null=True, blank=True, help_text="Leave empty to apply to all room types")
+    min_nights = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    discount_percent = models.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        ordering = ['rate_plan', 'min_nights']
+
+    def __str__(self):
+        return f"{self.rate_plan.code} - {self.min_nights}+ nights"
+
+
+class OccupancyRule(TimeStampedModel):
+    """Extra person charges per night above the included occupancy"""
+    rate_plan = models.ForeignKey(RatePlan, on_delete=models.CASCADE, related_name='occupancy_rules')
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='occupancy_rules',
+                                  null=True, blank=True, help_text="Leave empty to apply to all room types")
+    included_adults = models.PositiveIntegerField(default=2)
+    extra_adult_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    extra_child_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['rate_plan']
+
+    def __str__(self):
+        return f"{self.rate_plan.code} - occupancy"
+
+
+class RateRecommendation(TimeStampedModel):
+    """Recommended nightly rate per room type and stay date"""
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='rate_recommendations')
+    stay_date = models.DateField()
+
+    # Demand inputs at the time of the recommendation
+    capacity = models.PositiveIntegerField(default=0)
+    rooms_on_books = models.PositiveIntegerField(default=0)
+    pickup_last_7_days = models.IntegerField(default=0)
+    forecast_rooms = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    forecast_occupancy = models.DecimalField(max_digits=5, decimal_places=4, default=0)
+
+    # Rates
+    current_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    recommended_rate = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        ordering = ['stay_date', 'room_type']
+        unique_together = ['room_type', 'stay_date']
+        indexes = [
+            models.Index(fields=['stay_date', 'room_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.room_type.name} - {self.stay_date}: {self.recommended_rate}"
+
+
+class ChannelCommission(TimeStampedModel):
+    """Commission a distribution channel charges on room revenue"""
+    booking_source = models.CharField(max_length=20, choices=Reservation.BOOKING_SOURCE_CHOICES, unique=True)
+    commission_rate = models.DecimalField(max_digits=5, decimal_places=4,
+                                          help_text="Fraction of room revenue, e.g. 0.1500 for 15%")
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['booking_source']
+
+    def __str__(self):
+        return f"{self.get_booking_source_display()} - {self.commission_rate * 100:.2f}%"
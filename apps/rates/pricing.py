@@ -0,0 +1,217 @@
+"""
+Nightly price computation for rate plans.
+
+Prices for every active room type over a date range are computed as a single
+room type x night matrix with NumPy and cached per (rate plan, date range).
+Every cached entry is stamped with the global rates version; any rate edit
+bumps the version so stale entries are ignored on the next read.
+"""
+import uuid
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+from django.core.cache import cache
+
+VERSION_KEY = 'rates:version'
+CACHE_TIMEOUT = 60 * 60
+CENTS = Decimal('0.01')
+
+
+def bump_rates_version():
+    """Invalidate every cached price matrix"""
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, None)
+    return version
+
+
+def _matrix_key(rate_plan_id, start_date, end_date):
+    return f"rates:matrix:{rate_plan_id}:{start_date.isoformat()}:{end_date.isoformat()}"
+
+
+def _to_money(value):
+    return Decimal(str(value)).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def _date_vector(start_date, end_date):
+    return np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D'))
+
+
+def _apply_adjustment(matrix, rows, mask, adjustment_type, value):
+    block = np.ix_(rows, mask)
+    if adjustment_type == 'percent':
+        matrix[block] *= 1 + value / 100
+    elif adjustment_type == 'amount':
+        matrix[block] += value
+    else:
+        matrix[block] = value
+
+
+def build_rate_matrix(rate_plan_id, start_date, end_date):
+    """Compute nightly prices for every active room type (uncached)"""
+    from .models import RatePlan, SeasonalRule, DailyRate, LengthOfStayRule, OccupancyRule, RateRecommendation
+    from apps.rooms.models import RoomType
+
+    rate_plan = RatePlan.objects.get(pk=rate_plan_id)
+    room_types = list(RoomType.objects.filter(is_active=True).values_list('id', 'name', 'base_price'))
+    dates = _date_vector(start_date, end_date)
+    row_index = {room_type_id: row for row, (room_type_id, _, _) in enumerate(room_types)}
+    all_rows = np.arange(len(room_types))
+
+    # Base prices broadcast across all nights
+    base = np.array([float(base_price) for _, _, base_price in room_types], dtype=float)
+    matrix = np.repeat(base[:, None], len(dates), axis=1)
+
+    # Stored recommendations replace the base price where available
+    if rate_plan.use_recommended_rates:
+        recommendations = RateRecommendation.objects.filter(
+            stay_date__gte=start_date,
+            stay_date__lt=end_date,
+        ).values_list('room_type_id', 'stay_date', 'recommended_rate')
+        for room_type_id, stay_date, recommended_rate in recommendations:
+            if room_type_id in row_index:
+                matrix[row_index[room_type_id], (stay_date - start_date).days] = float(recommended_rate)
+
+    matrix *= 1 + float(rate_plan.base_adjustment_percent) / 100
+
+    # Season and weekday rules, lowest priority first
+    weekdays = (dates.astype('int64') + 3) % 7  # 1970-01-01 was a Thursday
+    rules = SeasonalRule.objects.filter(
+        rate_plan_id=rate_plan_id,
+        is_active=True,
+        start_date__lt=end_date,
+        end_date__gte=start_date,
+    ).order_by('priority', 'id')
+    for rule in rules:
+        if rule.room_type_id is None:
+            rows = all_rows
+        elif rule.room_type_id in row_index:
+            rows = [row_index[rule.room_type_id]]
+        else:
+            continue
+        mask = (dates >= np.datetime64(rule.start_date, 'D')) & (dates <= np.datetime64(rule.end_date, 'D'))
+        if rule.weekdays:
+            mask &= np.isin(weekdays, [int(day) for day in rule.weekdays if day.isdigit()])
+        if mask.any():
+            _apply_adjustment(matrix, rows, mask, rule.adjustment_type, float(rule.adjustment_value))
+
+    # Explicit daily rates override everything else
+    overrides = DailyRate.objects.filter(
+        rate_plan_id=rate_plan_id,
+        date__gte=start_date,
+        date__lt=end_date,
+    ).values_list('room_type_id', 'date', 'price')
+    for room_type_id, date, price in overrides:
+        if room_type_id in row_index:
+            matrix[row_index[room_type_id], (date - start_date).days] = float(price)
+
+    np.maximum(matrix, 0, out=matrix)
+
+    los_rules = list(LengthOfStayRule.objects.filter(rate_plan_id=rate_plan_id).values_list(
+        'room_type_id', 'min_nights', 'discount_percent'
+    ))
+    occupancy_rules = {
+        room_type_id: (included, extra_adult, extra_child)
+        for room_type_id, included, extra_adult, extra_child in OccupancyRule.objects.filter(
+            rate_plan_id=rate_plan_id
+        ).values_list('room_type_id', 'included_adults', 'extra_adult_amount', 'extra_child_amount')
+    }
+
+    entry = {
+        'rate_plan_id': rate_plan_id,
+        'start_date': start_date,
+        'end_date': end_date,
+        'room_types': {},
+    }
+    for row, (room_type_id, name, _) in enumerate(room_types):
+        entry['room_types'][room_type_id] = {
+            'name': name,
+            'nightly': [_to_money(price) for price in np.round(matrix[row], 2)],
+            'length_of_stay': sorted(
+                (min_nights, discount) for rt_id, min_nights, discount in los_rules
+                if rt_id in (None, room_type_id)
+            ),
+            'occupancy': occupancy_rules.get(room_type_id, occupancy_rules.get(None)),
+        }
+    return entry
+
+
+def get_rate_matrix(rate_plan, start_date, end_date):
+    """Get cached nightly prices for all room types in [start_date, end_date)"""
+    rate_plan_id = getattr(rate_plan, 'pk', rate_plan)
+    key = _matrix_key(rate_plan_id, start_date, end_date)
+
+    # Entry and version come back in a single round trip
+    cached = cache.get_many([key, VERSION_KEY])
+    version = cached.get(VERSION_KEY)
+    entry = cached.get(key)
+    if version and entry and entry.get('version') == version:
+        return entry
+
+    if not version:
+        version = bump_rates_version()
+    entry = build_rate_matrix(rate_plan_id, start_date, end_date)
+    entry['version'] = version
+    cache.set(key, entry, CACHE_TIMEOUT)
+    return entry
+
+
+def nightly_rates(rate_plan, room_type, start_date, end_date):
+    """Get list of (date, price) for a room type over a date range"""
+    matrix = get_rate_matrix(rate_plan, start_date, end_date)
+    room_type_id = getattr(room_type, 'pk', room_type)
+    prices = matrix['room_types'].get(room_type_id)
+    if prices is None:
+        return []
+    return [(start_date + timedelta(days=i), price) for i, price in enumerate(prices['nightly'])]
+
+
+def _quote_from_prices(room_type_id, prices, start_date, adults, children):
+    nightly = prices['nightly']
+    nights = len(nightly)
+    room_total = sum(nightly, Decimal('0.00'))
+
+    # Longest qualifying length-of-stay discount wins
+    discount_percent = Decimal('0')
+    for min_nights, discount in prices['length_of_stay']:
+        if nights >= min_nights:
+            discount_percent = discount
+    discount = (room_total * discount_percent / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+    extra_person = Decimal('0.00')
+    if prices['occupancy']:
+        included, extra_adult, extra_child = prices['occupancy']
+        extra_adults = max(adults - included, 0)
+        extra_person = (extra_adults * extra_adult + children * extra_child) * nights
+
+    subtotal = room_total - discount + extra_person
+    return {
+        'room_type_id': room_type_id,
+        'room_type_name': prices['name'],
+        'nights': nights,
+        'nightly': [(start_date + timedelta(days=i), price) for i, price in enumerate(nightly)],
+        'room_total': room_total,
+        'length_of_stay_discount': discount,
+        'extra_person_charges': extra_person,
+        'subtotal': subtotal,
+        'average_rate': (subtotal / nights).quantize(CENTS, rounding=ROUND_HALF_UP) if nights else subtotal,
+    }
+
+
+def quote_stay(rate_plan, room_type, check_in_date, check_out_date, adults=1, children=0):
+    """Quote a stay for one room type, or None if it is not sellable"""
+    matrix = get_rate_matrix(rate_plan, check_in_date, check_out_date)
+    room_type_id = getattr(room_type, 'pk', room_type)
+    prices = matrix['room_types'].get(room_type_id)
+    if prices is None:
+        return None
+    return _quote_from_prices(room_type_id, prices, check_in_date, adults, children)
+
+
+def quote_all_room_types(rate_plan, check_in_date, check_out_date, adults=1, children=0):
+    """Quote a stay for every active room type from a single cache lookup"""
+    matrix = get_rate_matrix(rate_plan, check_in_date, check_out_date)
+    return [
+        _quote_from_prices(room_type_id, prices, check_in_date, adults, children)
+        for room_type_id, prices in matrix['room_types'].items()
+    ]
@@ -0,0 +1,175 @@
+"""
+Occupancy-driven rate recommendations.
+
+On-the-books room nights, recent pickup and the historical booking curve are
+built as room type x stay date matrices with NumPy, so the whole horizon is
+evaluated in one pass. Results are stored in RateRecommendation.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .pricing import bump_rates_version, _to_money
+
+HORIZON_DAYS = 365
+HISTORY_DAYS = 3 * 365
+PICKUP_WINDOW_DAYS = 7
+ON_BOOKS_STATUSES = ['pending', 'confirmed', 'checked_in']
+HISTORY_STATUSES = ['confirmed', 'checked_in', 'checked_out']
+
+# Forecast occupancy -> multiplier on the room type base price
+OCCUPANCY_BREAKPOINTS = [0.0, 0.4, 0.7, 0.85, 0.95, 1.0]
+RATE_MULTIPLIERS = [0.85, 0.95, 1.0, 1.1, 1.2, 1.3]
+
+# Never assume less than this share of a stay date's demand is already booked
+MIN_BOOKED_SHARE = 0.05
+
+
+def _day_offsets(dates, start_date):
+    return (np.array(dates, dtype='datetime64[D]') - np.datetime64(start_date, 'D')).astype('int64')
+
+
+def _room_nights(type_rows, check_ins, check_outs, start_date, days, num_types):
+    """Spread stays over a room type x day matrix using difference arrays"""
+    matrix = np.zeros((num_types, days + 1))
+    if len(type_rows):
+        starts = np.clip(_day_offsets(check_ins, start_date), 0, days)
+        ends = np.clip(_day_offsets(check_outs, start_date), 0, days)
+        np.add.at(matrix, (type_rows, starts), 1)
+        np.add.at(matrix, (type_rows, ends), -1)
+    return np.cumsum(matrix, axis=1)[:, :days]
+
+
+def _booked_share_curve(type_rows, lead_days, nights, num_types, days):
+    """Share of final room nights typically on the books at each lead time"""
+    weights = np.zeros((num_types + 1, days + 1))
+    if len(type_rows):
+        leads = np.clip(lead_days, 0, days)
+        np.add.at(weights, (type_rows, leads), nights)
+        # Last row holds the hotel-wide curve used as a fallback
+        np.add.at(weights, (np.full(len(type_rows), num_types), leads), nights)
+
+    # Room nights booked at least `d` days ahead, for every d at once
+    booked_ahead = np.cumsum(weights[:, ::-1], axis=1)[:, ::-1][:, :days]
+    totals = weights.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(totals > 0, booked_ahead / totals, np.nan)
+
+    hotel_curve = np.nan_to_num(share[num_types], nan=1.0)
+    share = share[:num_types]
+    missing = np.isnan(share)
+    share[missing] = np.broadcast_to(hotel_curve, share.shape)[missing]
+    return np.maximum(share, MIN_BOOKED_SHARE)
+
+
+def compute_rate_recommendations(start_date=None, days=HORIZON_DAYS):
+    """Compute recommendations for every active room type (not saved)"""
+    from apps.reservations.models import Reservation
+    from apps.rooms.models import Room, RoomType
+
+    if start_date is None:
+        start_date = timezone.now().date()
+    end_date = start_date + timedelta(days=days)
+
+    room_types = list(RoomType.objects.filter(is_active=True).values_list('id', 'base_price'))
+    if not room_types:
+        return []
+    type_ids = np.array([room_type_id for room_type_id, _ in room_types])
+    order = np.argsort(type_ids)
+    num_types = len(type_ids)
+
+    def rows_for(ids):
+        ids = np.asarray(ids, dtype='int64')
+        positions = np.clip(np.searchsorted(type_ids[order], ids), 0, num_types - 1)
+        known = type_ids[order][positions] == ids
+        return order[positions], known
+
+    capacity = np.zeros(num_types)
+    room_counts = Room.objects.filter(is_active=True).values_list('room_type').annotate(count=Count('id'))
+    for room_type_id, count in room_counts:
+        rows, known = rows_for([room_type_id])
+        if known[0]:
+            capacity[rows[0]] = count
+
+    # On-the-books stays overlapping the horizon
+    on_books = list(Reservation.objects.filter(
+        status__in=ON_BOOKS_STATUSES,
+        check_in_date__lt=end_date,
+        check_out_date__gt=start_date,
+    ).values_list('room_type_id', 'check_in_date', 'check_out_date', 'created_at'))
+    otb_rooms = np.zeros((num_types, days))
+    pickup = np.zeros((num_types, days))
+    if on_books:
+        type_col, check_ins, check_outs, created = zip(*on_books)
+        rows, known = rows_for(type_col)
+        check_ins, check_outs = np.array(check_ins), np.array(check_outs)
+        otb_rooms = _room_nights(rows[known], check_ins[known], check_outs[known], start_date, days, num_types)
+
+        pickup_since = timezone.now() - timedelta(days=PICKUP_WINDOW_DAYS)
+        recent = known & np.array([created_at >= pickup_since for created_at in created])
+        pickup = _room_nights(rows[recent], check_ins[recent], check_outs[recent], start_date, days, num_types)
+
+    # Historical booking curve from lead time between booking and arrival
+    history = list(Reservation.objects.filter(
+        status__in=HISTORY_STATUSES,
+        check_in_date__gte=start_date - timedelta(days=HISTORY_DAYS),
+        check_in_date__lt=start_date,
+    ).values_list('room_type_id', 'check_in_date', 'check_out_date', 'created_at'))
+    if history:
+        type_col, check_ins, check_outs, created = zip(*history)
+        rows, known = rows_for(type_col)
+        check_ins = np.array(check_ins, dtype='datetime64[D]')
+        nights = (np.array(check_outs, dtype='datetime64[D]') - check_ins).astype('int64')
+        booked_on = np.array([created_at.date() for created_at in created], dtype='datetime64[D]')
+        lead_days = (check_ins - booked_on).astype('int64')
+        share = _booked_share_curve(rows[known], lead_days[known], nights[known], num_types, days)
+    else:
+        share = np.ones((num_types, days))
+
+    # Forecast final demand and map occupancy to a price multiplier
+    forecast = np.minimum(otb_rooms / share, capacity[:, None])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        occupancy = np.where(capacity[:, None] > 0, forecast / capacity[:, None], 0.0)
+    multipliers = np.interp(occupancy, OCCUPANCY_BREAKPOINTS, RATE_MULTIPLIERS)
+    base = np.array([float(base_price) for _, base_price in room_types])
+    recommended = np.round(base[:, None] * multipliers, 2)
+
+    results = []
+    for row, (room_type_id, base_price) in enumerate(room_types):
+        for day in range(days):
+            results.append({
+                'room_type_id': room_type_id,
+                'stay_date': start_date + timedelta(days=day),
+                'capacity': int(capacity[row]),
+                'rooms_on_books': int(otb_rooms[row, day]),
+                'pickup_last_7_days': int(pickup[row, day]),
+                'forecast_rooms': _to_money(round(forecast[row, day], 2)),
+                'forecast_occupancy': Decimal(str(round(occupancy[row, day], 4))),
+                'current_rate': base_price,
+                'recommended_rate': _to_money(recommended[row, day]),
+            })
+    return results
+
+
+def generate_rate_recommendations(start_date=None, days=HORIZON_DAYS):
+    """Recompute and store recommendations for the horizon"""
+    from .models import RateRecommendation
+
+    if start_date is None:
+        start_date = timezone.now().date()
+    results = compute_rate_recommendations(start_date, days)
+
+    with transaction.atomic():
+        RateRecommendation.objects.filter(stay_date__gte=start_date).delete()
+        RateRecommendation.objects.bulk_create(
+            [RateRecommendation(**result) for result in results],
+            batch_size=1000,
+        )
+
+    # Plans that follow recommendations must be re-priced
+    bump_rates_version()
+    return len(results)
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from apps.rooms.models import RoomType
+from .models import RatePlan, SeasonalRule, DailyRate, LengthOfStayRule, OccupancyRule
+from .pricing import bump_rates_version
+
+RATE_MODELS = [RoomType, RatePlan, SeasonalRule, DailyRate, LengthOfStayRule, OccupancyRule]
+
+
+def invalidate_rate_cache(sender, **kwargs):
+    """Drop cached price matrices whenever a rate input changes"""
+    bump_rates_version()
+
+
+for model in RATE_MODELS:
+    post_save.connect(invalidate_rate_cache, sender=model, dispatch_uid=f'rates_{model.__name__}_save')
+    post_delete.connect(invalidate_rate_cache, sender=model, dispatch_uid=f'rates_{model.__name__}_delete')
@@ -0,0 +1,8 @@
+from celery import shared_task
+from .revenue import generate_rate_recommendations
+
+
+@shared_task
+def refresh_rate_recommendations():
+    """Nightly recomputation of rate recommendations"""
+    return generate_rate_recommendations()
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'rates'
+
+urlpatterns = [
+    path('quote/', views.rate_quote, name='rate_quote'),
+]
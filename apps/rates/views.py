@@ -0,0 +1,46 @@
+from datetime import datetime
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from .models import RatePlan
+from .pricing import quote_all_room_types
+
+
+@login_required
+def rate_quote(request):
+    """Quote a stay across all room types as JSON"""
+    try:
+        check_in_date = datetime.strptime(request.GET.get('check_in_date', ''), '%Y-%m-%d').date()
+        check_out_date = datetime.strptime(request.GET.get('check_out_date', ''), '%Y-%m-%d').date()
+        adults = int(request.GET.get('adults', 1))
+        children = int(request.GET.get('children', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    if check_out_date <= check_in_date:
+        return JsonResponse({'error': 'Check-out date must be after check-in date.'}, status=400)
+
+    rate_plan_id = request.GET.get('rate_plan')
+    if rate_plan_id:
+        rate_plan = get_object_or_404(RatePlan, id=rate_plan_id, is_active=True)
+    else:
+        rate_plan = get_object_or_404(RatePlan, is_default=True, is_active=True)
+
+    quotes = quote_all_room_types(rate_plan, check_in_date, check_out_date, adults=adults, children=children)
+
+    return JsonResponse({
+        'rate_plan': rate_plan.code,
+        'check_in_date': check_in_date.isoformat(),
+        'check_out_date': check_out_date.isoformat(),
+        'quotes': [
+            {
+                'room_type_id': quote['room_type_id'],
+                'room_type': quote['room_type_name'],
+                'nights': quote['nights'],
+                'nightly': [{'date': date.isoformat(), 'price': str(price)} for date, price in quote['nightly']],
+                'subtotal': str(quote['subtotal']),
+                'average_rate': str(quote['average_rate']),
+            }
+            for quote in quotes
+        ],
+    })
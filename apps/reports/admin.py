@@ -3,7 +3,7 @@ from django.urls import path
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
 from django.utils.decorators import method_decorator
-from .models import GeneratedReport, ReportSchedule
+from .models import GeneratedReport, ReportSchedule, OnTheBooksSnapshot
 
 
 @admin.register(GeneratedReport)
@@ -44,3 +44,10 @@ class ReportScheduleAdmin(admin.ModelAdmin):
     def get_report_type(self, obj):
         return obj.template.report_type
     get_report_type.short_description = 'Report Type'
+
+
+@admin.register(OnTheBooksSnapshot)
+class OnTheBooksSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['snapshot_date', 'stay_date', 'room_type', 'booking_source', 'rooms', 'revenue']
+    list_filter = ['room_type', 'booking_source']
+    date_hierarchy = 'snapshot_date'
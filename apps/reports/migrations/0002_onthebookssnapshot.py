@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OnTheBooksSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('stay_date', models.DateField()),
+                ('booking_source', models.CharField(max_length=20)),
+                ('rooms', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='otb_snapshots', to='rooms.roomtype')),
+            ],
+            options={
+                'ordering': ['snapshot_date', 'stay_date'],
+                'unique_together': {('snapshot_date', 'stay_date', 'room_type', 'booking_source')},
+            },
+        ),
+    ]
@@ -101,3 +101,20 @@ class ReportSchedule(TimeStampedModel):
     def __str__(self):
         return f"{self.name} ({self.frequency})"
 
+
+class OnTheBooksSnapshot(models.Model):
+    """Rooms and revenue on the books for a future stay date, as of a snapshot date"""
+    snapshot_date = models.DateField()
+    stay_date = models.DateField()
+    room_type = models.ForeignKey('rooms.RoomType', on_delete=models.CASCADE, related_name='otb_snapshots')
+    booking_source = models.CharField(max_length=20)
+    rooms = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['snapshot_date', 'stay_date']
+        # Also serves the (snapshot_date, stay_date) range reads of the pace report
+        unique_together = ['snapshot_date', 'stay_date', 'room_type', 'booking_source']
+
+    def __str__(self):
+        return f"{self.snapshot_date} -> {self.stay_date}: {self.rooms} rooms"
@@ -0,0 +1,161 @@
+"""
+On-the-books snapshots for pace reporting.
+
+Every night the rooms and room revenue on the books for each future stay
+date are written to OnTheBooksSnapshot, so pace and same-time-last-year
+comparisons are plain indexed reads instead of replaying reservations.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+HORIZON_DAYS = 365
+ON_BOOKS_STATUSES = ['pending', 'confirmed', 'checked_in']
+
+# Daily snapshots cover same-time-last-year; older ones keep month starts only
+DAILY_RETENTION_DAYS = 400
+MONTHLY_RETENTION_DAYS = 3 * 365
+
+# 52 weeks back so weekdays line up
+LAST_YEAR_OFFSET = timedelta(days=364)
+
+
+def take_snapshot(snapshot_date=None, days=HORIZON_DAYS):
+    """Write rooms and revenue on the books per stay date, room type and source"""
+    from apps.reservations.models import Reservation
+    from .models import OnTheBooksSnapshot
+
+    if snapshot_date is None:
+        snapshot_date = timezone.now().date()
+    end_date = snapshot_date + timedelta(days=days)
+
+    # Identical stays collapse into one row before being spread over nights
+    stays = list(Reservation.objects.filter(
+        status__in=ON_BOOKS_STATUSES,
+        check_in_date__lt=end_date,
+        check_out_date__gt=snapshot_date,
+    ).values_list(
+        'room_type_id', 'booking_source', 'check_in_date', 'check_out_date'
+    ).annotate(
+        rooms=Count('id'),
+        revenue=Sum('subtotal'),
+    ).order_by())
+
+    groups = sorted({(room_type_id, source) for room_type_id, source, *_ in stays})
+    group_index = {group: row for row, group in enumerate(groups)}
+    rooms = np.zeros((len(groups), days + 1), dtype='int64')
+    revenue = np.zeros((len(groups), days + 1))
+
+    for room_type_id, source, check_in_date, check_out_date, count, subtotal in stays:
+        row = group_index[(room_type_id, source)]
+        nights = (check_out_date - check_in_date).days or 1
+        start = max((check_in_date - snapshot_date).days, 0)
+        end = min((check_out_date - snapshot_date).days, days)
+        rooms[row, start] += count
+        rooms[row, end] -= count
+        nightly_revenue = float(subtotal or 0) / nights
+        revenue[row, start] += nightly_revenue
+        revenue[row, end] -= nightly_revenue
+
+    rooms = np.cumsum(rooms, axis=1)[:, :days]
+    revenue = np.round(np.cumsum(revenue, axis=1)[:, :days], 2)
+
+    rows, offsets = np.nonzero(rooms)
+    snapshots = [
+        OnTheBooksSnapshot(
+            snapshot_date=snapshot_date,
+            stay_date=snapshot_date + timedelta(days=int(offset)),
+            room_type_id=groups[row][0],
+            booking_source=groups[row][1],
+            rooms=int(rooms[row, offset]),
+            revenue=Decimal(str(revenue[row, offset])),
+        )
+        for row, offset in zip(rows, offsets)
+    ]
+
+    with transaction.atomic():
+        # Re-running for the same day replaces that day's snapshot
+        OnTheBooksSnapshot.objects.filter(snapshot_date=snapshot_date).delete()
+        OnTheBooksSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
+
+
+def purge_snapshots(today=None):
+    """Apply snapshot retention rules, returns number of rows deleted"""
+    from .models import OnTheBooksSnapshot
+
+    if today is None:
+        today = timezone.now().date()
+    daily_cutoff = today - timedelta(days=DAILY_RETENTION_DAYS)
+    monthly_cutoff = today - timedelta(days=MONTHLY_RETENTION_DAYS)
+
+    deleted, _ = OnTheBooksSnapshot.objects.filter(
+        Q(snapshot_date__lt=monthly_cutoff) |
+        (Q(snapshot_date__lt=daily_cutoff) & ~Q(snapshot_date__day=1))
+    ).delete()
+    return deleted
+
+
+def _on_books_by_date(snapshot_date, start_date, end_date, filters):
+    from .models import OnTheBooksSnapshot
+
+    rows = OnTheBooksSnapshot.objects.filter(
+        snapshot_date=snapshot_date,
+        stay_date__range=[start_date, end_date],
+        **filters
+    ).values('stay_date').annotate(
+        total_rooms=Sum('rooms'),
+        total_revenue=Sum('revenue'),
+    ).order_by()
+    return {row['stay_date']: (row['total_rooms'], row['total_revenue']) for row in rows}
+
+
+def pace_comparison(start_date, end_date, as_of=None, pickup_days=7, room_type=None, booking_source=None):
+    """Compare on-the-books and pickup with the same time last year"""
+    from .models import OnTheBooksSnapshot
+
+    if as_of is None:
+        as_of = OnTheBooksSnapshot.objects.filter(
+            snapshot_date__lte=timezone.now().date()
+        ).order_by('-snapshot_date').values_list('snapshot_date', flat=True).first()
+    if as_of is None:
+        return None
+
+    filters = {}
+    if room_type:
+        filters['room_type'] = room_type
+    if booking_source:
+        filters['booking_source'] = booking_source
+
+    pickup_delta = timedelta(days=pickup_days)
+    last_year_start, last_year_end = start_date - LAST_YEAR_OFFSET, end_date - LAST_YEAR_OFFSET
+    current = _on_books_by_date(as_of, start_date, end_date, filters)
+    current_prior = _on_books_by_date(as_of - pickup_delta, start_date, end_date, filters)
+    last_year = _on_books_by_date(as_of - LAST_YEAR_OFFSET, last_year_start, last_year_end, filters)
+    last_year_prior = _on_books_by_date(as_of - LAST_YEAR_OFFSET - pickup_delta, last_year_start, last_year_end, filters)
+
+    empty = (0, Decimal('0.00'))
+    days = []
+    stay_date = start_date
+    while stay_date <= end_date:
+        last_year_date = stay_date - LAST_YEAR_OFFSET
+        rooms, revenue = current.get(stay_date, empty)
+        ly_rooms, ly_revenue = last_year.get(last_year_date, empty)
+        days.append({
+            'stay_date': stay_date,
+            'rooms': rooms,
+            'revenue': revenue,
+            'pickup': rooms - current_prior.get(stay_date, empty)[0],
+            'last_year_date': last_year_date,
+            'last_year_rooms': ly_rooms,
+            'last_year_revenue': ly_revenue,
+            'last_year_pickup': ly_rooms - last_year_prior.get(last_year_date, empty)[0],
+            'rooms_variance': rooms - ly_rooms,
+        })
+        stay_date += timedelta(days=1)
+
+    return {'as_of': as_of, 'days': days}
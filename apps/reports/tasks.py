@@ -0,0 +1,25 @@
+from celery import shared_task
+from .snapshots import take_snapshot, purge_snapshots
+
+
+@shared_task
+def snapshot_on_the_books():
+    """Nightly on-the-books snapshot followed by retention cleanup"""
+    created = take_snapshot()
+    purged = purge_snapshots()
+    return {'created': created, 'purged': purged}
+
+
+@shared_task
+def generate_commission_statements(month=None, user_id=None):
+    """Monthly channel commission statements (default: last month)"""
+    from datetime import date
+    from django.contrib.auth.models import User
+    from .commissions import generate_commission_statements as generate, previous_month
+
+    month = date.fromisoformat(month) if month else previous_month()
+    # Scheduled runs are recorded against the first superuser
+    user = User.objects.get(pk=user_id) if user_id else User.objects.filter(is_superuser=True).order_by('id').first()
+    if user is None:
+        return []
+    return [report.id for report in generate(month, user)]
@@ -9,4 +9,8 @@ urlpatterns = [
     path('occupancy/', views.occupancy_report, name='occupancy_report'),
     path('revenue/', views.revenue_report, name='revenue_report'),
     path('guest-history/', views.guest_history_report, name='guest_history_report'),
+    path('pace/', views.pace_report, name='pace_report'),
+    path('commissions/', views.commission_statements, name='commission_statements'),
+    path('commissions/<int:report_id>/download/', views.commission_statement_download, name='commission_statement_download'),
+    path('rate-recommendations/', views.rate_recommendation_report, name='rate_recommendation_report'),
 ]
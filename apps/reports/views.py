@@ -1,12 +1,23 @@
-from django.shortcuts import render
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Count, Sum, Avg
+from django.db.models.functions import TruncDate
+from django.http import FileResponse, Http404
 from django.utils import timezone
 from datetime import datetime, timedelta
 from apps.reservations.models import Reservation
-from apps.rooms.models import Room
+from apps.rooms.models import Room, RoomType
+from apps.rates.models import RateRecommendation
 from apps.billing.models import Payment
-from apps.guests.models import Guest
+from apps.guests.models import Guest, GuestStats
+from .commissions import TEMPLATE_NAME, previous_month
+from .models import GeneratedReport
+from .snapshots import pace_comparison
+from .tasks import generate_commission_statements
 
 @login_required
 def report_list(request):
@@ -29,6 +40,30 @@ def report_list(request):
             'description': 'Guest statistics and history analysis', 
             'url': 'reports:guest_history_report',
             'icon': 'users'
+        },
+        {
+            'name': 'Pace Report',
+            'description': 'On-the-books pickup versus same time last year',
+            'url': 'reports:pace_report',
+            'icon': 'bed'
+        },
+        {
+            'name': 'Channel Commissions',
+            'description': 'Monthly commission statements per booking channel',
+            'url': 'reports:commission_statements',
+            'icon': 'dollar-sign'
+        },
+        {
+            'name': 'AR Aging',
+            'description': 'Outstanding invoice balances by days past due',
+            'url': 'billing:ar_aging',
+            'icon': 'dollar-sign'
+        },
+        {
+            'name': 'Rate Recommendations',
+            'description': 'Recommended rates from forecast occupancy',
+            'url': 'reports:rate_recommendation_report',
+            'icon': 'dollar-sign'
         }
     ]
     
@@ -117,28 +152,33 @@ def revenue_report(request):
     else:
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
-    # Calculate revenue data
+    # Calculate revenue data, in the hotel currency
     payments = Payment.objects.filter(
         payment_date__date__range=[start_date, end_date],
         status='completed'
     )
     
-    total_revenue = payments.aggregate(total=Sum('amount'))['total'] or 0
-    payment_count = payments.count()
-    avg_payment = payments.aggregate(avg=Avg('amount'))['avg'] or 0
+    summary = payments.aggregate(total=Sum('base_amount'), count=Count('id'), avg=Avg('base_amount'))
+    total_revenue = summary['total'] or 0
+    payment_count = summary['count']
+    avg_payment = summary['avg'] or 0
     
-    # Daily revenue breakdown
+    # Daily revenue breakdown in one grouped query
+    by_day = {
+        row['day']: row
+        for row in payments.annotate(day=TruncDate('payment_date')).values('day').annotate(
+            revenue=Sum('base_amount'), payment_count=Count('id')
+        ).order_by()
+    }
     daily_revenue = []
     current_date = start_date
     
     while current_date <= end_date:
-        day_payments = payments.filter(payment_date__date=current_date)
-        day_revenue = day_payments.aggregate(total=Sum('amount'))['total'] or 0
-        
+        day = by_day.get(current_date, {})
         daily_revenue.append({
             'date': current_date,
-            'revenue': day_revenue,
-            'payment_count': day_payments.count()
+            'revenue': day.get('revenue') or 0,
+            'payment_count': day.get('payment_count', 0)
         })
         
         current_date += timedelta(days=1)
@@ -157,18 +197,15 @@ def revenue_report(request):
 @login_required
 def guest_history_report(request):
     """Generate guest history report"""
-    guests = Guest.objects.annotate(
-        reservation_count=Count('reservations'),
-        total_spent=Sum('reservations__total_amount')
-    ).order_by('-reservation_count')
-    
-    # Top guests
-    top_guests = guests[:10]
+    # Top guests, read from the denormalized stats instead of a join per guest
+    top_guests = GuestStats.objects.filter(stays__gt=0).select_related('guest').order_by(
+        '-stays', '-total_spent'
+    )[:10]
     
     # Guest statistics
-    total_guests = guests.count()
-    repeat_guests = guests.filter(reservation_count__gt=1).count()
-    vip_guests = guests.filter(is_vip=True).count()
+    total_guests = Guest.objects.count()
+    repeat_guests = GuestStats.objects.filter(stays__gt=1).count()
+    vip_guests = Guest.objects.filter(is_vip=True).count()
     
     context = {
         'top_guests': top_guests,
@@ -179,3 +216,105 @@ def guest_history_report(request):
     }
     
     return render(request, 'reports/guest_history_report.html', context)
+
+
+@login_required
+def rate_recommendation_report(request):
+    """Show stored rate recommendations"""
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+
+    if not start_date:
+        start_date = timezone.now().date()
+    else:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+
+    if not end_date:
+        end_date = start_date + timedelta(days=30)
+    else:
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+
+    recommendations = RateRecommendation.objects.filter(
+        stay_date__range=[start_date, end_date]
+    ).select_related('room_type').order_by('stay_date', 'room_type__name')
+
+    context = {
+        'recommendations': recommendations,
+        'start_date': start_date,
+        'end_date': end_date,
+    }
+
+    return render(request, 'reports/rate_recommendation_report.html', context)
+
+
+@login_required
+def pace_report(request):
+    """Compare on-the-books pace with the same time last year"""
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+    room_type = request.GET.get('room_type')
+    booking_source = request.GET.get('booking_source')
+
+    if not start_date:
+        start_date = timezone.now().date()
+    else:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+
+    if not end_date:
+        end_date = start_date + timedelta(days=30)
+    else:
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+
+    pace = pace_comparison(start_date, end_date, room_type=room_type, booking_source=booking_source)
+
+    context = {
+        'pace_data': pace['days'] if pace else [],
+        'as_of': pace['as_of'] if pace else None,
+        'start_date': start_date,
+        'end_date': end_date,
+        'room_types': RoomType.objects.filter(is_active=True),
+        'booking_sources': Reservation.BOOKING_SOURCE_CHOICES,
+        'current_filters': {
+            'room_type': room_type,
+            'booking_source': booking_source,
+        },
+    }
+
+    return render(request, 'reports/pace_report.html', context)
+
+
+@login_required
+def commission_statements(request):
+    """List channel commission statements and queue new ones"""
+    if request.method == 'POST':
+        try:
+            month = datetime.strptime(request.POST['month'], '%Y-%m').date()
+        except (KeyError, ValueError):
+            messages.error(request, 'Choose a month to generate statements for.')
+            return redirect('reports:commission_statements')
+        transaction.on_commit(lambda: generate_commission_statements.delay(month.isoformat(), request.user.id))
+        messages.success(request, f'Commission statements for {month:%B %Y} are being generated.')
+        return redirect('reports:commission_statements')
+
+    statements = GeneratedReport.objects.filter(template__name=TEMPLATE_NAME).order_by('-date_from', 'id')
+    statements = Paginator(statements, 50).get_page(request.GET.get('page'))
+    sources = dict(Reservation.BOOKING_SOURCE_CHOICES)
+    for statement in statements:
+        statement.source_label = sources.get(statement.parameters.get('booking_source'), statement.parameters.get('booking_source'))
+
+    context = {
+        'statements': statements,
+        'default_month': previous_month(),
+    }
+    return render(request, 'reports/commission_statements.html', context)
+
+
+@login_required
+def commission_statement_download(request, report_id):
+    """Download a stored commission statement CSV"""
+    report = get_object_or_404(GeneratedReport, id=report_id, template__name=TEMPLATE_NAME)
+    if not report.file_path or not default_storage.exists(report.file_path):
+        raise Http404("Statement file not found")
+    filename = f"commission-{report.parameters.get('booking_source')}-{report.date_from:%Y-%m}.csv"
+    return FileResponse(default_storage.open(report.file_path, 'rb'), as_attachment=True, filename=filename,
+                        content_type='text/csv')
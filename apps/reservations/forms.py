@@ -1,9 +1,10 @@
 from django import forms
 from django.core.exceptions import ValidationError
-from django.utils import timezone
+from apps.core.autocomplete import AutocompleteSelect
 from .models import Reservation
 from apps.guests.models import Guest
 from apps.rooms.models import Room
+from apps.frontdesk.business_date import get_business_date
 
 class ReservationForm(forms.ModelForm):
     class Meta:
@@ -13,11 +14,13 @@ class ReservationForm(forms.ModelForm):
             'adults', 'children', 'total_amount', 'special_requests', 'notes'
         ]
         widgets = {
-            'guest': forms.Select(attrs={
-                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
+            'guest': AutocompleteSelect('guest', attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
+                'placeholder': 'Search by name, email or phone'
             }),
-            'room': forms.Select(attrs={
-                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500'
+            'room': AutocompleteSelect('room', attrs={
+                'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-primary-500 focus:ring-primary-500',
+                'placeholder': 'Room number'
             }),
             'check_in_date': forms.DateInput(attrs={
                 'type': 'date',
@@ -59,7 +62,7 @@ class ReservationForm(forms.ModelForm):
             if check_in_date >= check_out_date:
                 raise ValidationError('Check-out date must be after check-in date.')
             
-            if check_in_date < timezone.now().date():
+            if check_in_date < get_business_date():
                 raise ValidationError('Check-in date cannot be in the past.')
 
         # Check room availability
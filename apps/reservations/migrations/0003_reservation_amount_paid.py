@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0002_reservation_rate_plan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0003_reservation_amount_paid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservationservice',
+            name='outlet',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='reservationservice',
+            name='posting_key',
+            field=models.CharField(blank=True, help_text='Set on outlet postings so they are never posted twice', max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0001_initial'),
+        ('rates', '0003_channelcommission'),
+        ('reservations', '0004_reservationservice_outlet_and_more'),
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['booking_source', 'status', 'check_out_date'], name='reservation_booking_7c315f_idx'),
+        ),
+    ]
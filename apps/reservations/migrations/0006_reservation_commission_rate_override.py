@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0005_reservation_reservation_booking_7c315f_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='commission_rate_override',
+            field=models.BooleanField(default=False),
+        ),
+    ]
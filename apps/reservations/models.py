@@ -1,11 +1,15 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.utils import timezone
+from datetime import datetime
 from decimal import Decimal
 from apps.core.models import TimeStampedModel
 from apps.guests.models import Guest
 from apps.rooms.models import Room, RoomType
 
+# A rate-planned stay is priced from these (see apply_rate_plan), so changing one re-quotes it
+STAY_FIELDS = ('check_in_date', 'check_out_date', 'rate_plan_id', 'room_type_id', 'adults', 'children')
+
 
 class Reservation(TimeStampedModel):
     """Hotel reservation"""
@@ -46,6 +50,7 @@ class Reservation(TimeStampedModel):
     infants = models.PositiveIntegerField(default=0)
 
     # Pricing
+    rate_plan = models.ForeignKey('rates.RatePlan', on_delete=models.SET_NULL, related_name='reservations', null=True, blank=True)
     room_rate = models.DecimalField(max_digits=10, decimal_places=2)
     total_nights = models.PositiveIntegerField()
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
@@ -56,6 +61,8 @@ class Reservation(TimeStampedModel):
     booking_source = models.CharField(max_length=20, choices=BOOKING_SOURCE_CHOICES, default='direct')
     booking_reference = models.CharField(max_length=100, blank=True)  # External booking reference
     commission_rate = models.DecimalField(max_digits=5, decimal_places=4, default=0)
+    # Set when commission_rate was agreed for this booking; otherwise statements apply the channel rate
+    commission_rate_override = models.BooleanField(default=False)
     commission_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     # Status and timestamps
@@ -73,6 +80,8 @@ class Reservation(TimeStampedModel):
     # Payment
     deposit_required = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     deposit_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Maintained by the folio ledger (completed payments less processed refunds)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     class Meta:
         ordering = ['-check_in_date', '-created_at']
@@ -82,12 +91,31 @@ class Reservation(TimeStampedModel):
             models.Index(fields=['status', 'check_in_date']),
             models.Index(fields=['check_in_date', 'check_out_date']),
             models.Index(fields=['reservation_number']),
+            # Commission runs per channel and check-out month
+            models.Index(fields=['booking_source', 'status', 'check_out_date']),
         ]
 
     def __str__(self):
         return f"Reservation {self.reservation_number} - {self.guest.display_name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() can tell a status change from a re-save
+        if 'status' in field_names:
+            instance._loaded_status = values[field_names.index('status')]
+        # ...and whether the stay must be re-quoted
+        if all(field in field_names for field in STAY_FIELDS):
+            instance._loaded_stay = tuple(values[field_names.index(field)] for field in STAY_FIELDS)
+        return instance
+
+    def _stay_changed(self):
+        loaded = getattr(self, '_loaded_stay', None)
+        return loaded is not None and loaded != tuple(getattr(self, field) for field in STAY_FIELDS)
+
     def save(self, *args, **kwargs):
+        from apps.guests.stats import reservation_status_changed
+
         if not self.reservation_number:
             self.reservation_number = self.generate_reservation_number()
 
@@ -96,12 +124,24 @@ class Reservation(TimeStampedModel):
             self.total_nights = (self.check_out_date - self.check_in_date).days
 
         # Calculate amounts
-        if self.room_rate and self.total_nights:
+        if self.rate_plan_id and self.total_nights:
+            # Priced night by night; re-quoted when the stay changes or room_rate is cleared
+            if not self.room_rate or self.subtotal is None or self._stay_changed():
+                self.apply_rate_plan()
+        elif self.room_rate and self.total_nights:
             self.subtotal = self.room_rate * self.total_nights
-            # Add tax calculation here based on hotel settings
+
+        if self.subtotal is not None and self.total_nights:
+            from apps.billing.folios import hotel_tax_rate
+
+            self.tax_amount = (self.subtotal * hotel_tax_rate()).quantize(Decimal('0.01'))
             self.total_amount = self.subtotal + self.tax_amount
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            reservation_status_changed(self, getattr(self, '_loaded_status', None))
+        self._loaded_status = self.status
+        self._loaded_stay = tuple(getattr(self, field) for field in STAY_FIELDS)
 
     def generate_reservation_number(self):
         """Generate unique reservation number"""
@@ -113,6 +153,36 @@ class Reservation(TimeStampedModel):
             if not Reservation.objects.filter(reservation_number=number).exists():
                 return number
 
+    def apply_rate_plan(self):
+        """Set room rate and subtotal from the selected rate plan"""
+        from apps.rates.pricing import quote_stay
+
+        quote = quote_stay(
+            self.rate_plan_id,
+            self.room_type_id,
+            self.check_in_date,
+            self.check_out_date,
+            adults=self.adults,
+            children=self.children,
+        )
+        if quote:
+            self.room_rate = quote['average_rate']
+            self.subtotal = quote['subtotal']
+
+    @property
+    def expected_arrival(self):
+        """Get check-in date at the hotel's check-in time"""
+        from apps.core.hotel_settings import get_hotel_settings
+
+        return timezone.make_aware(datetime.combine(self.check_in_date, get_hotel_settings().check_in_time))
+
+    @property
+    def expected_departure(self):
+        """Get check-out date at the hotel's check-out time"""
+        from apps.core.hotel_settings import get_hotel_settings
+
+        return timezone.make_aware(datetime.combine(self.check_out_date, get_hotel_settings().check_out_time))
+
     @property
     def duration_nights(self):
         """Get duration in nights"""
@@ -131,7 +201,9 @@ class Reservation(TimeStampedModel):
     @property
     def can_check_in(self):
         """Check if guest can check in"""
-        today = timezone.now().date()
+        from apps.frontdesk.business_date import get_business_date
+
+        today = get_business_date()
         return (
                 self.status == 'confirmed' and
                 self.check_in_date <= today and
@@ -145,16 +217,7 @@ class Reservation(TimeStampedModel):
 
     def get_balance_due(self):
         """Get remaining balance due"""
-        from apps.billing.models import Payment
-
-        total_paid = Payment.objects.filter(
-            reservation=self,
-            status='completed'
-        ).aggregate(
-            total=models.Sum('amount')
-        )['total'] or Decimal('0.00')
-
-        return self.total_amount - total_paid
+        return self.total_amount - self.amount_paid
 
 
 class ReservationGuest(TimeStampedModel):
@@ -179,6 +242,9 @@ class ReservationService(TimeStampedModel):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     service_date = models.DateField(default=timezone.now)
+    outlet = models.CharField(max_length=50, blank=True)
+    posting_key = models.CharField(max_length=100, unique=True, null=True, blank=True,
+                                   help_text="Set on outlet postings so they are never posted twice")
 
     class Meta:
         ordering = ['service_date', 'service_name']
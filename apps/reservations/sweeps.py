@@ -0,0 +1,79 @@
+import logging
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+
+
+def mark_no_shows(as_of=None):
+    """Move confirmed reservations that did not arrive before `as_of` to no_show and post fees"""
+    from apps.billing.folios import get_or_create_folios, hotel_tax_rate, refresh_invoice_totals
+    from apps.billing.ledger import post_line_items
+    from apps.billing.models import InvoiceLineItem
+    from apps.core.hotel_settings import get_hotel_settings
+    from apps.frontdesk.business_date import get_business_date
+    from .models import Reservation
+
+    started = time.monotonic()
+    if as_of is None:
+        as_of = get_business_date()
+    fee_nights = get_hotel_settings().no_show_fee_nights
+
+    with transaction.atomic():
+        # Served by the (status, check_in_date) index
+        missed = Reservation.objects.filter(status='confirmed', check_in_date__lt=as_of)
+
+        fees_posted = 0
+        if fee_nights:
+            # Fees first, a chunk of locked rows at a time, while the reservations are still confirmed
+            tax_rate = hotel_tax_rate()
+            due_date = as_of + timedelta(days=30)
+            last_id = 0
+            while True:
+                chunk = list(missed.select_for_update().filter(id__gt=last_id).order_by('id').values_list(
+                    'id', 'guest_id', 'room_rate', 'total_nights', 'check_in_date'
+                )[:CHUNK_SIZE])
+                if not chunk:
+                    break
+                last_id = chunk[-1][0]
+                folios = get_or_create_folios(
+                    [(reservation_id, guest_id, due_date) for reservation_id, guest_id, _, _, _ in chunk],
+                    issue_date=as_of,
+                )
+                fees = []
+                for reservation_id, _, room_rate, total_nights, check_in_date in chunk:
+                    nights = min(fee_nights, total_nights or fee_nights)
+                    if not room_rate or not nights:
+                        continue
+                    fees.append(InvoiceLineItem(
+                        invoice_id=folios[reservation_id],
+                        description=f"No-show fee ({nights} night{'s' if nights != 1 else ''})",
+                        quantity=Decimal(nights),
+                        unit_price=room_rate,
+                        total_amount=room_rate * nights,
+                        service_date=check_in_date,
+                        posting_key=f"no_show:{reservation_id}",
+                    ))
+                InvoiceLineItem.objects.bulk_create(fees, batch_size=1000, ignore_conflicts=True)
+                post_line_items(
+                    InvoiceLineItem.objects.filter(posting_key__in=[fee.posting_key for fee in fees]), tax_rate
+                )
+                refresh_invoice_totals(list(folios.values()), tax_rate)
+                fees_posted += len(fees)
+
+        updated = missed.update(status='no_show', updated_at=timezone.now())
+
+    metrics = {
+        'as_of': as_of.isoformat(),
+        'no_shows': updated,
+        'fees_posted': fees_posted,
+        'duration_ms': round((time.monotonic() - started) * 1000, 1),
+    }
+    logger.info("No-show sweep: %s", metrics)
+    return metrics
@@ -0,0 +1,8 @@
+from celery import shared_task
+from .sweeps import mark_no_shows
+
+
+@shared_task
+def sweep_no_shows():
+    """Periodic no-show transition"""
+    return mark_no_shows()
@@ -31,7 +31,7 @@ def reservation_list(request):
         reservations = reservations.filter(
             Q(guest__first_name__icontains=search) |
             Q(guest__last_name__icontains=search) |
-            Q(room__room_number__icontains=search)
+            Q(room__number__icontains=search)
         )
     
     reservations = reservations.order_by('-created_at')
@@ -77,7 +77,7 @@ def create_reservation(request):
             messages.success(request, f'Reservation created successfully for {reservation.guest.full_name}!')
             return redirect('reservations:reservation_detail', reservation_id=reservation.id)
     else:
-        form = ReservationForm()
+        form = ReservationForm(initial={'guest': request.GET.get('guest_id')})
     
     context = {'form': form, 'title': 'Create Reservation'}
     return render(request, 'reservations/reservation_form.html', context)
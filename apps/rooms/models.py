@@ -66,12 +66,13 @@ class Room(TimeStampedModel):
     def get_current_reservation(self):
         """Get current active reservation for this room"""
         from apps.reservations.models import Reservation
-        from django.utils import timezone
+        from apps.frontdesk.business_date import get_business_date
 
+        today = get_business_date()
         return Reservation.objects.filter(
             room=self,
-            check_in_date__lte=timezone.now().date(),
-            check_out_date__gt=timezone.now().date(),
+            check_in_date__lte=today,
+            check_out_date__gt=today,
             status__in=['confirmed', 'checked_in']
         ).first()
 
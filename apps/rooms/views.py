@@ -7,6 +7,7 @@ from django.core.paginator import Paginator
 from django.db.models import Q
 from .models import Room, RoomType
 from .forms import RoomForm, RoomTypeForm
+from apps.frontdesk.business_date import get_business_date
 
 @login_required
 def room_list(request):
@@ -69,7 +70,7 @@ def room_detail(request, room_id):
     
     upcoming_reservations = room.reservations.filter(
         status='confirmed',
-        check_in_date__gte=timezone.now().date()
+        check_in_date__gte=get_business_date()
     ).order_by('check_in_date')[:5]
     
     # Get maintenance history
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,6 +22,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.forms',
 ]
 
 THIRD_PARTY_APPS = [
@@ -30,6 +32,8 @@ THIRD_PARTY_APPS = [
     'django_htmx',
     'crispy_forms',
     'crispy_tailwind',
+    'rest_framework',
+    'rest_framework.authtoken',
 ]
 
 LOCAL_APPS = [
@@ -37,6 +41,7 @@ LOCAL_APPS = [
     'apps.rooms',
     'apps.guests',
     'apps.reservations',
+    'apps.rates',
     'apps.frontdesk',
     'apps.housekeeping',
     'apps.billing',
@@ -120,6 +125,11 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Hand file downloads to the web server: 'xaccel' (nginx, with an internal
+# location mapping SENDFILE_URL_PREFIX to MEDIA_ROOT) or 'xsendfile' (Apache, lighttpd)
+SENDFILE_BACKEND = config('SENDFILE_BACKEND', default='')
+SENDFILE_URL_PREFIX = config('SENDFILE_URL_PREFIX', default='/protected/')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -133,6 +143,20 @@ INTERNAL_IPS = [
 CRISPY_ALLOWED_TEMPLATE_PACKS = "tailwind"
 CRISPY_TEMPLATE_PACK = "tailwind"
 
+# Widgets render through the project templates, which hold the autocomplete widget
+FORM_RENDERER = 'django.forms.renderers.TemplatesSetting'
+
+# REST API (payment terminals and POS authenticate with tokens)
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.TokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+}
+
 # Login/Logout URLs
 LOGIN_URL = '/users/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
@@ -145,6 +169,60 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
 
+# Periodic tasks (run with: celery -A hotelms beat)
+# The night audit also refreshes on-the-books snapshots and rate recommendations
+CELERY_BEAT_SCHEDULE = {
+    'night-audit': {
+        'task': 'apps.frontdesk.tasks.night_audit',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'sweep-no-shows': {
+        'task': 'apps.reservations.tasks.sweep_no_shows',
+        'schedule': crontab(minute=15),
+    },
+    'sweep-overdue-invoices': {
+        'task': 'apps.billing.tasks.sweep_overdue_invoices',
+        'schedule': crontab(minute=45),
+    },
+    'purge-idempotency-keys': {
+        'task': 'apps.billing.tasks.purge_idempotency_keys',
+        'schedule': crontab(hour=4, minute=30),
+    },
+    'render-departure-folios': {
+        'task': 'apps.billing.tasks.render_departure_folios',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'generate-commission-statements': {
+        'task': 'apps.reports.tasks.generate_commission_statements',
+        'schedule': crontab(day_of_month=1, hour=5, minute=0),
+    },
+    'poll-outlet-charges': {
+        'task': 'apps.billing.tasks.poll_outlet_charges',
+        'schedule': 10.0,
+    },
+    'repair-guest-stats': {
+        'task': 'apps.guests.tasks.repair_guest_stats',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'refresh-guest-segments': {
+        'task': 'apps.guests.tasks.refresh_guest_segments',
+        'schedule': crontab(minute='*/15'),
+    },
+    # After the stats repair, so repaired rows are picked up and deleted guests dropped
+    'rebuild-guest-segments': {
+        'task': 'apps.guests.tasks.refresh_guest_segments',
+        'schedule': crontab(hour=4, minute=0),
+        'kwargs': {'full': True},
+    },
+    'reclaim-document-blobs': {
+        'task': 'apps.guests.tasks.reclaim_document_blobs',
+        'schedule': crontab(hour=4, minute=15),
+    },
+}
+
+# Point-of-sale outlets without API access drop CSV charge files here
+OUTLET_DROP_DIR = config('OUTLET_DROP_DIR', default=str(BASE_DIR / 'outlet_drop'))
+
 # Cache settings
 CACHES = {
     'default': {
@@ -9,6 +9,7 @@ urlpatterns = [
     path('rooms/', include('apps.rooms.urls')),
     path('guests/', include('apps.guests.urls')),
     path('reservations/', include('apps.reservations.urls')),
+    path('rates/', include('apps.rates.urls')),
     path('frontdesk/', include('apps.frontdesk.urls')),
     path('housekeeping/', include('apps.housekeeping.urls')),
     path('billing/', include('apps.billing.urls')),